@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Shared Airtable gateway for the Sunbiz filing scripts and the autofill watcher.
+
+One pyairtable Api (one pooled HTTP session) per process instead of a new Api/table
+per call, a token bucket that keeps the base under Airtable's 5 requests/second,
+backoff and retry on 429, and per-record write coalescing:
+
+  airtable().update(rec, {...}, defer=True)   # queued, no request yet
+  airtable().update(rec, {...})               # one PATCH with the queued fields merged in
+  airtable().flush()                          # queued updates as batch PATCHes of 10 records
+
+The bucket lives in a SQLite file (AIRTABLE_RATE_STATE) keyed by base ID, so the watcher and
+every filing process on the host draw from the same 5 requests/second. Every HTTP request
+takes a token, including each page of all() and each 429 retry.
+
+Deferred updates are flushed at interpreter exit; forked children (which skip atexit)
+must call flush() themselves.
+
+With AIRTABLE_MIRROR set, records are also kept in a local SQLite mirror (airtable_mirror.py):
+get(rec, max_age=READ_MAX_AGE) is served locally when fresh enough, writes are applied to it
+after Airtable accepts them, and sync_mirror() pulls only records changed since the last sync.
+"""
+import os
+import time
+import atexit
+import sqlite3
+import tempfile
+import threading
+
+import requests
+from pyairtable import Api
+
+from airtable_mirror import open_mirror, MIRROR_FIELDS, FULL_SYNC_INTERVAL, SYNC_OVERLAP
+
+AIRTABLE_API_KEY = os.environ.get("AIRTABLE_API_KEY", "")
+AIRTABLE_BASE_ID = os.environ.get("AIRTABLE_BASE_ID", "")
+AIRTABLE_TABLE_NAME = os.environ.get("AIRTABLE_TABLE_NAME", "Formations")
+
+# Airtable allows 5 requests/second per base; 429s cost a 30 second penalty
+RATE_LIMIT = float(os.environ.get("AIRTABLE_RATE_LIMIT", "5"))
+# Host-wide bucket file shared by all processes; empty = per-process bucket
+RATE_STATE_PATH = os.environ.get("AIRTABLE_RATE_STATE", os.path.join(tempfile.gettempdir(), "airtable-rate.sqlite"))
+MAX_RETRIES = 5
+MAX_BACKOFF = 30
+BATCH_SIZE = 10
+# Filing reads accept a mirrored record confirmed this recently (seconds)
+READ_MAX_AGE = float(os.environ.get("AIRTABLE_MIRROR_MAX_AGE", "60"))
+
+
+class TokenBucket:
+    """Blocking token bucket: at most `rate` acquisitions per second, bursts up to `rate`."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedTokenBucket:
+    """
+    TokenBucket kept in a SQLite row keyed by base ID, so every process on the host shares
+    one budget. BEGIN IMMEDIATE serializes the read-refill-take across processes.
+    """
+
+    def __init__(self, path, key, rate):
+        self.path = path
+        self.key = key
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def take(self):
+        while True:
+            db = self._connect()
+            try:
+                db.isolation_level = None
+                db.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                row = db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (self.key,)).fetchone()
+                tokens, updated = row if row else (self.capacity, now)
+                # max(0, ...) keeps a clock step backwards from draining the bucket
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0
+                else:
+                    wait = (1 - tokens) / self.rate
+                db.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (self.key, tokens, now),
+                )
+                db.execute("COMMIT")
+            finally:
+                db.close()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+def rate_limiter(base_id, rate=RATE_LIMIT, path=RATE_STATE_PATH):
+    """The host-wide bucket for base_id, or a per-process one if the state file is unusable."""
+    if path:
+        try:
+            return SharedTokenBucket(path, base_id, rate)
+        except sqlite3.Error as e:
+            print(f"\u26a0\ufe0f Shared Airtable rate limiter unavailable ({e}), limiting this process only")
+    return TokenBucket(rate)
+
+
+class AirtableGateway:
+    """Rate-limited access to one Airtable table with coalesced writes."""
+
+    def __init__(self, api_key=AIRTABLE_API_KEY, base_id=AIRTABLE_BASE_ID, table_name=AIRTABLE_TABLE_NAME):
+        # Retries are ours (below), so they go through the rate limiter too
+        self.api = Api(api_key, retry_strategy=None)
+        # Api.request sends every HTTP request, one per page when listing: limit it there
+        self._send = self.api.request
+        self.api.request = self._request
+        self.table = self.api.table(base_id, table_name)
+        self.bucket = rate_limiter(base_id)
+        self.pending = {}       # record_id -> fields waiting for the next write
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.mirror = open_mirror()
+        self.mirror_fields = MIRROR_FIELDS
+        self.mirror_hits = 0
+
+    def _request(self, *args, **kwargs):
+        """Send one Airtable HTTP request under the rate limit, backing off on 429."""
+        delay = 1
+        for attempt in range(MAX_RETRIES + 1):
+            self.bucket.take()
+            self.request_count += 1
+            try:
+                return self._send(*args, **kwargs)
+            except requests.HTTPError as e:
+                if getattr(e.response, "status_code", None) != 429 or attempt == MAX_RETRIES:
+                    raise
+                print(f"\u26a0\ufe0f Airtable rate limit hit (429), retrying in {delay}s")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_BACKOFF)
+
+    def get(self, record_id, max_age=0):
+        """
+        Fetch a record. With a mirror and max_age > 0, a copy confirmed within max_age
+        seconds is returned without an API call; the default always asks Airtable.
+        """
+        if self.mirror and max_age:
+            record = self.mirror.get(record_id, max_age)
+            if record:
+                self.mirror_hits += 1
+                return record
+        record = self.table.get(record_id)
+        if self.mirror:
+            self.mirror.put([record])
+        return record
+
+    def all(self, **kwargs):
+        """table.all(**kwargs); each page is its own rate-limited request."""
+        return self.table.all(**kwargs)
+
+    def update(self, record_id, fields, defer=False):
+        """
+        Write fields to a record, merged with anything deferred for it (later values win).
+        With defer=True nothing is sent until the next update/flush for that record.
+        """
+        with self.lock:
+            merged = self.pending.pop(record_id, {})
+            merged.update(fields)
+            if defer:
+                self.pending[record_id] = merged
+                return None
+        try:
+            result = self.table.update(record_id, merged)
+        except Exception:
+            self._requeue({record_id: merged})
+            raise
+        if self.mirror:
+            self.mirror.apply(record_id, merged)
+        return result
+
+    def batch_update(self, updates):
+        """Write {record_id: fields} (merged with deferred fields) as PATCHes of up to 10 records."""
+        with self.lock:
+            merged = {}
+            for record_id, fields in updates.items():
+                merged[record_id] = {**self.pending.pop(record_id, {}), **fields}
+        items = list(merged.items())
+        results = []
+        for start in range(0, len(items), BATCH_SIZE):
+            chunk = items[start:start + BATCH_SIZE]
+            try:
+                results.extend(self.table.batch_update(
+                    [{"id": record_id, "fields": fields} for record_id, fields in chunk],
+                ))
+            except Exception:
+                self._requeue(dict(items[start:]))
+                raise
+            if self.mirror:
+                for record_id, fields in chunk:
+                    self.mirror.apply(record_id, fields)
+        return results
+
+    def flush(self, record_ids=None):
+        """Send deferred updates (all, or just record_ids) in as few requests as possible."""
+        with self.lock:
+            ids = [r for r in (record_ids or list(self.pending)) if r in self.pending]
+            updates = {r: self.pending.pop(r) for r in ids}
+        if len(updates) == 1:
+            record_id, fields = updates.popitem()
+            return [self.update(record_id, fields)]
+        return self.batch_update(updates) if updates else []
+
+    def discard(self, record_ids):
+        """Drop deferred updates for records we decided not to touch after all."""
+        with self.lock:
+            for record_id in record_ids:
+                self.pending.pop(record_id, None)
+
+    def sync_mirror(self, full=False):
+        """
+        Pull records changed since the last sync into the mirror (projected to MIRROR_FIELDS).
+        Falls back to a full resync when forced, never synced, or FULL_SYNC_INTERVAL has passed.
+        """
+        started = time.time()
+        synced_at, full_synced_at = self.mirror.sync_state()
+        full = full or not synced_at or started - full_synced_at > FULL_SYNC_INTERVAL
+        options = {}
+        if not full:
+            since = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(synced_at - SYNC_OVERLAP))
+            options["formula"] = f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since}'))"
+        try:
+            records = self.all(fields=self.mirror_fields, **options) if self.mirror_fields \
+                else self.all(**options)
+        except requests.HTTPError as e:
+            if not self.mirror_fields or getattr(e.response, "status_code", None) != 422:
+                raise
+            # A projected field is missing from the base: mirror every field rather than fail
+            print(f"\u26a0\ufe0f Airtable rejected the mirror's field list ({e}), syncing all fields")
+            self.mirror_fields = None
+            records = self.all(**options)
+        self.mirror.put(records, synced_at=started, full=full)
+        kind = "full sync" if full else "changed"
+        print(f"\U0001fa9e Airtable mirror: {len(records)} record(s) ({kind}) in {(time.time() - started) * 1000:.0f}ms")
+        return records
+
+    def _requeue(self, updates):
+        """Put failed writes back so the next update/flush retries them (newer deferred values win)."""
+        with self.lock:
+            for record_id, fields in updates.items():
+                self.pending[record_id] = {**fields, **self.pending.get(record_id, {})}
+
+
+_gateway = None
+_gateway_pid = None
+_gateway_lock = threading.Lock()
+
+
+def airtable():
+    """The process-wide gateway (a forked child gets its own, never the parent's connections)."""
+    global _gateway, _gateway_pid
+    with _gateway_lock:
+        if _gateway is None or _gateway_pid != os.getpid():
+            _gateway = AirtableGateway()
+            _gateway_pid = os.getpid()
+        return _gateway
+
+
+@atexit.register
+def flush_airtable():
+    """Send any deferred updates before the interpreter exits."""
+    if _gateway is not None and _gateway_pid == os.getpid() and _gateway.pending:
+        try:
+            _gateway.flush()
+        except Exception as e:
+            print(f"\u274c Failed to flush deferred Airtable updates: {e}")
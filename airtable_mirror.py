@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Local SQLite mirror of the Airtable Formations table.
+
+The watcher, filing_dispatcher and the LLC/Corp data fetches read the same records
+seconds apart. With AIRTABLE_MIRROR set, airtable_gateway keeps a copy here:
+
+  sync      the watcher pulls only records modified since the last sync
+            (LAST_MODIFIED_TIME() formula, projected to MIRROR_FIELDS), plus a full
+            resync every AIRTABLE_MIRROR_FULL_SYNC seconds to drop deleted records
+  reads     airtable().get(rec, max_age=...) is served from here when the record was
+            confirmed within max_age seconds, otherwise fetched (and stored) from the API
+  writes    go to Airtable first, then are applied here (write-through)
+
+Status, state and entity type are indexed columns, so the watcher's pending-records
+query is a local SELECT. The file is shared by the watcher and its forked filings.
+
+Usage:
+  python3 airtable_mirror.py sync         # incremental sync now
+  python3 airtable_mirror.py sync --full  # full resync
+  python3 airtable_mirror.py stats
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+
+MIRROR_PATH = os.environ.get("AIRTABLE_MIRROR", "")
+FULL_SYNC_INTERVAL = int(os.environ.get("AIRTABLE_MIRROR_FULL_SYNC", "3600"))
+# Re-read a little before the last sync started: covers clock skew and in-flight edits
+SYNC_OVERLAP = 30
+
+# Fields the watcher, dispatcher and LLC/Corp fetches read; everything else stays in Airtable
+MIRROR_FIELDS = [
+    "Company Name", "Entity Type", "Formation State", "Formation Status", "Autofill",
+    "Autofill Claim", "Stripe Payment ID", "Payment Date", "Notes",
+    "Customer Name", "Customer Email", "Company Address", "Business Purpose", "Number of Shares",
+    "Manager 1 Name", "Manager 1 First Name", "Manager 1 Last Name", "Manager 1 Address",
+    "Owner 1 Name", "Owner 1 First Name", "Owner 1 Last Name", "Owner 1 Address",
+] + [
+    f"{role} {i} {part}"
+    for role in ("Officer", "Director")
+    for i in range(1, 7)
+    for part in ("Name", "First Name", "Last Name", "Address")
+] + [f"Officer {i} Role" for i in range(1, 7)]
+
+_COLUMNS = {
+    "status": "Formation Status",
+    "state": "Formation State",
+    "entity_type": "Entity Type",
+    "autofill": "Autofill",
+    "payment_date": "Payment Date",
+}
+
+
+class AirtableMirror:
+    """Formations records in a local SQLite file, with indexed status/state/entity type."""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " id TEXT PRIMARY KEY, fields TEXT NOT NULL, status TEXT, state TEXT, entity_type TEXT,"
+                " autofill TEXT, payment_date TEXT, synced_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS records_pending ON records (status, state, entity_type)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _meta(self, db, key):
+        row = db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def sync_state(self):
+        """(last sync start, last full sync start) as epoch seconds, 0 if never."""
+        with self._connect() as db:
+            return self._meta(db, "synced_at"), self._meta(db, "full_synced_at")
+
+    def put(self, records, synced_at=None, full=False):
+        """
+        Store records as fetched from Airtable. A full sync also drops records it didn't
+        see and records the sync time; synced_at marks an (incremental) sync as complete.
+        """
+        now = time.time()
+        rows = [
+            (r["id"], json.dumps(r["fields"]), *(r["fields"].get(f) or None for f in _COLUMNS.values()), now)
+            for r in records
+        ]
+        with self._connect() as db:
+            if full:
+                db.execute("DELETE FROM records")
+            db.executemany(
+                "INSERT OR REPLACE INTO records (id, fields, status, state, entity_type, autofill, payment_date,"
+                " synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if synced_at is not None:
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_at', ?)", (synced_at,))
+                if full:
+                    db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('full_synced_at', ?)", (synced_at,))
+
+    def apply(self, record_id, fields):
+        """Write-through: merge fields just written to Airtable into the stored record (if we have it)."""
+        with self._connect() as db:
+            row = db.execute("SELECT fields FROM records WHERE id = ?", (record_id,)).fetchone()
+            if not row:
+                return
+            merged = json.loads(row[0])
+            for name, value in fields.items():
+                if value in ("", None, []):
+                    merged.pop(name, None)   # Airtable omits empty fields
+                else:
+                    merged[name] = value
+            db.execute(
+                "UPDATE records SET fields = ?, status = ?, state = ?, entity_type = ?, autofill = ?,"
+                " payment_date = ? WHERE id = ?",
+                (json.dumps(merged), *(merged.get(f) or None for f in _COLUMNS.values()), record_id),
+            )
+
+    def get(self, record_id, max_age):
+        """The stored record if Airtable confirmed it within max_age seconds, else None."""
+        with self._connect() as db:
+            row = db.execute("SELECT fields, synced_at FROM records WHERE id = ?", (record_id,)).fetchone()
+            if not row:
+                return None
+            # An incremental sync that didn't return the record still confirms it was unchanged
+            confirmed_at = max(row[1], self._meta(db, "synced_at"))
+        if time.time() - confirmed_at > max_age:
+            return None
+        return {"id": record_id, "fields": json.loads(row[0])}
+
+    def select(self, statuses, state, entity_types, autofill="Yes", record_ids=None):
+        """Records matching the autofill criteria, newest payment first (uses the records_pending index)."""
+        query = (
+            f"SELECT id, fields FROM records WHERE status IN ({','.join('?' * len(statuses))}) AND state = ?"
+            f" AND entity_type IN ({','.join('?' * len(entity_types))}) AND autofill = ?"
+        )
+        params = [*statuses, state, *entity_types, autofill]
+        if record_ids:
+            query += f" AND id IN ({','.join('?' * len(record_ids))})"
+            params += list(record_ids)
+        query += " ORDER BY payment_date DESC"
+        with self._connect() as db:
+            rows = db.execute(query, params).fetchall()
+        return [{"id": record_id, "fields": json.loads(fields)} for record_id, fields in rows]
+
+    def count(self):
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+
+def open_mirror(path=None):
+    """Mirror at AIRTABLE_MIRROR, or None when no mirror is configured."""
+    path = path if path is not None else MIRROR_PATH
+    return AirtableMirror(path) if path else None
+
+
+if __name__ == "__main__":
+    from airtable_gateway import airtable
+
+    gateway = airtable()
+    if gateway.mirror is None:
+        print("\u274c Set AIRTABLE_MIRROR to the mirror's SQLite file path")
+        sys.exit(1)
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "sync":
+        gateway.sync_mirror(full="--full" in sys.argv)
+    elif len(sys.argv) == 2 and sys.argv[1] == "stats":
+        synced_at, full_synced_at = gateway.mirror.sync_state()
+        print(f"\U0001f4e6 {gateway.mirror.count()} record(s) in {gateway.mirror.path}")
+        for label, at in (("Last sync", synced_at), ("Last full sync", full_synced_at)):
+            print(f"   {label}: {f'{int(time.time() - at)}s ago' if at else 'never'}")
+    else:
+        print("Usage:")
+        print("  python3 airtable_mirror.py sync [--full]   # Pull changed (or all) records from Airtable")
+        print("  python3 airtable_mirror.py stats           # Record count and sync age")
+        sys.exit(1)
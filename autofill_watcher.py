@@ -5,23 +5,52 @@ Supports LLC, C-Corp, and S-Corp entity types.
 Routes to the correct filing script via filing_dispatcher.py.
 
 DEFAULT MODE: Run once — process all pending records, then exit.
-WATCH MODE:  Only with --watch flag — poll continuously every 30s.
+WATCH MODE:  Only with --watch flag — poll continuously every 30s, or, with
+             AUTOFILL_QUEUE_URL set, block on the filing queue (see filing_queue.py)
+             and only re-query Airtable every AUTOFILL_RECONCILE_INTERVAL as a sweep.
+WORKERS:     --workers=N files up to N records at once (capped by AUTOFILL_MAX_WORKERS),
+             each worker in its own directory with its own headless Firefox and log.
+
+Records are leased before filing (see filing_leases.py) and the lease is renewed by a
+heartbeat while the filing runs, so several workers or watcher hosts never file the same
+record, and a record whose filer died is reclaimed once its lease expires.
+SIGTERM stops new filings and lets in-flight ones finish (set KillMode=mixed in systemd).
+
+Before filing, every pending record's filing data is built and validated in parallel
+without a browser (pre-flight); records that fail are marked in Airtable in one batch
+write and never reach a filing worker.
+
+Filings are forked from a warm fork server that has the filing modules (selenium, boto3,
+pyairtable, requests) imported once, each in its own process and session with a
+per-filing timeout. AUTOFILL_DISPATCH=subprocess starts a fresh python3 per filing instead.
+The watcher owns the warm Firefox pool: each filing attaches to a session leased from it
+(FILING_BROWSER), and the session is reset and pooled again when the filing exits.
 
 Usage:
-  python3 autofill_watcher.py            # Run once, process pending, exit
-  python3 autofill_watcher.py --watch    # Continuous polling (use with caution)
-  python3 autofill_watcher.py --dry-run  # Show what would be filed, don't open browser
+  python3 autofill_watcher.py                # Run once, process pending, exit
+  python3 autofill_watcher.py --watch        # Continuous polling (use with caution)
+  python3 autofill_watcher.py --dry-run      # Show what would be filed, don't open browser
+  python3 autofill_watcher.py --workers=3    # Run once with 3 concurrent filing workers
 """
 import os
 import sys
 import time
+import queue
+import signal
+import socket
+import threading
 import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Set display for headless operation
 os.environ["DISPLAY"] = ":1"
 
-from pyairtable import Api
+from airtable_gateway import airtable
+from filing_leases import CLAIM_FIELD, LEASE_TTL, LeaseHeartbeat, open_lease_store, parse_claim
+from filing_queue import VISIBILITY_TIMEOUT, open_filing_queue
+from filing_utils import acquire_browser, browser_address, release_browser
 
 # Configuration - set these environment variables on EC2
 AIRTABLE_API_KEY = os.environ.get("AIRTABLE_API_KEY")
@@ -33,14 +62,47 @@ if not AIRTABLE_API_KEY or not AIRTABLE_BASE_ID:
     print("   Set them in /etc/environment or export them before running")
     exit(1)
 
-# Poll interval in seconds (only used in --watch mode)
+# Poll interval in seconds (only used in --watch mode without a queue)
 POLL_INTERVAL = 30
 
+# With a filing queue: seconds between full Airtable reconciliation sweeps
+RECONCILE_INTERVAL = int(os.environ.get("AUTOFILL_RECONCILE_INTERVAL", "900"))
 
-def get_pending_records():
-    """Fetch records ready for autofill (LLC, C-Corp, S-Corp)."""
-    api = Api(AIRTABLE_API_KEY)
-    table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
+# Concurrent filing: default worker count (--workers=N overrides) and the global cap
+WORKERS = int(os.environ.get("AUTOFILL_WORKERS", "1"))
+MAX_WORKERS = int(os.environ.get("AUTOFILL_MAX_WORKERS", "4"))
+WORKER_DIR = os.environ.get(
+    "AUTOFILL_WORKER_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "autofill-workers"),
+)
+
+# Dispatch: "forkserver" (warm, preloaded) or "subprocess" (fresh interpreter per filing)
+DISPATCH_MODE = os.environ.get("AUTOFILL_DISPATCH", "forkserver")
+FILING_TIMEOUT = int(os.environ.get("AUTOFILL_FILING_TIMEOUT", "1800"))
+PRELOAD_MODULES = ["filing_dispatcher", "llc_filing_airtable", "corp_filing_airtable"]
+_dispatch_context = None
+
+# Pre-flight: threads building and validating filing data before any filing is launched
+PREFLIGHT_WORKERS = int(os.environ.get("AUTOFILL_PREFLIGHT_WORKERS", "8"))
+
+WATCHER_ID = f"{socket.gethostname()}:{os.getpid()}"
+leases = open_lease_store()
+
+# Set by SIGTERM: stop leasing new records, let in-flight filings finish
+shutdown = threading.Event()
+
+
+def get_pending_records(record_ids=None):
+    """
+    Fetch records ready for autofill (LLC, C-Corp, S-Corp).
+    With record_ids, only those records are checked against the criteria (queue pickups).
+    """
+    table = airtable()
+    if table.mirror:
+        try:
+            return get_pending_from_mirror(table, record_ids)
+        except Exception as e:
+            print(f"\u26a0\ufe0f Airtable mirror sync failed ({e}), querying Airtable directly")
 
     # Accept LLC, C-Corp, and S-Corp entity types
     formula = """AND(
@@ -59,108 +121,352 @@ def get_pending_records():
         {Formation Status} != 'Filed',
         {Formation Status} != 'Completed'
     )"""
+    if record_ids:
+        ids = ", ".join(f"RECORD_ID() = '{rid}'" for rid in record_ids)
+        formula = f"AND(OR({ids}), {formula})"
 
     try:
         records = table.all(formula=formula, sort=["-Payment Date"])
-        print(f"\U0001f50d Found {len(records)} record(s) matching autofill criteria")
-        for r in records:
-            company_name = r['fields'].get('Company Name', 'Unknown')
-            status = r['fields'].get('Formation Status', 'NOT SET')
-            entity_type = r['fields'].get('Entity Type', 'N/A')
-            print(f"   \U0001f4cb {company_name} ({entity_type}) — Status: {status}")
-        return records
     except Exception as e:
         print(f"\u274c Error querying Airtable: {e}")
         import traceback
         traceback.print_exc()
         return []
-
-
-def mark_as_processing(record_id):
-    """Mark record as being processed to avoid duplicate runs."""
-    api = Api(AIRTABLE_API_KEY)
-    table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
-    table.update(record_id, {'Formation Status': 'In Progress'})
+    report_pending(records)
+    return records
+
+
+def get_pending_from_mirror(table, record_ids=None):
+    """get_pending_records against the local mirror: one incremental sync, then an indexed query."""
+    table.sync_mirror()
+    records = table.mirror.select(
+        statuses=['Pending', 'In Progress'],
+        state='Florida',
+        entity_types=['LLC', 'C-Corp', 'S-Corp'],
+        record_ids=record_ids,
+    )
+    records = [r for r in records if r['fields'].get('Stripe Payment ID')]
+    report_pending(records)
+    return records
+
+
+def report_pending(records):
+    print(f"\U0001f50d Found {len(records)} record(s) matching autofill criteria")
+    for r in records:
+        company_name = r['fields'].get('Company Name', 'Unknown')
+        status = r['fields'].get('Formation Status', 'NOT SET')
+        entity_type = r['fields'].get('Entity Type', 'N/A')
+        print(f"   \U0001f4cb {company_name} ({entity_type}) — Status: {status}")
+
+
+def claim_record(record_id):
+    """
+    Lease a record before filing it and mark it 'In Progress'.
+    Returns the lease id if this watcher owns the record, else None.
+    """
+    table = airtable()
+    # Deferred: an Airtable lease write carries it in the same PATCH
+    table.update(record_id, {'Formation Status': 'In Progress'}, defer=True)
+    lease_id = leases.acquire(record_id, WATCHER_ID)
+    if lease_id:
+        table.flush([record_id])
+    else:
+        table.discard([record_id])
+    return lease_id
 
 
 def clear_autofill_flag(record_id):
-    """Set Autofill back to 'No' after processing so it doesn't re-run."""
-    api = Api(AIRTABLE_API_KEY)
-    table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
-    table.update(record_id, {'Autofill': 'No'})
+    """
+    Set Autofill back to 'No' after processing so it doesn't re-run.
+    Deferred: sent with the lease release, or by the flush at the end of process_record.
+    """
+    airtable().update(record_id, {'Autofill': 'No'}, defer=True)
     print(f"   \U0001f6d1 Autofill flag cleared for {record_id}")
 
 
-def run_autofill(record_id):
-    """Run the filing dispatcher for a specific record."""
-    script_path = os.path.join(os.path.dirname(__file__), 'filing_dispatcher.py')
-
-    print(f"\n{'=' * 60}")
-    print(f"\U0001f680 Starting autofill for record: {record_id}")
-    print(f"{'=' * 60}\n")
-
-    result = subprocess.run(
-        ['python3', script_path, record_id],
-        capture_output=False,
-        text=True,
-    )
+def preflight_records(records, dry_run=False):
+    """
+    Build and validate every record's filing data (in parallel, no browser) and return
+    only the records that pass. Rejected records get the validation error in Notes and
+    Autofill cleared, all in one batch write (skipped in a dry run).
+    Only 'Pending' records without a live lease are checked: an 'In Progress' one may be
+    mid-filing on another host, so it passes through to claim_record untouched.
+    """
+    from filing_dispatcher import preflight
+    from filing_utils import typical_filing_seconds
 
-    return result.returncode == 0
+    def check(record):
+        try:
+            return preflight(record)
+        except Exception as e:
+            return e
+
+    def unclaimed(record):
+        fields = record['fields']
+        _, expires_at = parse_claim(fields.get(CLAIM_FIELD, ''))
+        return fields.get('Formation Status') == 'Pending' and expires_at <= time.time()
+
+    started = time.time()
+    checked = [record for record in records if unclaimed(record)]
+    with ThreadPoolExecutor(max_workers=max(1, min(PREFLIGHT_WORKERS, len(checked) or 1))) as pool:
+        found = dict(zip((record['id'] for record in checked), pool.map(check, checked)))
+    errors = [found.get(record['id']) for record in records]
+
+    passed, rejected = [], {}
+    for record, error in zip(records, errors):
+        if isinstance(error, Exception):
+            # Not a data problem we can name: let the filing itself try (and report) it
+            print(f"   \u26a0\ufe0f Pre-flight check failed for {record['id']}, filing anyway: {error}")
+            error = None
+        if error is None:
+            passed.append(record)
+            continue
+        company_name = record['fields'].get('Company Name', 'Unknown')
+        print(f"   \U0001f6ab Rejected {company_name} ({record['id']}): {error}")
+        rejected[record['id']] = {'Formation Status': 'Pending', 'Notes': error[:500], 'Autofill': 'No'}
+
+    print(f"\U0001f6c2 Pre-flight: {len(passed)} of {len(records)} record(s) ready to file"
+          f" ({time.time() - started:.1f}s)")
+    if rejected:
+        typical = typical_filing_seconds()
+        avoided = f", ~{len(rejected) * typical / 60:.0f} min of filing time avoided" if typical else ""
+        print(f"   {len(rejected)} rejected before launching a filing{avoided}")
+        if not dry_run:
+            try:
+                airtable().batch_update(rejected)
+            except Exception as e:
+                print(f"   \u274c Could not mark rejected records in Airtable (retried on next flush): {e}")
+    return passed
+
+
+def warm_dispatcher():
+    """
+    Start the fork server and import the filing modules in it once. Call before any
+    threads start; later filings fork from it in milliseconds instead of re-importing.
+    """
+    global _dispatch_context
+    if DISPATCH_MODE != "forkserver" or _dispatch_context is not None:
+        return
+    started = time.time()
+    # The fork server ignores our sys.path (Python < 3.13), so point it at this directory explicitly
+    here = os.path.dirname(os.path.abspath(__file__))
+    os.environ["PYTHONPATH"] = os.pathsep.join(p for p in (here, os.environ.get("PYTHONPATH")) if p)
+    _dispatch_context = multiprocessing.get_context("forkserver")
+    _dispatch_context.set_forkserver_preload(PRELOAD_MODULES)
+    probe = _dispatch_context.Process(target=os.getpid)
+    probe.start()
+    probe.join()
+    import filing_dispatcher  # run_filing is pickled by reference, so the parent needs it too
+    print(f"\U0001f525 Filing dispatcher warm in {time.time() - started:.1f}s (preloaded: {', '.join(PRELOAD_MODULES)})")
+
+
+def stop_filing(proc, grace=10):
+    """Stop a filing and everything it started (geckodriver, Firefox): SIGTERM its session, then SIGKILL."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            # Not (yet) its own session: signal just the process
+            try:
+                os.kill(proc.pid, sig)
+            except ProcessLookupError:
+                return
+        deadline = time.time() + grace
+        while time.time() < deadline:
+            if (proc.poll() if isinstance(proc, subprocess.Popen) else proc.exitcode) is not None:
+                return
+            time.sleep(0.2)
+
+
+def run_autofill(record_id, worker=None, lease_id=None):
+    """
+    Run the filing dispatcher for a specific record, heartbeating its lease.
+    With a worker number, the filing runs in that worker's directory (screenshots,
+    run.log) with a headless Firefox, and its output goes to the worker's log.
+    The filing is stopped if the lease is lost or it runs past FILING_TIMEOUT.
+    """
+    work_dir = log_path = None
+    if worker is None:
+        print(f"\n{'=' * 60}")
+        print(f"\U0001f680 Starting autofill for record: {record_id}")
+        print(f"{'=' * 60}\n")
+    else:
+        work_dir = os.path.join(WORKER_DIR, f"worker-{worker}")
+        os.makedirs(work_dir, exist_ok=True)
+        log_path = os.path.join(work_dir, "worker.log")
+        print(f"   \U0001f680 [w{worker}] Starting autofill for {record_id} (log: {log_path})")
+        with open(log_path, "a") as log:
+            log.write(f"\n{'=' * 60}\n{datetime.now().isoformat()} record {record_id}\n{'=' * 60}\n")
+
+    # The filing drives a warm session from our pool, so Firefox outlives the filing process
+    driver = browser = None
+    try:
+        driver = acquire_browser(headless=worker is not None)
+        browser = browser_address(driver)
+    except Exception as e:
+        print(f"   \u26a0\ufe0f Could not provide a pooled Firefox ({e}), the filing will launch its own")
 
+    returncode = heartbeat = None
+    try:
+        launched_at = time.time()
+        if DISPATCH_MODE == "forkserver":
+            warm_dispatcher()
+            from filing_dispatcher import run_filing
+            proc = _dispatch_context.Process(
+                target=run_filing,
+                args=(record_id, launched_at, work_dir, log_path, browser, os.getpid()),
+                name=f"filing-{record_id}",
+            )
+            proc.start()
+        else:
+            script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'filing_dispatcher.py')
+            env = dict(os.environ, FILING_LAUNCHED_AT=str(launched_at), AUTOFILL_WATCHER_PID=str(os.getpid()))
+            if worker is not None:
+                env["FILING_HEADLESS"] = "1"
+            if browser:
+                env["FILING_BROWSER"] = browser
+            log = open(log_path, "a") if log_path else None
+            proc = subprocess.Popen(
+                ['python3', script_path, record_id],
+                cwd=work_dir,
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT if log else None,
+                text=True,
+                start_new_session=True,
+            )
+            if log:
+                log.close()
+
+        if lease_id:
+            heartbeat = LeaseHeartbeat(leases, record_id, lease_id, on_lost=lambda: stop_filing(proc)).start()
+        try:
+            if isinstance(proc, subprocess.Popen):
+                try:
+                    returncode = proc.wait(timeout=FILING_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    returncode = None
+            else:
+                proc.join(FILING_TIMEOUT)
+                returncode = proc.exitcode
+            if returncode is None:
+                print(f"   \u23f0 Filing for {record_id} exceeded {FILING_TIMEOUT}s, stopping it")
+                stop_filing(proc)
+        finally:
+            if heartbeat:
+                heartbeat.stop()
+    finally:
+        if driver:
+            # A filing stopped mid-step may have left the session in any state: don't pool it
+            release_browser(driver, discard=returncode is None or bool(heartbeat and heartbeat.lost))
+
+    return returncode == 0 and not (heartbeat and heartbeat.lost)
+
+
+def process_record(record, worker=None):
+    """Lease and file one record. Returns True/False, or None if skipped (leased elsewhere, shutting down)."""
+    record_id = record['id']
+    company_name = record['fields'].get('Company Name', 'Unknown')
+    entity_type = record['fields'].get('Entity Type', 'N/A')
+    prefix = f"[{datetime.now().strftime('%H:%M:%S')}]" + (f" [w{worker}]" if worker else "")
+
+    print(f"\n{prefix} \U0001f3e2 Processing: {company_name} ({entity_type})")
+
+    if shutdown.is_set():
+        return None
+
+    lease_id = None
+    try:
+        lease_id = claim_record(record_id)
+        if not lease_id:
+            return None
+        ok = run_autofill(record_id, worker=worker, lease_id=lease_id)
 
-def process_records(records, dry_run=False):
-    """Process a list of records. Returns (success_count, fail_count)."""
-    success = 0
-    failed = 0
-    timestamp = datetime.now().strftime("%H:%M:%S")
+        # Always clear Autofill flag after attempt (success or fail)
+        # This prevents infinite re-runs
+        clear_autofill_flag(record_id)
 
-    for record in records:
-        record_id = record['id']
-        company_name = record['fields'].get('Company Name', 'Unknown')
-        entity_type = record['fields'].get('Entity Type', 'N/A')
+        if ok:
+            print(f"{prefix} \u2705 Completed: {company_name} ({entity_type})")
+        else:
+            print(f"{prefix} \u26a0\ufe0f Autofill returned non-zero for: {company_name}")
+        return ok
 
-        print(f"\n[{timestamp}] \U0001f3e2 Processing: {company_name} ({entity_type})")
+    except Exception as e:
+        print(f"{prefix} \u274c Error processing {company_name}: {e}")
+        # Still clear the flag to prevent infinite retries
+        try:
+            clear_autofill_flag(record_id)
+        except Exception:
+            pass
+        return False
 
-        if dry_run:
+    finally:
+        if lease_id:
+            try:
+                leases.release(record_id, lease_id)
+            except Exception as e:
+                print(f"{prefix} \u26a0\ufe0f Could not release lease (expires in {LEASE_TTL}s): {e}")
+        try:
+            airtable().flush([record_id])
+        except Exception as e:
+            print(f"{prefix} \u274c Could not update Airtable for {company_name}: {e}")
+
+
+def process_records(records, dry_run=False, workers=1):
+    """
+    Pre-flight the records, then file those that pass with up to `workers` at once.
+    Returns (success_count, fail_count); rejected records count as failed.
+    """
+    total = len(records)
+    records = preflight_records(records, dry_run=dry_run)
+    rejected = total - len(records)
+
+    if dry_run:
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        for record in records:
+            company_name = record['fields'].get('Company Name', 'Unknown')
+            entity_type = record['fields'].get('Entity Type', 'N/A')
+            print(f"\n[{timestamp}] \U0001f3e2 Processing: {company_name} ({entity_type})")
             print(f"   \U0001f4dd DRY RUN — would file {company_name} ({entity_type})")
-            print(f"   Record ID: {record_id}")
+            print(f"   Record ID: {record['id']}")
             print(f"   Status: {record['fields'].get('Formation Status', 'N/A')}")
             print(f"   Email: {record['fields'].get('Customer Email', 'N/A')}")
-            success += 1
-            continue
-
-        try:
-            mark_as_processing(record_id)
-            ok = run_autofill(record_id)
-
-            # Always clear Autofill flag after attempt (success or fail)
-            # This prevents infinite re-runs
-            clear_autofill_flag(record_id)
+        return len(records), rejected
 
-            if ok:
-                print(f"[{timestamp}] \u2705 Completed: {company_name} ({entity_type})")
-                success += 1
-            else:
-                print(f"[{timestamp}] \u26a0\ufe0f Autofill returned non-zero for: {company_name}")
-                failed += 1
+    if not records:
+        return 0, rejected
+    workers = max(1, min(workers, MAX_WORKERS, len(records)))
+    if workers == 1:
+        results = [process_record(record) for record in records]
+    else:
+        print(f"\n\U0001f477 Filing with {workers} concurrent workers (logs in {WORKER_DIR})")
+        free_workers = queue.Queue()
+        for n in range(1, workers + 1):
+            free_workers.put(n)
 
-        except Exception as e:
-            print(f"[{timestamp}] \u274c Error processing {company_name}: {e}")
-            # Still clear the flag to prevent infinite retries
+        def run(record):
+            worker = free_workers.get()
             try:
-                clear_autofill_flag(record_id)
-            except Exception:
-                pass
-            failed += 1
+                return process_record(record, worker=worker)
+            finally:
+                free_workers.put(worker)
 
-    return success, failed
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, records))
 
+    skipped = results.count(None)
+    if skipped:
+        print(f"\u23ed\ufe0f {skipped} record(s) skipped (leased elsewhere or shutting down)")
+    return results.count(True), results.count(False) + rejected
 
-def run_once(dry_run=False):
+
+def run_once(dry_run=False, workers=1):
     """Run once: fetch pending records, process them, exit."""
     mode = "DRY RUN" if dry_run else "SINGLE RUN"
     print(f"\n\U0001f916 Sunbiz Autofill — {mode}")
-    print(f"   Entity types: LLC, C-Corp, S-Corp")
+    print("   Entity types: LLC, C-Corp, S-Corp")
+    print(f"   Workers: {min(workers, MAX_WORKERS)}")
     print(f"   Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
 
@@ -172,15 +478,123 @@ def run_once(dry_run=False):
 
     print(f"\n\U0001f4cb {len(records)} record(s) to process")
 
-    success, failed = process_records(records, dry_run=dry_run)
+    success, failed = process_records(records, dry_run=dry_run, workers=workers)
 
     print(f"\n{'=' * 50}")
     print(f"\U0001f4ca Results: {success} succeeded, {failed} failed")
-    print(f"\u2705 Done. Exiting.")
+    print("\u2705 Done. Exiting.")
 
 
-def watch_loop():
+def keep_messages_hidden(trigger_queue, receipts, done):
+    """Extend the receipts' visibility timeout until `done` is set, so a long filing's message doesn't reappear."""
+    while not done.wait(VISIBILITY_TIMEOUT / 3):
+        for receipt in receipts:
+            try:
+                trigger_queue.extend(receipt)
+            except Exception as e:
+                print(f"   \u26a0\ufe0f Could not extend queue message visibility: {e}")
+
+
+def queue_loop(trigger_queue, workers=1):
+    """
+    Queue-driven watch mode: block on the filing queue and file queued records as
+    they arrive; sweep Airtable every RECONCILE_INTERVAL for anything never queued.
+    A fixed pool of workers files one record each; messages are only received while a
+    worker is free, kept hidden while their record files, and deleted as it finishes.
+    """
+    workers = max(1, min(workers, MAX_WORKERS))
+    print(f"\U0001f4ec Waiting on filing queue (reconciliation sweep every {RECONCILE_INTERVAL}s, {workers} worker(s))")
+    last_sweep = 0
+    free_workers = queue.Queue()
+    for n in range(1, workers + 1):
+        free_workers.put(n)
+    in_flight = {}     # record_id -> queued or filing in the pool
+    lock = threading.Lock()
+    worker_freed = threading.Event()
+
+    def file_record(record, receipts):
+        done = threading.Event()
+        if receipts:
+            threading.Thread(target=keep_messages_hidden, args=(trigger_queue, receipts, done), daemon=True).start()
+        worker = free_workers.get()
+        try:
+            result = process_record(record, worker=worker if workers > 1 else None)
+            if result is None and shutdown.is_set():
+                return  # never filed: leave the messages to reappear after the visibility timeout
+            for receipt in receipts:
+                trigger_queue.delete(receipt)
+        except Exception as e:
+            print(f"\n[ERROR] {record['id']}: {e}")
+        finally:
+            done.set()
+            free_workers.put(worker)
+            with lock:
+                in_flight.pop(record['id'], None)
+            worker_freed.set()
+
+    def submit(pool, records, receipts_by_id):
+        with lock:
+            records = [record for record in records if record['id'] not in in_flight]
+            for record in records:
+                in_flight[record['id']] = True
+        for record in records:
+            pool.submit(file_record, record, receipts_by_id.pop(record['id'], []))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="filing") as pool:
+        while not shutdown.is_set():
+            try:
+                if time.time() - last_sweep >= RECONCILE_INTERVAL:
+                    last_sweep = time.time()
+                    records = get_pending_records()
+                    if records:
+                        submit(pool, preflight_records(records), {})
+
+                worker_freed.clear()
+                with lock:
+                    idle = workers - len(in_flight)
+                if idle <= 0:
+                    worker_freed.wait(1)
+                    continue
+                messages = trigger_queue.receive(wait_seconds=20, max_messages=min(idle, 10))
+                if not messages:
+                    continue
+
+                receipts_by_id = {}
+                for record_id, receipt in messages:
+                    receipts_by_id.setdefault(record_id, []).append(receipt)
+                invalid = receipts_by_id.pop(None, [])
+                print(f"\n\U0001f4e8 Queue delivered {len(messages)} message(s): {', '.join(receipts_by_id) or 'none valid'}")
+                duplicates = []
+                with lock:
+                    # Already being filed here: the running filing answers these messages too
+                    for record_id in [rid for rid in receipts_by_id if rid in in_flight]:
+                        duplicates += receipts_by_id.pop(record_id)
+                records = get_pending_records(list(receipts_by_id)) if receipts_by_id else []
+                submit(pool, preflight_records(records) if records else [], receipts_by_id)
+
+                # Malformed, duplicate, no longer pending or rejected in pre-flight: nothing to file
+                for receipts in [invalid, duplicates, *receipts_by_id.values()]:
+                    for receipt in receipts:
+                        trigger_queue.delete(receipt)
+
+            except KeyboardInterrupt:
+                print("\n\n\U0001f44b Watcher stopped by user")
+                shutdown.set()
+            except Exception as e:
+                print(f"\n[ERROR] {e}")
+                print("Retrying in 60 seconds...")
+                shutdown.wait(60)
+
+    print("\n\U0001f44b Watcher stopped, in-flight filings finished")
+
+
+def watch_loop(workers=1):
     """Continuous polling mode. Only use with --watch flag."""
+    trigger_queue = open_filing_queue()
+    if trigger_queue is not None:
+        queue_loop(trigger_queue, workers=workers)
+        return
+
     print(f"""
 \u2554\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2557
 \u2551   \u26a0\ufe0f  CONTINUOUS WATCH MODE                              \u2551
@@ -190,17 +604,17 @@ def watch_loop():
 \u255a\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u2550\u255d
     """)
 
-    while True:
+    while not shutdown.is_set():
         try:
             records = get_pending_records()
 
             if records:
-                process_records(records)
+                process_records(records, workers=workers)
             else:
                 ts = datetime.now().strftime("%H:%M:%S")
                 print(f"[{ts}] \U0001f440 Watching... (no new records)", end='\r')
 
-            time.sleep(POLL_INTERVAL)
+            shutdown.wait(POLL_INTERVAL)
 
         except KeyboardInterrupt:
             print("\n\n\U0001f44b Watcher stopped by user")
@@ -208,16 +622,33 @@ def watch_loop():
         except Exception as e:
             print(f"\n[ERROR] {e}")
             print("Retrying in 60 seconds...")
-            time.sleep(60)
+            shutdown.wait(60)
+
+    if shutdown.is_set():
+        print("\n\U0001f44b Watcher stopped (SIGTERM), in-flight filings finished")
+
+
+def request_shutdown(signum, frame):
+    """SIGTERM handler: finish in-flight filings, lease nothing new."""
+    if not shutdown.is_set():
+        print("\n\U0001f6d1 SIGTERM received — finishing in-flight filings, not starting new ones")
+    shutdown.set()
 
 
 if __name__ == "__main__":
     args = sys.argv[1:]
+    workers = WORKERS
+    for arg in args:
+        if arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+    if "--dry-run" not in args:
+        warm_dispatcher()
+    signal.signal(signal.SIGTERM, request_shutdown)
 
     if "--dry-run" in args:
         run_once(dry_run=True)
     elif "--watch" in args:
-        watch_loop()
+        watch_loop(workers=workers)
     else:
         # Default: run once and exit
-        run_once()
+        run_once(workers=workers)
@@ -19,17 +19,14 @@ import os
 os.environ["DISPLAY"] = ":1"
 
 import sys
-import time
 from datetime import datetime
 
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 from filing_utils import (
     AVENIDA_LEGAL_ADDRESS,
     REGISTERED_AGENT,
-    human_typing,
     screenshot,
     upload_file_to_s3,
     take_and_upload_screenshot,
@@ -40,20 +37,24 @@ from filing_utils import (
     parse_name,
     detect_country_code,
     translate_business_purpose,
-    init_browser,
+    acquire_browser,
+    release_browser,
     accept_disclaimer_and_start,
     wait_for_form_field,
-    fill_registered_agent,
-    fill_correspondence,
+    filing_step,
+    CHECK,
+    resolve_fields,
+    fill_fields,
+    fill_form_page,
+    registered_agent_fields,
+    correspondence_fields,
     fill_payment_and_submit,
+    UNCONFIRMED_NOTE,
     click_continue_through_pages,
     validate_required_fields,
     save_run_log,
-    AIRTABLE_API_KEY,
-    AIRTABLE_BASE_ID,
-    AIRTABLE_TABLE_NAME,
 )
-from pyairtable import Api
+from airtable_gateway import airtable, READ_MAX_AGE
 
 
 # Sunbiz officer role title codes
@@ -200,11 +201,10 @@ def fetch_corp_data_from_airtable(record_id=None):
     Returns:
         dict: Formatted Corp data for Sunbiz filing, or None.
     """
-    api = Api(AIRTABLE_API_KEY)
-    table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
+    table = airtable()
 
     if record_id:
-        record = table.get(record_id)
+        record = table.get(record_id, max_age=READ_MAX_AGE)
         print(f"\U0001f4c2 Fetched specific record: {record['id']}")
 
         if record['fields'].get('Formation State') != 'Florida':
@@ -239,6 +239,17 @@ def fetch_corp_data_from_airtable(record_id=None):
         record = records[0]
         print(f"\U0001f4c2 Found new Corp formation: {record['fields'].get('Company Name')}")
 
+    return build_corp_data(record)
+
+
+def build_corp_data(record, translate=True, verbose=True):
+    """
+    Build the Sunbiz Corporation filing data from an Airtable record: company name with
+    suffix, principal address, merged officers/directors and the incorporator. The only
+    network call is the OpenAI purpose translation; translate=False keeps the purpose as
+    entered (pre-flight doesn't validate it). verbose=False skips the progress lines
+    (pre-flight builds many records in parallel).
+    """
     fields = record['fields']
     entity_type = fields.get('Entity Type', 'C-Corp')
 
@@ -260,7 +271,8 @@ def fetch_corp_data_from_airtable(record_id=None):
     ]) and address_parts.get('country') != 'INT'
 
     if not has_complete_address:
-        print(f"\U0001f4cd Using Avenida Legal's address for Principal Address (original: {company_address})")
+        if verbose:
+            print(f"\U0001f4cd Using Avenida Legal's address for Principal Address (original: {company_address})")
         address_parts = AVENIDA_LEGAL_ADDRESS.copy()
 
     # ---- Officers & Directors ----
@@ -283,7 +295,7 @@ def fetch_corp_data_from_airtable(record_id=None):
 
     # ---- Business Purpose ----
     raw_purpose = fields.get('Business Purpose', 'Any and all lawful business')
-    purpose = translate_business_purpose(raw_purpose)
+    purpose = translate_business_purpose(raw_purpose) if translate else raw_purpose
     # Determine if we should check the "Any and all lawful business" checkbox
     purpose_is_generic = purpose.lower().strip() in [
         'any and all lawful business',
@@ -300,11 +312,12 @@ def fetch_corp_data_from_airtable(record_id=None):
         contact_name = fields.get('Customer Name', '')
     contact_email = fields.get('Customer Email', '')
 
-    print(f"\U0001f3e2 Corporation: {company_name} ({entity_type})")
-    print(f"   Shares: {stock_shares}")
-    print(f"   Officers: {len(officers)}, Directors: {len(directors)}, Total slots: {len(all_people)}")
-    if president:
-        print(f"   President/Incorporator: {president['name']}")
+    if verbose:
+        print(f"\U0001f3e2 Corporation: {company_name} ({entity_type})")
+        print(f"   Shares: {stock_shares}")
+        print(f"   Officers: {len(officers)}, Directors: {len(directors)}, Total slots: {len(all_people)}")
+        if president:
+            print(f"   President/Incorporator: {president['name']}")
 
     corp_data = {
         "corp": {
@@ -361,134 +374,121 @@ def _format_city_st_zip(addr_parts, country_code):
     return ', '.join(parts)[:60]
 
 
-# ===================== FORM FILLING =====================
-
-def fill_corp_form(driver, wait, data, company_name):
+def validate_corp_data(data):
     """
-    Fill the entire Sunbiz Corporation (Domestic Profit) form.
-    Wraps each section in try/except for granular error screenshots.
+    Check the fields Sunbiz requires for a Corporation: company name, shares, an
+    incorporator and at least one officer or director. Raises ValueError otherwise.
     """
     corp = data["corp"]
+    entity_type = corp.get("entity_type", "C-Corp")
+    validate_required_fields(
+        {
+            "company_name": corp["name"],
+            "stock_shares": corp["stock_shares"],
+            "incorporator_name": data["incorporator"]["name"],
+        },
+        ["company_name", "stock_shares", "incorporator_name"],
+        entity_type=entity_type,
+    )
+    if not data["officers_directors"]:
+        raise ValueError(f"{entity_type} filing requires at least one officer or director")
 
-    # --- Section 1: Corporation Info ---
-    try:
-        print("  \U0001f4dd Filling Corporation information...")
-        corp_name_el = wait_for_form_field(driver, "corp_name")
-        human_typing(corp_name_el, corp["name"])
-        human_typing(driver.find_element(By.ID, "stock_shares"), corp["stock_shares"])
-        take_and_upload_screenshot(driver, "03_corp_name_shares", company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_corp_info", company_name)
-        raise RuntimeError(f"Failed filling Corp info: {e}") from e
 
-    # --- Section 2: Principal Address ---
-    try:
-        print("  \U0001f4dd Filling principal address...")
-        pa = corp["principal_address"]
-        human_typing(driver.find_element(By.ID, "princ_addr1"), pa["line1"])
-        human_typing(driver.find_element(By.ID, "princ_addr2"), pa["line2"])
-        human_typing(driver.find_element(By.ID, "princ_city"), pa["city"])
-        human_typing(driver.find_element(By.ID, "princ_st"), pa["state"])
-        human_typing(driver.find_element(By.ID, "princ_zip"), pa["zip"])
-        human_typing(driver.find_element(By.ID, "princ_cntry"), pa["country"])
-        driver.find_element(By.TAG_NAME, "body").click()
-        time.sleep(1)
-        # Check "same as principal" for mailing address
-        driver.find_element(By.ID, "same_addr_flag").click()
-        take_and_upload_screenshot(driver, "03b_principal_address", company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_principal_address", company_name)
-        raise RuntimeError(f"Failed filling principal address: {e}") from e
+# ===================== FORM FILLING =====================
 
-    # --- Section 3: Registered Agent ---
-    try:
-        fill_registered_agent(driver, company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_registered_agent", company_name)
-        raise RuntimeError(f"Failed filling Registered Agent: {e}") from e
+# Field maps for the Corporation form page (element id, dotted path into the fetched data)
+CORP_INFO_FIELDS = [
+    ("corp_name", "corp.name"),
+    ("stock_shares", "corp.stock_shares"),
+]
 
-    # --- Section 4: Incorporator ---
-    try:
-        print("  \U0001f4dd Filling Incorporator...")
-        inc = data["incorporator"]
-        human_typing(driver.find_element(By.ID, "incorporator_name"), inc["name"])
-        human_typing(driver.find_element(By.ID, "incorporator_address"), inc["address"])
-        human_typing(driver.find_element(By.ID, "incorporator_suite"), inc["suite"])
-        human_typing(driver.find_element(By.ID, "incorp_city_st_zip"), inc["city_st_zip"])
-        # Electronic signature of incorporator
-        human_typing(driver.find_element(By.ID, "signature"), inc["signature"])
-        take_and_upload_screenshot(driver, "05_incorporator_filled", company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_incorporator", company_name)
-        raise RuntimeError(f"Failed filling Incorporator: {e}") from e
+CORP_PRINCIPAL_FIELDS = [
+    ("princ_addr1", "corp.principal_address.line1"),
+    ("princ_addr2", "corp.principal_address.line2"),
+    ("princ_city", "corp.principal_address.city"),
+    ("princ_st", "corp.principal_address.state"),
+    ("princ_zip", "corp.principal_address.zip"),
+    ("princ_cntry", "corp.principal_address.country"),
+    ("same_addr_flag", CHECK),  # Mailing address same as principal
+]
 
-    # --- Section 5: Corporate Purpose ---
-    try:
-        print("  \U0001f4dd Filling corporate purpose...")
-        if corp["purpose_is_generic"]:
-            # Check the "Any and all lawful business" checkbox
-            try:
-                purpose_checkbox = driver.find_element(By.ID, "purpose_flag")
-                if not purpose_checkbox.is_selected():
-                    purpose_checkbox.click()
-            except Exception:
-                # If checkbox fails, fall back to typing in the textarea
-                human_typing(driver.find_element(By.ID, "purpose"), corp["purpose"])
-        else:
-            human_typing(driver.find_element(By.ID, "purpose"), corp["purpose"])
-        take_and_upload_screenshot(driver, "06_purpose_filled", company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_purpose", company_name)
-        raise RuntimeError(f"Failed filling purpose: {e}") from e
+CORP_INCORPORATOR_FIELDS = [
+    ("incorporator_name", "incorporator.name"),
+    ("incorporator_address", "incorporator.address"),
+    ("incorporator_suite", "incorporator.suite"),
+    ("incorp_city_st_zip", "incorporator.city_st_zip"),
+    ("signature", "incorporator.signature"),  # Electronic signature of incorporator
+]
 
-    # --- Section 6: Correspondence / Return Contact ---
-    try:
-        contact = data["return_contact"]
-        fill_correspondence(driver, contact["name"], contact["email"], company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_correspondence", company_name)
-        raise RuntimeError(f"Failed filling correspondence: {e}") from e
+# Generic purposes tick "Any and all lawful business"; if the checkbox is missing the text is typed
+CORP_GENERIC_PURPOSE_FIELDS = [
+    ("purpose_flag", CHECK, True),
+]
 
-    # --- Section 7: Officers and Directors (up to 6 slots) ---
-    try:
-        print("  \U0001f4dd Filling Officers/Directors...")
-        people = data["officers_directors"]
+CORP_PURPOSE_FIELDS = [
+    ("purpose", "corp.purpose"),
+]
 
-        for idx, person in enumerate(people):
-            slot = idx + 1  # off1 through off6
-            prefix = f"off{slot}_name_"
 
-            addr_parts = parse_address(person.get("address", ""), is_international=True)
-            country = detect_country_code(person.get("address", ""))
-            if addr_parts.get('country') == 'INT' and country == 'US':
-                country = 'INT'
+def _officer_fields(people):
+    """Resolved fields for the Officer/Director slots off1..off6."""
+    fields = []
+    for idx, person in enumerate(people):
+        prefix = f"off{idx + 1}_name_"
 
-            human_typing(driver.find_element(By.ID, f"{prefix}title"), person.get("sunbiz_title", "D"))
-            human_typing(driver.find_element(By.ID, f"{prefix}last_name"), person.get("last_name", ""))
-            human_typing(driver.find_element(By.ID, f"{prefix}first_name"), person.get("first_name", ""))
+        addr_parts = parse_address(person.get("address", ""), is_international=True)
+        country = detect_country_code(person.get("address", ""))
+        if addr_parts.get('country') == 'INT' and country == 'US':
+            country = 'INT'
 
-            # Address
-            addr_line = addr_parts.get('line1', '') + (
-                ' ' + addr_parts.get('line2', '') if addr_parts.get('line2') else ''
-            )
-            human_typing(driver.find_element(By.ID, f"{prefix}addr1"), addr_line)
-            human_typing(driver.find_element(By.ID, f"{prefix}city"), addr_parts.get('city', '') or 'N/A')
-            human_typing(
-                driver.find_element(By.ID, f"{prefix}st"),
-                addr_parts.get('state', '') or ('FL' if country == 'US' else 'N/A')
-            )
-            human_typing(
-                driver.find_element(By.ID, f"{prefix}zip"),
-                addr_parts.get('zip', '') or ('33181' if country == 'US' else '00000')
-            )
-            human_typing(driver.find_element(By.ID, f"{prefix}cntry"), country)
+        addr_line = addr_parts.get('line1', '') + (
+            ' ' + addr_parts.get('line2', '') if addr_parts.get('line2') else ''
+        )
+        fields += [
+            (f"{prefix}title", person.get("sunbiz_title", "D"), False),
+            (f"{prefix}last_name", person.get("last_name", ""), False),
+            (f"{prefix}first_name", person.get("first_name", ""), False),
+            (f"{prefix}addr1", addr_line, False),
+            (f"{prefix}city", addr_parts.get('city', '') or 'N/A', False),
+            (f"{prefix}st", addr_parts.get('state', '') or ('FL' if country == 'US' else 'N/A'), False),
+            (f"{prefix}zip", addr_parts.get('zip', '') or ('33181' if country == 'US' else '00000'), False),
+            (f"{prefix}cntry", country, False),
+        ]
+        print(f"    \U0001f464 Slot {idx + 1}: {person['sunbiz_title']} - {person.get('name', 'N/A')}")
+    return fields
 
-            print(f"    \u2705 Slot {slot}: {person['sunbiz_title']} - {person.get('name', 'N/A')}")
 
-        take_and_upload_screenshot(driver, "08_officers_filled", company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_officers", company_name)
-        raise RuntimeError(f"Failed filling Officers/Directors: {e}") from e
+def fill_corp_form(driver, wait, data, company_name):
+    """
+    Fill the entire Sunbiz Corporation (Domestic Profit) form (one page) using the
+    FILL_MODE strategy. In human/keys mode each section gets its own screenshot and
+    error screenshot.
+    """
+    corp = data["corp"]
+
+    try:
+        wait_for_form_field(driver, "corp_name")
+    except Exception:
+        take_and_upload_screenshot(driver, "ERROR_corp_info", company_name)
+        raise
+
+    contact = data["return_contact"]
+    purpose_map = CORP_GENERIC_PURPOSE_FIELDS if corp["purpose_is_generic"] else CORP_PURPOSE_FIELDS
+    missing = fill_form_page(driver, [
+        ("Corporation information", "corp_info", "03_corp_name_shares", resolve_fields(CORP_INFO_FIELDS, data)),
+        ("principal address", "principal_address", "03b_principal_address",
+         resolve_fields(CORP_PRINCIPAL_FIELDS, data)),
+        ("Registered Agent", "registered_agent", "04_ra_filled", registered_agent_fields()),
+        ("Incorporator", "incorporator", "05_incorporator_filled", resolve_fields(CORP_INCORPORATOR_FIELDS, data)),
+        ("corporate purpose", "purpose", "06_purpose_filled", resolve_fields(purpose_map, data)),
+        ("correspondence", "correspondence", "07_contact_filled",
+         correspondence_fields(contact["name"], contact["email"])),
+        ("Officers/Directors", "officers", "08_officers_filled", _officer_fields(data["officers_directors"])),
+    ], company_name, "Corporation form")
+
+    if "purpose_flag" in missing:
+        print("  \u26a0\ufe0f 'Any lawful business' checkbox not found, typing the purpose instead")
+        fill_fields(driver, resolve_fields(CORP_PURPOSE_FIELDS, data))
 
     # Full form screenshot before submission
     take_and_upload_screenshot(driver, "09_before_submit", company_name)
@@ -523,39 +523,30 @@ def main(record_id=None):
 
     # Validate required fields before starting the browser
     try:
-        validate_required_fields(
-            {
-                "company_name": corp["name"],
-                "stock_shares": corp["stock_shares"],
-                "incorporator_name": data["incorporator"]["name"],
-            },
-            ["company_name", "stock_shares", "incorporator_name"],
-            entity_type=entity_type,
-        )
-        if not data["officers_directors"]:
-            raise ValueError(f"{entity_type} filing requires at least one officer or director")
+        validate_corp_data(data)
     except ValueError as e:
         if airtable_record_id:
             update_airtable_status(airtable_record_id, "Pending", f"Validation error: {e}")
         raise
 
-    # Update status to In Progress
+    # Update status to In Progress (sent together with the final Filed/error update;
+    # the watcher already marked the record In Progress when it leased it)
     if airtable_record_id:
-        update_airtable_status(airtable_record_id, "In Progress")
+        update_airtable_status(airtable_record_id, "In Progress", defer=True)
 
     # Fetch payment data
     print("\U0001f4b3 Fetching payment data from SSM...")
     payment = fetch_payment_data_from_ssm(corp_name)
 
-    # Initialize browser
-    print("\U0001f98a Starting Firefox browser...")
-    driver = init_browser()
+    # Borrow a warm browser from the pool (launches one if none is idle)
+    driver = acquire_browser()
     driver.set_page_load_timeout(60)
     wait = WebDriverWait(driver, 30)
 
     try:
         # Step 1: Navigate to Corp disclaimer page and start filing
-        driver.get("https://efile.sunbiz.org/profit_file.html")
+        with filing_step("open_form"):
+            driver.get("https://efile.sunbiz.org/profit_file.html")
         accept_disclaimer_and_start(driver, wait, corp_name)
 
         # Step 2: Fill the entire Corporation form
@@ -565,17 +556,21 @@ def main(record_id=None):
         click_continue_through_pages(driver, wait, 2, corp_name)
 
         # Step 4: Payment
-        fill_payment_and_submit(driver, wait, payment, corp_name)
+        confirmed = fill_payment_and_submit(driver, wait, payment, corp_name)
 
-        # Update Airtable status to Filed
+        # Update Airtable status to Filed (an unconfirmed submit must not be re-filed either)
         if airtable_record_id:
             update_airtable_status(
                 airtable_record_id,
                 "Filed",
-                f"Filed ({entity_type}) on {datetime.now().isoformat()}",
+                f"Filed ({entity_type}) on {datetime.now().isoformat()}" if confirmed else UNCONFIRMED_NOTE.format(
+                    when=datetime.now().isoformat()),
             )
 
-        print(f"\u2705 {entity_type} Filing completed successfully!")
+        if confirmed:
+            print(f"\u2705 {entity_type} Filing completed successfully!")
+        else:
+            print(f"\u26a0\ufe0f {entity_type} payment submitted, but the confirmation page never loaded: check Sunbiz")
 
     except Exception as e:
         print(f"\u274c Error: {e}")
@@ -601,7 +596,7 @@ def main(record_id=None):
         raise
 
     finally:
-        driver.quit()
+        release_browser(driver)
         save_run_log(corp_name, airtable_record_id, entity_type)
 
 
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Background artifact uploads for the Sunbiz filing scripts.
+
+take_and_upload_screenshot() and upload_file_to_s3() hand their bytes to a queue and
+return at once. One background thread per process then:
+  - skips a screenshot identical to the previous one for the same company
+  - compresses screenshots (ARTIFACT_IMAGE_FORMAT: lossless "webp" by default,
+    optimized "png", or "raw"; needs Pillow, otherwise the PNG is uploaded as is)
+  - uploads them with a single reused S3 client
+
+Queued artifacts are flushed at interpreter exit; forked filings (which skip atexit)
+must call flush_artifacts() themselves.
+"""
+import io
+import os
+import queue
+import atexit
+import hashlib
+import threading
+from datetime import datetime
+
+import boto3
+
+try:
+    from PIL import Image
+except ImportError:  # Screenshots are uploaded uncompressed
+    Image = None
+
+ARTIFACT_IMAGE_FORMAT = os.environ.get("ARTIFACT_IMAGE_FORMAT", "webp")
+FLUSH_TIMEOUT = int(os.environ.get("ARTIFACT_FLUSH_TIMEOUT", "120"))
+
+CONTENT_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+
+def compress_screenshot(png):
+    """Re-encode a PNG screenshot as ARTIFACT_IMAGE_FORMAT. Returns (bytes, extension)."""
+    if Image is None or ARTIFACT_IMAGE_FORMAT not in ("webp", "png"):
+        return png, "png"
+    out = io.BytesIO()
+    try:
+        image = Image.open(io.BytesIO(png))
+        if ARTIFACT_IMAGE_FORMAT == "webp":
+            # Lossless: these are the audit trail of a legal filing
+            image.save(out, "WEBP", lossless=True, method=4)
+        else:
+            image.save(out, "PNG", optimize=True)
+    except Exception as e:
+        print(f"  \u26a0\ufe0f Could not compress screenshot, uploading PNG: {e}")
+        return png, "png"
+    data = out.getvalue()
+    return (data, ARTIFACT_IMAGE_FORMAT) if len(data) < len(png) else (png, "png")
+
+
+class ArtifactUploader:
+    """Queue of screenshots/files uploaded to S3 in order by one background thread."""
+
+    def __init__(self, bucket, region):
+        self.bucket = bucket
+        self.region = region
+        self.queue = queue.Queue()
+        self.s3 = None
+        self.last_frame = {}    # company_name -> digest of its last screenshot
+        self.stats = {"uploaded": 0, "skipped": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0}
+        self.thread = threading.Thread(target=self._run, name="artifact-uploader", daemon=True)
+        self.thread.start()
+
+    def put_screenshot(self, png, label, company_name):
+        self.queue.put(("screenshot", png, label, company_name, "screenshots", datetime.now()))
+
+    def put_file(self, data, filename, company_name, category):
+        self.queue.put(("file", data, filename, company_name, category, datetime.now()))
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Wait until everything queued so far is uploaded. Returns False on timeout."""
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(lambda: not self.queue.unfinished_tasks, timeout)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                self._process(*item)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"  \u274c Failed to upload {item[2]}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _process(self, kind, data, name, company_name, category, queued_at):
+        if kind == "screenshot":
+            digest = hashlib.sha1(data).digest()
+            if self.last_frame.get(company_name) == digest:
+                self.stats["skipped"] += 1
+                print(f"  \u23ed\ufe0f Screenshot {name} identical to the previous one, not uploaded")
+                return
+            self.last_frame[company_name] = digest
+            self.stats["bytes_in"] += len(data)
+            data, ext = compress_screenshot(data)
+            filename = f"{name}.{ext}"
+            content_type = CONTENT_TYPES[ext]
+        else:
+            self.stats["bytes_in"] += len(data)
+            filename = name
+            content_type = "application/octet-stream"
+
+        if self.s3 is None:
+            self.s3 = boto3.client("s3", region_name=self.region)
+        key = f"{company_name}/{category}/{queued_at.strftime('%Y-%m-%d_%H-%M-%S')}_{filename}"
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+        self.stats["uploaded"] += 1
+        self.stats["bytes_out"] += len(data)
+        print(f"  \u2705 Uploaded {filename} to s3://{self.bucket}/{key}")
+
+
+_uploader = None
+_uploader_pid = None
+_uploader_lock = threading.Lock()
+
+
+def artifacts(bucket, region):
+    """The process-wide uploader (a forked child starts its own thread)."""
+    global _uploader, _uploader_pid
+    with _uploader_lock:
+        if _uploader is None or _uploader_pid != os.getpid():
+            _uploader = ArtifactUploader(bucket, region)
+            _uploader_pid = os.getpid()
+        return _uploader
+
+
+@atexit.register
+def flush_artifacts():
+    """Upload everything still queued before the process exits."""
+    if _uploader is None or _uploader_pid != os.getpid():
+        return
+    if not _uploader.flush():
+        print(f"\u274c Artifact uploads still pending after {FLUSH_TIMEOUT}s, giving up")
+    stats = _uploader.stats
+    if stats["uploaded"] or stats["skipped"]:
+        print(
+            f"\U0001f4e6 Artifacts: {stats['uploaded']} uploaded, {stats['skipped']} identical skipped,"
+            f" {stats['failed']} failed, {stats['bytes_in'] / 1e6:.1f}MB -> {stats['bytes_out'] / 1e6:.1f}MB"
+        )
+    _uploader.stats = dict.fromkeys(stats, 0)
@@ -6,13 +6,25 @@ Called by autofill_watcher.py (or manually) with an Airtable record ID.
 Reads the entity type from the record and delegates to:
   - llc_filing_airtable.py   for LLC
   - corp_filing_airtable.py  for C-Corp / S-Corp
+
+autofill_watcher.py forks run_filing() from a warm fork server that already has this
+module (and selenium, boto3, pyairtable, requests) imported; running this file as a
+script is the subprocess fallback (AUTOFILL_DISPATCH=subprocess).
 """
 import os
 os.environ["DISPLAY"] = ":1"
 
 import sys
+import time
+import signal
+import threading
+
+from airtable_gateway import airtable, flush_airtable
+from filing_artifacts import flush_artifacts
+from filing_utils import close_browser_pool, fetch_airtable_record, update_airtable_status
 
-from filing_utils import fetch_airtable_record, update_airtable_status
+# How often a filing checks that the watcher holding its lease is still alive (seconds)
+WATCHER_CHECK_INTERVAL = 2
 
 
 def dispatch(record_id):
@@ -58,7 +70,109 @@ def dispatch(record_id):
         return False
 
 
+def preflight(record):
+    """
+    Build and validate the complete filing data for a record the way the filing script
+    would before it starts, but locally: no browser, payment lookup, Airtable request or
+    OpenAI purpose translation (the purpose isn't validated, the filing translates it),
+    and quietly, since the watcher checks many records at once.
+    Returns None if the record can be filed, else the reason it can't.
+    """
+    fields = record["fields"]
+    entity_type = fields.get("Entity Type", "")
+    state = fields.get("Formation State", "")
+    if state != "Florida":
+        return f"Cannot file on Sunbiz: Formation State is '{state}', not Florida"
+    try:
+        if entity_type == "LLC":
+            from llc_filing_airtable import build_llc_data, validate_llc_data
+            validate_llc_data(build_llc_data(record, translate=False, verbose=False))
+        elif entity_type in ("C-Corp", "S-Corp"):
+            from corp_filing_airtable import build_corp_data, validate_corp_data
+            validate_corp_data(build_corp_data(record, translate=False, verbose=False))
+        else:
+            return f"Unsupported entity type: '{entity_type}'. Supported: LLC, C-Corp, S-Corp"
+    except ValueError as e:
+        return f"Validation error: {e}"
+    return None
+
+
+def report_startup(launched_at, mode):
+    """Log how long the watcher waited between launching this filing and reaching dispatch()."""
+    if launched_at:
+        print(f"\u23f1\ufe0f Dispatcher startup: {time.time() - float(launched_at):.2f}s ({mode})")
+
+
+def exit_with_watcher(watcher_pid):
+    """
+    Stop this filing and everything in its session if the watcher exits. Only the watcher
+    heartbeats the record's lease, so an orphaned filing would still be running when the
+    lease expires and another watcher files the record again.
+    """
+    def watch():
+        while True:
+            time.sleep(WATCHER_CHECK_INTERVAL)
+            try:
+                os.kill(watcher_pid, 0)
+            except (ProcessLookupError, PermissionError):
+                # Gone (PermissionError: its pid now belongs to another user's process)
+                break
+        print(f"💀 Watcher (pid {watcher_pid}) exited, stopping this filing before its lease expires")
+        sys.stdout.flush()
+        os.killpg(os.getpgid(0), signal.SIGKILL)
+
+    threading.Thread(target=watch, name="watcher-check", daemon=True).start()
+
+
+def run_filing(record_id, launched_at=None, work_dir=None, log_path=None, browser=None, watcher_pid=None):
+    """
+    Entry point for a filing forked by autofill_watcher. Runs in its own session so
+    the watcher can stop it together with anything it started, optionally in a
+    worker directory with a headless browser and output appended to log_path.
+    browser is the address of a warm Firefox session in the watcher's pool to drive
+    (see filing_utils.AttachedFirefox). The filing dies with watcher_pid (see
+    exit_with_watcher). Exits 0 on success, 1 otherwise.
+    """
+    os.setsid()
+    if watcher_pid:
+        exit_with_watcher(watcher_pid)
+    if browser:
+        os.environ["FILING_BROWSER"] = browser
+    if work_dir:
+        os.chdir(work_dir)
+        os.environ["FILING_HEADLESS"] = "1"
+    if log_path:
+        log = open(log_path, "a", buffering=1)
+        os.dup2(log.fileno(), sys.stdout.fileno())
+        os.dup2(log.fileno(), sys.stderr.fileno())
+
+    report_startup(launched_at, "forkserver")
+    try:
+        success = dispatch(record_id)
+    except Exception as e:
+        print(f"\u274c Dispatcher error: {e}")
+        import traceback
+        traceback.print_exc()
+        success = False
+    finally:
+        # Forked children skip atexit: quit pooled browsers, send deferred Airtable
+        # updates and queued uploads ourselves
+        close_browser_pool()
+    flush_airtable()
+    flush_artifacts()
+    gateway = airtable()
+    mirrored = f", {gateway.mirror_hits} read(s) from mirror" if gateway.mirror else ""
+    print(f"\U0001f4e1 Airtable requests this filing: {gateway.request_count}{mirrored}")
+    sys.stdout.flush()
+    sys.stderr.flush()
+    sys.exit(0 if success else 1)
+
+
 if __name__ == "__main__":
+    report_startup(os.environ.get("FILING_LAUNCHED_AT"), "subprocess")
+    if os.environ.get("AUTOFILL_WATCHER_PID"):
+        exit_with_watcher(int(os.environ["AUTOFILL_WATCHER_PID"]))
+
     if len(sys.argv) < 2 or not sys.argv[1].startswith("rec"):
         print("Usage: python3 filing_dispatcher.py recXXXXXXXXX")
         print("  Routes to the correct filing script based on entity type.")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Record leases for the Sunbiz autofill watcher.
+
+A watcher leases a record before filing it and keeps the lease alive with a
+heartbeat while the filing runs. A lease that is not renewed expires after
+LEASE_TTL seconds and any watcher may then reclaim the record, so a crashed or
+killed filer never leaves a record stuck "In Progress".
+
+Stores (AUTOFILL_LEASE_STORE):
+  airtable               'Autofill Claim' field on the Formations record (default, multi-host)
+  sqlite:///path/to.db   local SQLite file (development / single host)
+
+A lease id is '<host>:<pid>|<nonce>'; the Airtable field holds '<lease id>|<expires epoch>'.
+"""
+import os
+import time
+import uuid
+import sqlite3
+import threading
+
+from airtable_gateway import airtable
+
+LEASE_STORE = os.environ.get("AUTOFILL_LEASE_STORE", "airtable")
+LEASE_TTL = int(os.environ.get("AUTOFILL_LEASE_TTL", "120"))
+HEARTBEAT_INTERVAL = max(5, LEASE_TTL // 3)
+
+# Airtable has no compare-and-set: write the lease, wait for competing writes to land, read it back
+CLAIM_FIELD = "Autofill Claim"
+CLAIM_SETTLE_SECONDS = 2
+
+
+def parse_claim(value):
+    """Split an 'Autofill Claim' value into (lease_id, expires_at); unparseable values are expired."""
+    try:
+        owner, nonce, expires_at = value.rsplit("|", 2)
+        return f"{owner}|{nonce}", int(expires_at)
+    except (AttributeError, ValueError):
+        return value or "", 0
+
+
+class AirtableLeaseStore:
+    """
+    Leases kept in the record's 'Autofill Claim' field (shared by every watcher host).
+    Lease writes go through the Airtable gateway, so deferred updates for the record
+    (e.g. 'In Progress', 'Autofill': 'No') ride along in the same PATCH.
+    """
+
+    def _current(self, record_id):
+        return parse_claim(airtable().get(record_id)["fields"].get(CLAIM_FIELD, ""))
+
+    def acquire(self, record_id, owner):
+        """Lease the record for LEASE_TTL seconds. Returns the lease id, or None if someone else holds it."""
+        holder, expires_at = self._current(record_id)
+        if holder and expires_at > time.time():
+            print(f"   \u23ed\ufe0f Leased by {holder.split('|')[0]} for {int(expires_at - time.time())}s more, skipping")
+            return None
+        if holder:
+            print(f"   \u267b\ufe0f Reclaiming expired lease held by {holder.split('|')[0]}")
+
+        lease_id = f"{owner}|{uuid.uuid4().hex[:12]}"
+        airtable().update(record_id, {CLAIM_FIELD: f"{lease_id}|{int(time.time()) + LEASE_TTL}"})
+        time.sleep(CLAIM_SETTLE_SECONDS)
+
+        winner, _ = self._current(record_id)
+        if winner != lease_id:
+            print(f"   \u23ed\ufe0f Lost lease to {winner.split('|')[0] or 'another watcher'}, skipping")
+            return None
+        return lease_id
+
+    def renew(self, record_id, lease_id):
+        """Extend our lease by LEASE_TTL. Returns False if the lease is no longer ours."""
+        holder, _ = self._current(record_id)
+        if holder != lease_id:
+            return False
+        airtable().update(record_id, {CLAIM_FIELD: f"{lease_id}|{int(time.time()) + LEASE_TTL}"})
+        return True
+
+    def release(self, record_id, lease_id):
+        """Drop our lease (no-op if it has already passed to someone else)."""
+        holder, _ = self._current(record_id)
+        if holder == lease_id:
+            airtable().update(record_id, {CLAIM_FIELD: ""})
+
+
+class SqliteLeaseStore:
+    """Leases in a local SQLite file: a true compare-and-set, but only shared by watchers on one host."""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " record_id TEXT PRIMARY KEY, lease_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def acquire(self, record_id, owner):
+        lease_id = f"{owner}|{uuid.uuid4().hex[:12]}"
+        now = time.time()
+        with self._connect() as db:
+            previous = db.execute(
+                "SELECT lease_id, expires_at FROM leases WHERE record_id = ?", (record_id,)
+            ).fetchone()
+            cur = db.execute(
+                "INSERT INTO leases (record_id, lease_id, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(record_id) DO UPDATE SET lease_id = excluded.lease_id, expires_at = excluded.expires_at"
+                " WHERE leases.expires_at < ?",
+                (record_id, lease_id, now + LEASE_TTL, now),
+            )
+        if cur.rowcount == 0:
+            print(f"   \u23ed\ufe0f Leased by {previous[0].split('|')[0]} for {int(previous[1] - now)}s more, skipping")
+            return None
+        if previous:
+            print(f"   \u267b\ufe0f Reclaiming expired lease held by {previous[0].split('|')[0]}")
+        return lease_id
+
+    def renew(self, record_id, lease_id):
+        with self._connect() as db:
+            cur = db.execute(
+                "UPDATE leases SET expires_at = ? WHERE record_id = ? AND lease_id = ?",
+                (time.time() + LEASE_TTL, record_id, lease_id),
+            )
+        return cur.rowcount == 1
+
+    def release(self, record_id, lease_id):
+        with self._connect() as db:
+            db.execute("DELETE FROM leases WHERE record_id = ? AND lease_id = ?", (record_id, lease_id))
+
+
+def open_lease_store(spec=None):
+    """Build the store named by AUTOFILL_LEASE_STORE ('airtable' or 'sqlite:///path/to.db')."""
+    spec = spec or LEASE_STORE
+    if spec == "airtable":
+        return AirtableLeaseStore()
+    if spec.startswith("sqlite://"):
+        return SqliteLeaseStore(spec[len("sqlite://"):])
+    raise ValueError(f"Unknown AUTOFILL_LEASE_STORE: {spec!r} (use 'airtable' or 'sqlite:///path/to.db')")
+
+
+class LeaseHeartbeat:
+    """
+    Renew a lease every HEARTBEAT_INTERVAL seconds until stopped. If a renewal
+    finds the lease gone, on_lost() is called once (e.g. to stop the filing).
+    Renewal errors are retried on the next beat; the lease only lapses if they
+    persist for LEASE_TTL.
+    """
+
+    def __init__(self, store, record_id, lease_id, on_lost=None):
+        self.store = store
+        self.record_id = record_id
+        self.lease_id = lease_id
+        self.on_lost = on_lost
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                alive = self.store.renew(self.record_id, self.lease_id)
+            except Exception as e:
+                print(f"   \u26a0\ufe0f Lease heartbeat failed for {self.record_id}: {e}")
+                continue
+            if not alive:
+                print(f"   \u274c Lease on {self.record_id} was lost to another watcher")
+                self.lost = True
+                if self.on_lost:
+                    self.on_lost()
+                return
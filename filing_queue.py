@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Filing trigger queue for the Sunbiz autofill watcher.
+
+Producers (the Airtable "Autofill = Yes" automation via autofill-enqueue-lambda, or
+this script) push record IDs; `autofill_watcher.py --watch` blocks on the queue and
+files them within seconds instead of polling Airtable every 30s.
+
+AUTOFILL_QUEUE_URL selects the queue:
+  https://sqs.<region>.amazonaws.com/<account>/<name>   Amazon SQS (long polling)
+  sqlite:///path/to/queue.db                            local stand-in for development
+  (unset)                                               no queue: the watcher polls Airtable
+
+Messages are JSON {"record_id": "recXXX"}. Delivery is at-least-once; the watcher
+re-checks each record against the autofill criteria and leases it before filing,
+so duplicates are harmless.
+
+Usage:
+  python3 filing_queue.py send recXXXXXXXX [recYYYYYYYY ...]
+  python3 filing_queue.py peek
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+
+QUEUE_URL = os.environ.get("AUTOFILL_QUEUE_URL", "")
+# A filing takes minutes; keep a received message hidden from other watchers meanwhile
+# (the watcher extends it while the record's filing runs, see extend())
+VISIBILITY_TIMEOUT = int(os.environ.get("AUTOFILL_QUEUE_VISIBILITY", "900"))
+
+
+def parse_message(body):
+    """Record ID from a message body ({"record_id": ...} or a bare ID); None if malformed."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = body.strip()
+    record_id = data.get("record_id") if isinstance(data, dict) else data
+    if isinstance(record_id, str) and record_id.startswith("rec"):
+        return record_id
+    return None
+
+
+class SqsFilingQueue:
+    """Amazon SQS queue (standard or FIFO) read with long polling."""
+
+    def __init__(self, url):
+        import boto3
+        self.url = url
+        region = url.split(".")[1] if url.startswith("https://sqs.") else os.environ.get("AWS_REGION", "us-west-1")
+        self.sqs = boto3.client("sqs", region_name=region)
+
+    def send(self, record_id):
+        params = {"QueueUrl": self.url, "MessageBody": json.dumps({"record_id": record_id})}
+        if self.url.endswith(".fifo"):
+            params["MessageGroupId"] = record_id
+            params["MessageDeduplicationId"] = record_id
+        self.sqs.send_message(**params)
+
+    def receive(self, wait_seconds=20, max_messages=10):
+        """Block up to wait_seconds (max 20) for messages. Returns [(record_id, receipt)]."""
+        response = self.sqs.receive_message(
+            QueueUrl=self.url,
+            MaxNumberOfMessages=max_messages,
+            WaitTimeSeconds=min(wait_seconds, 20),
+            VisibilityTimeout=VISIBILITY_TIMEOUT,
+        )
+        return [(parse_message(m["Body"]), m["ReceiptHandle"]) for m in response.get("Messages", [])]
+
+    def delete(self, receipt):
+        self.sqs.delete_message(QueueUrl=self.url, ReceiptHandle=receipt)
+
+    def extend(self, receipt, seconds=VISIBILITY_TIMEOUT):
+        """Keep a received message hidden for another `seconds` from now."""
+        self.sqs.change_message_visibility(QueueUrl=self.url, ReceiptHandle=receipt, VisibilityTimeout=seconds)
+
+
+class SqliteFilingQueue:
+    """SQS-like queue in a local SQLite file: visibility timeout, at-least-once delivery."""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " id TEXT PRIMARY KEY, body TEXT NOT NULL, visible_at REAL NOT NULL, sent_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def send(self, record_id):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO messages (id, body, visible_at, sent_at) VALUES (?, ?, ?, ?)",
+                (uuid.uuid4().hex, json.dumps({"record_id": record_id}), now, now),
+            )
+
+    def receive(self, wait_seconds=20, max_messages=10):
+        deadline = time.time() + wait_seconds
+        while True:
+            db = self._connect()
+            try:
+                db.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                rows = db.execute(
+                    "SELECT id, body FROM messages WHERE visible_at <= ? ORDER BY sent_at LIMIT ?",
+                    (now, max_messages),
+                ).fetchall()
+                for message_id, _ in rows:
+                    db.execute(
+                        "UPDATE messages SET visible_at = ? WHERE id = ?", (now + VISIBILITY_TIMEOUT, message_id)
+                    )
+                db.execute("COMMIT")
+            finally:
+                db.close()
+            if rows or time.time() >= deadline:
+                return [(parse_message(body), message_id) for message_id, body in rows]
+            time.sleep(1)
+
+    def delete(self, receipt):
+        with self._connect() as db:
+            db.execute("DELETE FROM messages WHERE id = ?", (receipt,))
+
+    def extend(self, receipt, seconds=VISIBILITY_TIMEOUT):
+        with self._connect() as db:
+            db.execute("UPDATE messages SET visible_at = ? WHERE id = ?", (time.time() + seconds, receipt))
+
+    def peek(self):
+        with self._connect() as db:
+            return db.execute("SELECT body, visible_at FROM messages ORDER BY sent_at").fetchall()
+
+
+def open_filing_queue(url=None):
+    """Queue named by AUTOFILL_QUEUE_URL, or None when no queue is configured."""
+    url = url if url is not None else QUEUE_URL
+    if not url:
+        return None
+    if url.startswith("sqlite://"):
+        return SqliteFilingQueue(url[len("sqlite://"):])
+    if url.startswith("https://"):
+        return SqsFilingQueue(url)
+    raise ValueError(f"Unknown AUTOFILL_QUEUE_URL: {url!r} (use an SQS queue URL or sqlite:///path/to.db)")
+
+
+if __name__ == "__main__":
+    trigger_queue = open_filing_queue()
+    if trigger_queue is None:
+        print("\u274c Set AUTOFILL_QUEUE_URL (SQS queue URL or sqlite:///path/to.db)")
+        sys.exit(1)
+
+    if len(sys.argv) > 2 and sys.argv[1] == "send":
+        for rec_id in sys.argv[2:]:
+            if not rec_id.startswith("rec"):
+                print(f"\u274c Not an Airtable record ID: {rec_id}")
+                sys.exit(1)
+            trigger_queue.send(rec_id)
+            print(f"\u2705 Queued {rec_id}")
+    elif len(sys.argv) == 2 and sys.argv[1] == "peek" and isinstance(trigger_queue, SqliteFilingQueue):
+        for body, visible_at in trigger_queue.peek():
+            state = "visible" if visible_at <= time.time() else f"in flight ({int(visible_at - time.time())}s)"
+            print(f"   {body}  {state}")
+    else:
+        print("Usage:")
+        print("  python3 filing_queue.py send recXXX [recYYY ...]   # Queue records for filing")
+        print("  python3 filing_queue.py peek                       # List messages (sqlite queue only)")
+        sys.exit(1)
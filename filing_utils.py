@@ -9,17 +9,24 @@ import time
 import random
 import json
 import base64
+import shutil
+import atexit
 import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
 import boto3
 import requests
-from pyairtable import Api
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+from airtable_gateway import airtable, READ_MAX_AGE
+from filing_artifacts import artifacts
 
 # ==== CONFIG ====
 AIRTABLE_API_KEY = os.environ.get("AIRTABLE_API_KEY", "")
@@ -30,6 +37,51 @@ S3_BUCKET = 'llc-filing-audit-trail-rodolfo'
 REGION = 'us-west-1'
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
+# Warm browser pool (see acquire_browser / release_browser). The watcher owns the pool and
+# hands each filing a session as FILING_BROWSER="<geckodriver url>|<session id>"
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_FILINGS = int(os.environ.get("BROWSER_MAX_FILINGS", "20"))
+BROWSER_MAX_RSS_GROWTH_MB = int(os.environ.get("BROWSER_MAX_RSS_GROWTH_MB", "400"))
+
+# How form fields are filled (see fill_fields / fill_form_page):
+#   human   character by character with 30-120ms random delays (the original behaviour, default)
+#   keys    one send_keys per field
+#   script  one execute_script per page: set values and fire input/change events (opt-in, much faster)
+FILL_MODE = os.environ.get("FILING_FILL_MODE", "human")
+FILL_MODES = ("human", "keys", "script")
+CHECK = True  # field map value: tick this checkbox
+
+# Latency budget (seconds) per filing step: the step's waits give up after it.
+# Override with FILING_STEP_BUDGETS="start_filing=45,continue=60".
+STEP_BUDGETS = {
+    "open_form": 60,
+    "disclaimer": 15,
+    "start_filing": 30,
+    "form_load": 25,
+    "fill_form": 300,
+    "continue": 30,
+    "payment_page": 30,
+    "payment_customer": 120,
+    "payment_card": 60,
+    "submit_payment": 60,
+}
+for _item in os.environ.get("FILING_STEP_BUDGETS", "").split(","):
+    if "=" in _item:
+        _step, _seconds = _item.split("=", 1)
+        STEP_BUDGETS[_step.strip()] = float(_seconds)
+
+# Condition waits re-check this often (WebDriverWait's default of 0.5s adds ~0.25s per wait)
+WAIT_POLL = 0.1
+
+# The address verification popup can open a moment after the card form renders (seconds to wait for it)
+ADDRESS_VERIFICATION_WAIT = 3
+# Notes for a filing whose payment went through but whose confirmation page never loaded
+UNCONFIRMED_NOTE = ("Payment submitted {when}, but the confirmation page didn't load: outcome unknown. "
+                    "Check Sunbiz and the 13_final_confirmation screenshot before re-filing")
+
+# One JSON line per filing with its step timeline (read by scripts/filing-step-times.py)
+FILING_TIMING_LOG = os.environ.get("FILING_TIMING_LOG", os.path.expanduser("~/sunbiz-filing-timings.jsonl"))
+
 # Avenida Legal address (used as default principal address and RA address)
 AVENIDA_LEGAL_ADDRESS = {
     "line1": "12550 Biscayne Blvd",
@@ -51,6 +103,45 @@ REGISTERED_AGENT = {
     "zip": AVENIDA_LEGAL_ADDRESS["zip"],
 }
 
+# ---- Field maps: (element id, dotted path into the data or callable(data)[, optional]) ----
+REGISTERED_AGENT_FIELDS = [
+    ("ra_name_last_name", "last_name"),
+    ("ra_name_first_name", "first_name"),
+    ("ra_addr1", "address1"),
+    ("ra_addr2", "address2"),
+    ("ra_city", "city"),
+    ("ra_st", lambda ra: ra.get("state", "FL"), True),  # Some forms hardcode FL
+    ("ra_zip", "zip"),
+    ("ra_signature", lambda ra: f"{ra['first_name']} {ra['last_name']}"),
+]
+
+CORRESPONDENCE_FIELDS = [
+    ("ret_name", "name"),
+    ("ret_email_addr", "email"),
+    ("email_addr_verify", "email"),
+]
+
+# Fills every field of a page in one round trip; returns the ids it couldn't find.
+# Values are cut to maxlength like typed input would be; true means "tick the checkbox"
+# (clicked in order, so onclick handlers such as "same as principal" see the values above).
+FILL_SCRIPT = """
+const missing = [];
+for (const [id, value] of arguments[0]) {
+    const el = document.getElementById(id);
+    if (!el) { missing.push(id); continue; }
+    if (value === true) {
+        if (!el.checked) el.click();
+        continue;
+    }
+    el.focus();
+    el.value = el.maxLength > 0 ? value.slice(0, el.maxLength) : value;
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.blur();
+}
+return missing;
+"""
+
 
 # ===================== UTILITIES =====================
 
@@ -63,6 +154,97 @@ def human_typing(element, text, min_delay=0.03, max_delay=0.12):
         time.sleep(random.uniform(min_delay, max_delay))
 
 
+def resolve_fields(field_map, data):
+    """Turn a field map into [(element_id, value, optional)] for fill_fields."""
+    fields = []
+    for element_id, spec, *optional in field_map:
+        if spec is CHECK:
+            value = CHECK
+        elif callable(spec):
+            value = spec(data)
+        else:
+            value = data
+            for part in spec.split("."):
+                value = value.get(part, "") if isinstance(value, dict) else ""
+        fields.append((element_id, value, bool(optional and optional[0])))
+    return fields
+
+
+def fill_fields(driver, fields, mode=None):
+    """
+    Fill [(element_id, value, optional)] in order using the FILL_MODE strategy.
+    Empty values are skipped and CHECK ticks a checkbox. Raises RuntimeError if a
+    required field is missing; returns the ids of missing optional fields.
+    """
+    mode = mode or FILL_MODE
+    if mode not in FILL_MODES:
+        raise ValueError(f"Unknown FILING_FILL_MODE: {mode!r} (use one of {', '.join(FILL_MODES)})")
+    fields = [(element_id, value, optional) for element_id, value, optional in fields if value not in ("", None)]
+    optional_ids = {element_id for element_id, _, optional in fields if optional}
+
+    if mode == "script":
+        missing = driver.execute_script(
+            FILL_SCRIPT, [[element_id, value if value is CHECK else str(value)] for element_id, value, _ in fields]
+        )
+        required = [element_id for element_id in missing if element_id not in optional_ids]
+        if required:
+            raise RuntimeError(f"Form field(s) not found: {', '.join(required)}")
+        return missing
+
+    missing = []
+    for element_id, value, optional in fields:
+        try:
+            element = driver.find_element(By.ID, element_id)
+        except Exception:
+            if not optional:
+                raise
+            missing.append(element_id)
+            continue
+        if value is CHECK:
+            # Blur the last field first so its onchange handlers run (synchronously, before the click)
+            driver.find_element(By.TAG_NAME, "body").click()
+            if not element.is_selected():
+                element.click()
+        elif mode == "human":
+            human_typing(element, value)
+        else:
+            element.send_keys(str(value))
+    return missing
+
+
+def fill_form_page(driver, sections, company_name, page, mode=None):
+    """
+    Fill a form page declared as sections [(title, key, screenshot_label, fields)].
+
+    human/keys: section by section, screenshot after each, ERROR_<key> screenshot on failure.
+    script:     the whole page in one execute_script, then one screenshot.
+    Timed as the 'fill_form' step. Returns the ids of optional fields not on the page.
+    """
+    mode = mode or FILL_MODE
+    field_count = sum(len(fields) for _, _, _, fields in sections)
+    missing = []
+    print(f"  \U0001f4dd Filling {page} ({mode}, {field_count} fields)...")
+
+    with filing_step("fill_form"):
+        if mode == "script":
+            try:
+                missing = fill_fields(driver, [f for _, _, _, fields in sections for f in fields], mode)
+            except Exception as e:
+                take_and_upload_screenshot(driver, f"ERROR_{page.replace(' ', '_')}", company_name)
+                raise RuntimeError(f"Failed filling {page}: {e}") from e
+            take_and_upload_screenshot(driver, sections[-1][2], company_name)
+        else:
+            for title, key, label, fields in sections:
+                try:
+                    print(f"  \U0001f4dd Filling {title}...")
+                    missing += fill_fields(driver, fields, mode)
+                    take_and_upload_screenshot(driver, label, company_name)
+                except Exception as e:
+                    take_and_upload_screenshot(driver, f"ERROR_{key}", company_name)
+                    raise RuntimeError(f"Failed filling {title}: {e}") from e
+    return missing
+
+
 def screenshot(driver, label):
     """Take a screenshot and return the local filename."""
     filename = f"{label}.png"
@@ -71,23 +253,26 @@ def screenshot(driver, label):
 
 
 def upload_file_to_s3(filepath, company_name, category):
-    """Upload a local file to S3 under {company_name}/{category}/."""
-    s3 = boto3.client("s3", region_name=REGION)
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = os.path.basename(filepath)
-    key = f"{company_name}/{category}/{timestamp}_{filename}"
+    """
+    Queue a local file for upload to S3 under {company_name}/{category}/ (filing_artifacts).
+    The contents are read now, so the file may be rewritten or removed right after.
+    """
     try:
-        s3.upload_file(filepath, S3_BUCKET, key)
-        print(f"  \u2705 Uploaded {filename} to s3://{S3_BUCKET}/{key}")
-    except Exception as e:
-        print(f"  \u274c Failed to upload {filename}: {e}")
+        with open(filepath, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        print(f"  \u274c Failed to upload {os.path.basename(filepath)}: {e}")
+        return
+    artifacts(S3_BUCKET, REGION).put_file(data, os.path.basename(filepath), company_name, category)
 
 
 def take_and_upload_screenshot(driver, label, company_name):
-    """Convenience: screenshot + upload to S3 in one call."""
-    filepath = screenshot(driver, label)
-    upload_file_to_s3(filepath, company_name, "screenshots")
-    return filepath
+    """
+    Screenshot straight to memory and queue it for compression + upload (filing_artifacts).
+    Returns immediately; identical consecutive frames are not uploaded.
+    """
+    artifacts(S3_BUCKET, REGION).put_screenshot(driver.get_screenshot_as_png(), label, company_name)
+    return label
 
 
 def fetch_payment_data_from_ssm(company_name):
@@ -107,25 +292,63 @@ def fetch_payment_data_from_ssm(company_name):
     return payment_data
 
 
+_run_steps = []          # step timeline of the current filing, written out by save_run_log
+_run_started = None
+
+
+@contextmanager
+def filing_step(name, budget_key=None):
+    """
+    Time one step of the filing flow and yield its latency budget (STEP_BUDGETS) for the
+    step's WebDriverWaits. The step goes into the run timeline whether it succeeds or raises.
+    """
+    global _run_started
+    budget = STEP_BUDGETS.get(budget_key or name, 30)
+    started = time.time()
+    if _run_started is None:
+        _run_started = started
+    ok = False
+    try:
+        yield budget
+        ok = True
+    finally:
+        seconds = time.time() - started
+        _run_steps.append({
+            "step": name,
+            "offset": round(started - _run_started, 3),
+            "seconds": round(seconds, 3),
+            "budget": budget,
+            "ok": ok,
+        })
+        status = "" if ok else " FAILED"
+        over = " \u26a0\ufe0f over budget" if seconds > budget else ""
+        print(f"  \u23f1\ufe0f {name}: {seconds:.1f}s (budget {budget:g}s){status}{over}")
+
+
 # ===================== AIRTABLE =====================
 
 def fetch_airtable_record(record_id):
-    """Fetch a single Airtable record by ID. Returns (record_dict, fields_dict)."""
-    api = Api(AIRTABLE_API_KEY)
-    table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
-    record = table.get(record_id)
+    """
+    Fetch a single Airtable record by ID (from the mirror if recently synced).
+    Returns (record_dict, fields_dict).
+    """
+    record = airtable().get(record_id, max_age=READ_MAX_AGE)
     return record, record["fields"]
 
 
-def update_airtable_status(record_id, new_status, notes=None):
-    """Update Formation Status (and optionally Notes) in Airtable."""
-    api = Api(AIRTABLE_API_KEY)
-    table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
+def update_airtable_status(record_id, new_status, notes=None, defer=False):
+    """
+    Update Formation Status (and optionally Notes) in Airtable.
+    With defer=True the change rides along with the record's next update (one PATCH).
+    """
     update_fields = {"Formation Status": new_status}
     if notes:
         update_fields["Notes"] = notes
-    table.update(record_id, update_fields)
-    print(f"\u2705 Updated Airtable status to: {new_status}")
+    airtable().update(record_id, update_fields, defer=defer)
+    if defer:
+        print(f"\U0001f4dd Airtable status queued: {new_status}")
+    else:
+        print(f"\u2705 Updated Airtable status to: {new_status}")
 
 
 # ===================== ADDRESS / NAME PARSING =====================
@@ -269,8 +492,8 @@ def translate_business_purpose(text):
 
 # ===================== BROWSER =====================
 
-def init_browser():
-    """Initialize Firefox browser for Selenium automation."""
+def init_browser(headless=None):
+    """Initialize Firefox browser for Selenium automation (headless defaults to FILING_HEADLESS)."""
     options = Options()
     profile_dir = tempfile.mkdtemp(prefix="firefox_selenium_")
     options.add_argument("-profile")
@@ -285,12 +508,251 @@ def init_browser():
     # Disable other popups that can interfere with automation
     options.set_preference("dom.webnotifications.enabled", False)
     options.set_preference("browser.urlbar.suggest.searches", False)
+    # Alerts stay open until we handle them, instead of being dismissed by the next wait's poll
+    options.unhandled_prompt_behavior = "ignore"
+    # Lets reset_browser clear cookies/storage for every site from the chrome context
+    options.add_argument("-remote-allow-system-access")
+    # Concurrent watcher workers each get their own headless Firefox instead of the shared display
+    if headless is None:
+        headless = os.environ.get("FILING_HEADLESS") == "1"
+    if headless:
+        options.add_argument("-headless")
     driver = webdriver.Firefox(options=options)
+    driver.profile_dir = profile_dir
     return driver
 
 
+def quit_browser(driver):
+    """Quit the browser and remove its temp profile."""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    profile_dir = getattr(driver, "profile_dir", None)
+    if profile_dir:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def browser_rss_mb(driver):
+    """Resident memory of the Firefox parent process plus its content processes (Linux /proc)."""
+    pid = driver.capabilities.get("moz:processID")
+    if not pid:
+        return 0
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except Exception:
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except Exception:
+            continue
+    return total_kb // 1024
+
+
+def browser_is_healthy(driver):
+    """Cheap liveness check: the session answers and has a window to drive."""
+    try:
+        driver.set_script_timeout(5)
+        return bool(driver.window_handles) and driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+def reset_browser(driver):
+    """
+    Return a used session to a clean state: one fresh blank tab, no cookies,
+    no local/session storage, no cache. Raises if the state cannot be cleared.
+    """
+    try:
+        WebDriverWait(driver, 1).until(EC.alert_is_present()).dismiss()
+    except Exception:
+        pass
+
+    old_handles = list(driver.window_handles)
+    driver.switch_to.new_window("tab")
+    fresh = driver.current_window_handle
+    for handle in old_handles:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(fresh)
+
+    # Cookies and storage are per-site, so clear them for every site at once from chrome context
+    with driver.context(driver.CONTEXT_CHROME):
+        driver.execute_async_script("""
+            const done = arguments[arguments.length - 1];
+            Services.cookies.removeAll();
+            Services.clearData.deleteData(
+                Ci.nsIClearDataService.CLEAR_DOM_STORAGES | Ci.nsIClearDataService.CLEAR_ALL_CACHES,
+                () => done(true));
+        """)
+
+
+class AttachedFirefox(webdriver.Remote):
+    """WebDriver for a Firefox session another process launched and owns (the watcher's pool)."""
+
+    def __init__(self, address):
+        self._attach_to = address.split("|", 1)
+        super().__init__(command_executor=self._attach_to[0], options=Options())
+
+    def start_session(self, capabilities):
+        self.session_id = self._attach_to[1]
+        self.caps = {"browserName": "firefox"}
+
+    def quit(self):
+        """The owner resets or quits the session; just drop our connection."""
+        self.command_executor.close()
+
+
+def browser_address(driver):
+    """'<geckodriver url>|<session id>' for handing a pooled session to a filing (see AttachedFirefox)."""
+    return f"{driver.service.service_url}|{driver.session_id}"
+
+
+_browser_pool = []       # idle sessions: {"driver", "filings", "baseline_mb", "started", "headless"}
+_browser_leases = {}     # id(driver) -> session while borrowed
+_browser_lock = threading.Lock()
+
+
+def acquire_browser(headless=None):
+    """
+    Borrow a warm Firefox session from the pool, launching one if none is idle.
+    A filing launched by the watcher drives the session named in FILING_BROWSER instead.
+    Always pair with release_browser(driver).
+    """
+    if os.environ.get("FILING_BROWSER"):
+        print("\U0001f98a Driving the watcher's warm Firefox session")
+        return AttachedFirefox(os.environ["FILING_BROWSER"])
+
+    if headless is None:
+        headless = os.environ.get("FILING_HEADLESS") == "1"
+    while True:
+        with _browser_lock:
+            matching = [s for s in _browser_pool if s["headless"] == headless]
+            session = matching[-1] if matching else None
+            if session:
+                _browser_pool.remove(session)
+        if session is None:
+            break
+        if browser_is_healthy(session["driver"]):
+            print(f"\U0001f98a Reusing warm Firefox session ({session['filings']} filing(s) so far)")
+            with _browser_lock:
+                _browser_leases[id(session["driver"])] = session
+            return session["driver"]
+        print("\u26a0\ufe0f Pooled Firefox session failed health check, discarding")
+        quit_browser(session["driver"])
+
+    print("\U0001f98a Starting Firefox browser...")
+    started = time.time()
+    driver = init_browser(headless)
+    session = {
+        "driver": driver,
+        "filings": 0,
+        "baseline_mb": browser_rss_mb(driver),
+        "started": started,
+        "headless": headless,
+    }
+    print(f"   \u23f1\ufe0f Firefox ready in {time.time() - started:.1f}s")
+    with _browser_lock:
+        _browser_leases[id(driver)] = session
+    return driver
+
+
+def release_browser(driver, discard=False):
+    """
+    Give a borrowed session back. It is reset and kept warm unless it has done
+    BROWSER_MAX_FILINGS filings, grown BROWSER_MAX_RSS_GROWTH_MB past its launch
+    footprint, failed to reset, the pool is already full, or discard is set (e.g.
+    its filing was killed mid-step); then it is quit. An attached session is left
+    to its owner.
+    """
+    if isinstance(driver, AttachedFirefox):
+        driver.quit()
+        return
+    with _browser_lock:
+        session = _browser_leases.pop(id(driver), None)
+    if session is None:
+        quit_browser(driver)
+        return
+
+    session["filings"] += 1
+    reason = None
+    if discard:
+        reason = "filing was stopped"
+    elif session["filings"] >= BROWSER_MAX_FILINGS:
+        reason = f"{session['filings']} filings"
+    else:
+        growth = browser_rss_mb(driver) - session["baseline_mb"]
+        if growth > BROWSER_MAX_RSS_GROWTH_MB:
+            reason = f"memory grew {growth} MB"
+    if reason is None:
+        try:
+            reset_browser(driver)
+        except Exception as e:
+            reason = f"reset failed: {e}"
+
+    with _browser_lock:
+        if reason is None and len(_browser_pool) < BROWSER_POOL_SIZE:
+            _browser_pool.append(session)
+            return
+    print(f"\u267b\ufe0f Recycling Firefox session ({reason or 'pool full'})")
+    quit_browser(driver)
+
+
+@atexit.register
+def close_browser_pool():
+    """Quit every idle pooled session (runs at interpreter exit)."""
+    with _browser_lock:
+        sessions = list(_browser_pool)
+        _browser_pool.clear()
+    for session in sessions:
+        quit_browser(session["driver"])
+
+
 # ===================== SUNBIZ COMMON STEPS =====================
 
+def page_settled(driver):
+    """WebDriverWait condition: document fully loaded and no jQuery requests in flight."""
+    return driver.execute_script(
+        "return document.readyState === 'complete' && (!window.jQuery || jQuery.active === 0);"
+    )
+
+
+def click_and_wait_for_page(driver, element, budget):
+    """
+    Click a control that submits or navigates, then wait (up to budget seconds) for the
+    old page to go away and the new one to settle. An alert raised by the click is
+    accepted first. Returns the alert text, or None.
+    """
+    url = driver.current_url
+    element.click()
+    page_wait = WebDriverWait(driver, budget, poll_frequency=WAIT_POLL)
+    result = page_wait.until(EC.any_of(EC.alert_is_present(), EC.staleness_of(element), EC.url_changes(url)))
+    alert_text = None
+    if result is not True:
+        alert_text = result.text
+        print(f"  \u2139\ufe0f Accepting alert: {alert_text}")
+        result.accept()
+        page_wait.until(EC.any_of(EC.staleness_of(element), EC.url_changes(url)))
+    page_wait.until(page_settled)
+    return alert_text
+
+
 def accept_disclaimer_and_start(driver, wait, company_name):
     """
     Accept the Sunbiz disclaimer checkbox and click 'Start New Filing'.
@@ -298,165 +760,188 @@ def accept_disclaimer_and_start(driver, wait, company_name):
     """
     take_and_upload_screenshot(driver, "01_start", company_name)
 
-    try:
-        disclaimer = wait.until(EC.element_to_be_clickable((By.ID, "disclaimer_read")))
-        disclaimer.click()
-    except Exception:
-        # Fallback: try checkbox by label text
-        disclaimer = driver.find_element(
-            By.XPATH,
-            "//input[@type='checkbox' and (contains(../., 'accept the terms') or contains(../., 'read and accept'))]",
+    with filing_step("disclaimer") as budget:
+        page_wait = WebDriverWait(driver, budget, poll_frequency=WAIT_POLL)
+        try:
+            disclaimer = page_wait.until(EC.element_to_be_clickable((By.ID, "disclaimer_read")))
+            disclaimer.click()
+        except Exception:
+            # Fallback: try checkbox by label text
+            disclaimer = driver.find_element(
+                By.XPATH,
+                "//input[@type='checkbox' and (contains(../., 'accept the terms') or contains(../., 'read and accept'))]",
+            )
+            driver.execute_script("arguments[0].click();", disclaimer)
+
+        # The checkbox's onclick enables the start button
+        start_btn = page_wait.until(
+            EC.presence_of_element_located((By.XPATH, "//input[@value='Start New Filing']"))
         )
-        driver.execute_script("arguments[0].click();", disclaimer)
+        page_wait.until(lambda d: start_btn.get_attribute("disabled") is None)
 
-    time.sleep(1.5)
-
-    start_btn = driver.find_element(By.XPATH, "//input[@value='Start New Filing']")
-    WebDriverWait(driver, 10).until(lambda d: start_btn.get_attribute("disabled") is None)
-    start_btn.click()
-    time.sleep(3)
+    with filing_step("start_filing") as budget:
+        click_and_wait_for_page(driver, start_btn, budget)
 
     take_and_upload_screenshot(driver, "02_form_loaded", company_name)
 
 
-def wait_for_form_field(driver, field_id, timeout=25):
+def wait_for_form_field(driver, field_id, timeout=None):
     """
-    Wait for a form field to appear (handle possible iframes).
+    Wait for a form field to appear (handle possible iframes) and accept input.
     Returns the WebElement or raises RuntimeError.
     """
-    page_wait = WebDriverWait(driver, timeout)
-    element = None
-    try:
-        element = page_wait.until(EC.presence_of_element_located((By.ID, field_id)))
-    except Exception:
-        iframes = driver.find_elements(By.TAG_NAME, "iframe")
-        for iframe in iframes:
-            try:
-                driver.switch_to.frame(iframe)
-                element = page_wait.until(EC.presence_of_element_located((By.ID, field_id)))
-                break
-            except Exception:
-                driver.switch_to.default_content()
-                continue
+    with filing_step("form_load") as budget:
+        page_wait = WebDriverWait(driver, timeout or budget, poll_frequency=WAIT_POLL)
+        element = None
+        try:
+            element = page_wait.until(EC.presence_of_element_located((By.ID, field_id)))
+        except Exception:
+            iframes = driver.find_elements(By.TAG_NAME, "iframe")
+            for iframe in iframes:
+                try:
+                    driver.switch_to.frame(iframe)
+                    element = page_wait.until(EC.presence_of_element_located((By.ID, field_id)))
+                    break
+                except Exception:
+                    driver.switch_to.default_content()
+                    continue
 
-    if element is None:
-        raise RuntimeError(f"Form did not load: field '{field_id}' not found (check screenshots)")
+        if element is None:
+            raise RuntimeError(f"Form did not load: field '{field_id}' not found (check screenshots)")
 
-    page_wait.until(EC.visibility_of(element))
-    time.sleep(0.5)
-    return element
+        page_wait.until(EC.element_to_be_clickable(element))
+        return element
 
 
-def fill_registered_agent(driver, company_name, ra=None):
-    """Fill the Registered Agent section (same field IDs for LLC and Corp)."""
-    if ra is None:
-        ra = REGISTERED_AGENT
+def registered_agent_fields(ra=None):
+    """Resolved Registered Agent fields (same field IDs for LLC and Corp)."""
+    return resolve_fields(REGISTERED_AGENT_FIELDS, ra or REGISTERED_AGENT)
+
+
+def correspondence_fields(contact_name, email):
+    """Resolved return contact / correspondence fields."""
+    return resolve_fields(CORRESPONDENCE_FIELDS, {"name": contact_name, "email": email})
 
-    print("  \U0001f4dd Filling Registered Agent...")
-    human_typing(driver.find_element(By.ID, "ra_name_last_name"), ra["last_name"])
-    human_typing(driver.find_element(By.ID, "ra_name_first_name"), ra["first_name"])
-    human_typing(driver.find_element(By.ID, "ra_addr1"), ra["address1"])
-    human_typing(driver.find_element(By.ID, "ra_addr2"), ra.get("address2", ""))
-    human_typing(driver.find_element(By.ID, "ra_city"), ra["city"])
-    try:
-        human_typing(driver.find_element(By.ID, "ra_st"), ra.get("state", "FL"))
-    except Exception:
-        pass  # Some forms hardcode FL
-    human_typing(driver.find_element(By.ID, "ra_zip"), ra["zip"])
-    human_typing(driver.find_element(By.ID, "ra_signature"), f"{ra['first_name']} {ra['last_name']}")
 
+def fill_registered_agent(driver, company_name, ra=None, mode=None):
+    """Fill the Registered Agent section on its own (the form fillers include it in their page)."""
+    print("  \U0001f4dd Filling Registered Agent...")
+    fill_fields(driver, registered_agent_fields(ra), mode)
     take_and_upload_screenshot(driver, "04_ra_filled", company_name)
 
 
-def fill_correspondence(driver, contact_name, email, company_name):
-    """Fill the return contact / correspondence section."""
+def fill_correspondence(driver, contact_name, email, company_name, mode=None):
+    """Fill the return contact / correspondence section on its own."""
     print("  \U0001f4dd Filling correspondence...")
-    human_typing(driver.find_element(By.ID, "ret_name"), contact_name)
-    human_typing(driver.find_element(By.ID, "ret_email_addr"), email)
-    human_typing(driver.find_element(By.ID, "email_addr_verify"), email)
-
+    fill_fields(driver, correspondence_fields(contact_name, email), mode)
     take_and_upload_screenshot(driver, "07_contact_filled", company_name)
 
 
-def fill_payment_and_submit(driver, wait, payment, company_name):
-    """Fill the payment form and submit (shared between LLC and Corp)."""
-    print("\U0001f4b3 Proceeding to payment page...")
-    wait.until(EC.element_to_be_clickable(
-        (By.XPATH, "//input[@type='submit' and @value='Credit Card Payment']")
-    )).click()
-
-    take_and_upload_screenshot(driver, "11_payment_start", company_name)
-
-    print("\U0001f4b3 Filling payment information...")
-    human_typing(
-        wait.until(EC.presence_of_element_located((By.ID, "CustomerInfo_FirstName"))),
-        payment["pay_first"],
-    )
-    human_typing(driver.find_element(By.ID, "CustomerInfo_LastName"), payment["pay_last"])
-    human_typing(driver.find_element(By.ID, "CustomerInfo_Address1"), payment["pay_address"])
-    human_typing(driver.find_element(By.ID, "CustomerInfo_City"), payment["pay_city"])
-    Select(driver.find_element(By.ID, "CustomerInfo_State")).select_by_value(payment["pay_state"])
-    human_typing(driver.find_element(By.ID, "CustomerInfo_Zip"), payment["pay_zip"])
-    human_typing(driver.find_element(By.ID, "Phone"), payment["pay_phone"])
-    human_typing(driver.find_element(By.ID, "Email"), payment["pay_email"])
-    wait.until(EC.element_to_be_clickable((By.ID, "bntNextCustomerInfo"))).click()
-
-    # Handle address verification popup
+def dismiss_address_verification(driver, timeout):
+    """Accept the payment form's address verification popup if it comes up within timeout seconds."""
     try:
-        time.sleep(2)
-        wait.until(EC.element_to_be_clickable((By.ID, "btn-address-verification"))).click()
-    except Exception:
-        pass
-
-    time.sleep(5)
-    print("\U0001f4b3 Entering credit card details...")
+        WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(
+            EC.element_to_be_clickable((By.ID, "btn-address-verification"))
+        ).click()
+    except TimeoutException:
+        return False
+    print("  \u2139\ufe0f Accepted address verification")
+    return True
 
-    cc_field = wait.until(EC.presence_of_element_located((By.ID, "CCCardNumber")))
-    driver.execute_script("arguments[0].scrollIntoView(true);", cc_field)
-    time.sleep(2)
 
-    try:
-        cc_field.click()
-        time.sleep(0.5)
-        human_typing(cc_field, payment["cc_number"])
-    except Exception as e:
-        print(f"  \u26a0\ufe0f Regular typing failed, trying JavaScript: {e}")
-        driver.execute_script(
-            f"document.getElementById('CCCardNumber').value = '{payment['cc_number']}';"
-        )
-
-    Select(driver.find_element(By.ID, "CCExpirationMonth")).select_by_value(payment["cc_exp_month"])
-    Select(driver.find_element(By.ID, "CCExpirationYear")).select_by_value(payment["cc_exp_year"])
-    human_typing(driver.find_element(By.ID, "CCCardCVV"), payment["cc_cvv"])
-    human_typing(driver.find_element(By.ID, "CCNameOnCard"), payment["cc_name"])
+def fill_payment_and_submit(driver, wait, payment, company_name):
+    """
+    Fill the payment form and submit (shared between LLC and Corp). Returns True once the
+    confirmation page has loaded, False if it didn't within the step budget: the payment
+    was submitted, so whether the filing went through is unknown.
+    """
+    with filing_step("payment_page") as budget:
+        print("\U0001f4b3 Proceeding to payment page...")
+        page_wait = WebDriverWait(driver, budget, poll_frequency=WAIT_POLL)
+        page_wait.until(EC.element_to_be_clickable(
+            (By.XPATH, "//input[@type='submit' and @value='Credit Card Payment']")
+        )).click()
+        first_name = page_wait.until(EC.element_to_be_clickable((By.ID, "CustomerInfo_FirstName")))
+
+        take_and_upload_screenshot(driver, "11_payment_start", company_name)
+
+    with filing_step("payment_customer") as budget:
+        print("\U0001f4b3 Filling payment information...")
+        page_wait = WebDriverWait(driver, budget, poll_frequency=WAIT_POLL)
+        human_typing(first_name, payment["pay_first"])
+        human_typing(driver.find_element(By.ID, "CustomerInfo_LastName"), payment["pay_last"])
+        human_typing(driver.find_element(By.ID, "CustomerInfo_Address1"), payment["pay_address"])
+        human_typing(driver.find_element(By.ID, "CustomerInfo_City"), payment["pay_city"])
+        Select(driver.find_element(By.ID, "CustomerInfo_State")).select_by_value(payment["pay_state"])
+        human_typing(driver.find_element(By.ID, "CustomerInfo_Zip"), payment["pay_zip"])
+        human_typing(driver.find_element(By.ID, "Phone"), payment["pay_phone"])
+        human_typing(driver.find_element(By.ID, "Email"), payment["pay_email"])
+        page_wait.until(EC.element_to_be_clickable((By.ID, "bntNextCustomerInfo"))).click()
+
+        # Either the address verification popup or the card form comes up next
+        shown = page_wait.until(EC.any_of(
+            EC.element_to_be_clickable((By.ID, "btn-address-verification")),
+            EC.element_to_be_clickable((By.ID, "CCCardNumber")),
+        ))
+        if shown.get_attribute("id") == "btn-address-verification":
+            shown.click()
+        else:
+            # The card form can render before the popup opens over it
+            dismiss_address_verification(driver, ADDRESS_VERIFICATION_WAIT)
 
-    take_and_upload_screenshot(driver, "12_payment_filled", company_name)
+    with filing_step("payment_card") as budget:
+        print("\U0001f4b3 Entering credit card details...")
+        page_wait = WebDriverWait(driver, budget, poll_frequency=WAIT_POLL)
+        cc_field = page_wait.until(EC.presence_of_element_located((By.ID, "CCCardNumber")))
+        driver.execute_script("arguments[0].scrollIntoView(true);", cc_field)
 
-    # Submit payment
-    wait.until(EC.element_to_be_clickable((By.ID, "bntNextPaymentInfo"))).click()
-    wait.until(EC.element_to_be_clickable((By.ID, "submitPayment"))).click()
+        try:
+            page_wait.until(EC.element_to_be_clickable(cc_field)).click()
+            page_wait.until(lambda d: d.switch_to.active_element == cc_field)
+            human_typing(cc_field, payment["cc_number"])
+        except Exception as e:
+            print(f"  \u26a0\ufe0f Regular typing failed, trying JavaScript: {e}")
+            driver.execute_script(
+                f"document.getElementById('CCCardNumber').value = '{payment['cc_number']}';"
+            )
+
+        Select(driver.find_element(By.ID, "CCExpirationMonth")).select_by_value(payment["cc_exp_month"])
+        Select(driver.find_element(By.ID, "CCExpirationYear")).select_by_value(payment["cc_exp_year"])
+        human_typing(driver.find_element(By.ID, "CCCardCVV"), payment["cc_cvv"])
+        human_typing(driver.find_element(By.ID, "CCNameOnCard"), payment["cc_name"])
+
+        take_and_upload_screenshot(driver, "12_payment_filled", company_name)
+
+    with filing_step("submit_payment") as budget:
+        page_wait = WebDriverWait(driver, budget, poll_frequency=WAIT_POLL)
+        # A popup that opened while the card was typed would swallow the click
+        dismiss_address_verification(driver, 0)
+        page_wait.until(EC.element_to_be_clickable((By.ID, "bntNextPaymentInfo"))).click()
+        submit = page_wait.until(EC.element_to_be_clickable((By.ID, "submitPayment")))
+        confirmed = True
+        try:
+            click_and_wait_for_page(driver, submit, budget)
+        except TimeoutException:
+            # The charge is already in flight: a slow confirmation page must not fail (and re-file)
+            # the record, but the caller has to report the outcome as unknown
+            print(f"  \u26a0\ufe0f Confirmation page not loaded after {budget:g}s: filing outcome unknown")
+            confirmed = False
 
-    take_and_upload_screenshot(driver, "13_final_confirmation", company_name)
+        take_and_upload_screenshot(driver, "13_final_confirmation", company_name)
+    return confirmed
 
 
 def click_continue_through_pages(driver, wait, num_continues, company_name):
     """Click 'Continue' submit buttons, handling alert popups."""
     print("  \u23ed\ufe0f Processing form pages...")
     for i in range(num_continues):
-        try:
-            wait.until(EC.element_to_be_clickable(
-                (By.XPATH, "//input[@type='submit' and @value='Continue']")
-            )).click()
-        except Exception:
-            # Fallback: try any submit button
-            wait.until(EC.element_to_be_clickable(
-                (By.XPATH, "//input[@type='submit']")
-            )).click()
-        time.sleep(2)
-        try:
-            WebDriverWait(driver, 2).until(EC.alert_is_present()).accept()
-        except Exception:
-            pass
+        with filing_step(f"continue_{i+1}", "continue") as budget:
+            # Prefer 'Continue'; fall back to any submit button
+            button = WebDriverWait(driver, budget, poll_frequency=WAIT_POLL).until(EC.any_of(
+                EC.element_to_be_clickable((By.XPATH, "//input[@type='submit' and @value='Continue']")),
+                EC.element_to_be_clickable((By.XPATH, "//input[@type='submit']")),
+            ))
+            click_and_wait_for_page(driver, button, budget)
         take_and_upload_screenshot(driver, f"10_after_continue_{i+1}", company_name)
 
 
@@ -486,7 +971,15 @@ def validate_required_fields(data, required_keys, entity_type="LLC"):
 
 
 def save_run_log(company_name, record_id, entity_type, extra_info=None):
-    """Save a run log and upload to S3."""
+    """
+    Save a run log (with the step timeline) and upload to S3, and append the
+    timeline to FILING_TIMING_LOG. Resets the timeline for the next filing.
+    """
+    global _run_started
+    steps = list(_run_steps)
+    _run_steps.clear()
+    _run_started = None
+
     log_path = "run.log"
     with open(log_path, "w") as f:
         f.write(f"Company Name: {company_name}\n")
@@ -495,4 +988,41 @@ def save_run_log(company_name, record_id, entity_type, extra_info=None):
         f.write(f"Timestamp: {datetime.now().isoformat()}\n")
         if extra_info:
             f.write(f"Extra: {extra_info}\n")
+        if steps:
+            f.write("Steps:\n")
+            for s in steps:
+                status = "ok" if s["ok"] else "FAILED"
+                f.write(f"  +{s['offset']:7.1f}s  {s['step']:<18} {s['seconds']:7.1f}s / {s['budget']:g}s  {status}\n")
     upload_file_to_s3(log_path, company_name.replace(" ", "_"), "logs")
+
+    if steps:
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "company": company_name,
+            "record_id": record_id,
+            "entity_type": entity_type,
+            "steps_ok": all(s["ok"] for s in steps),
+            "total_seconds": round(steps[-1]["offset"] + steps[-1]["seconds"], 3),
+            "steps": steps,
+        }
+        try:
+            with open(FILING_TIMING_LOG, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"\u26a0\ufe0f Could not write timing log {FILING_TIMING_LOG}: {e}")
+
+
+def typical_filing_seconds(last=200):
+    """Median total time of the last `last` filings in FILING_TIMING_LOG, or None if there are none."""
+    totals = []
+    try:
+        with open(FILING_TIMING_LOG) as f:
+            for line in f:
+                try:
+                    totals.append(json.loads(line)["total_seconds"])
+                except (ValueError, KeyError):
+                    continue  # partially written line
+    except OSError:
+        return None
+    totals = sorted(totals[-last:])
+    return totals[len(totals) // 2] if totals else None
@@ -1,10 +1,14 @@
 import os
 import json
 import tempfile
+import hashlib
+import time
 from datetime import datetime
 from reportlab.pdfgen import canvas
 from PyPDF2 import PdfReader, PdfWriter
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 
 # Constants
 BUCKET_NAME = os.environ.get('BUCKET_NAME', 'ss4-template-bucket-043206426879')
@@ -13,6 +17,30 @@ OUTPUT_BUCKET = os.environ.get('OUTPUT_BUCKET', 'avenida-legal-documents')
 # Initialize AWS Translate client
 translate_client = boto3.client('translate', region_name='us-west-1')
 
+# Download links for response_mode "url" / "stream" (see link_response)
+RESPONSE_MODES = ("base64", "url", "stream")
+PRESIGN_REGION = os.environ.get('PRESIGN_REGION', 'us-west-1')
+PRESIGN_EXPIRES = int(os.environ.get('PRESIGN_EXPIRES', '300'))
+_presign_client = None
+
+# Render cache: same template ETag + generator code + form_data -> server-side copy of the stored file
+RENDER_CACHE = os.environ.get('RENDER_CACHE', '1') != '0'
+RENDER_CACHE_BUCKET = os.environ.get('RENDER_CACHE_BUCKET', '')  # default: the request's s3_bucket
+RENDER_CACHE_PREFIX = os.environ.get('RENDER_CACHE_PREFIX', 'render-cache/')
+RENDER_CACHE_NAME = '8821'
+with open(__file__, 'rb') as _src:
+    # Any change to this file invalidates its cached renders
+    GENERATOR_VERSION = os.environ.get('GENERATOR_VERSION') or hashlib.sha256(_src.read()).hexdigest()[:16]
+_render_stats = {}
+
+# Template manifest (scripts/build-template-manifest.py): variant -> bucket/key/ETag/size, loaded at init
+TEMPLATE_MANIFEST = os.environ.get('TEMPLATE_MANIFEST', 's3://company-formation-template-llc-and-inc/template-manifest.json')
+TEMPLATE_MANIFEST_TTL = int(os.environ.get('TEMPLATE_MANIFEST_TTL', '300'))
+TEMPLATE_PREFETCH = int(os.environ.get('TEMPLATE_PREFETCH', '1'))
+TEMPLATE_MEMORY_ITEMS = int(os.environ.get('TEMPLATE_MEMORY_ITEMS', '32'))
+_manifest = {'version': None, 'etag': None, 'loaded_at': 0.0, 'variants': {}, 'by_key': {}}
+_template_bytes = {}  # (bucket, key) -> (etag, bytes, time S3 last confirmed the etag)
+
 def truncate_at_word_boundary(text, max_length):
     """
     Truncate text at word boundaries to avoid cutting words.
@@ -98,7 +126,7 @@ def create_overlay(data, path):
     Uses actual coordinates from debug_grid_overlay.py
     """
     print("===> Creating overlay for Form 8821...")
-    c = canvas.Canvas(path, pagesize=(612, 792))
+    c = canvas.Canvas(path, pagesize=(612, 792), invariant=1)
     c.setFont("Helvetica", 9)
     
     # Helper function to process text fields (translate, uppercase, truncate)
@@ -344,6 +372,221 @@ def upload_to_s3(bucket, key, local_path):
     )
     print(f"===> Upload complete: s3://{bucket}/{key}")
 
+def presigned_url(bucket, key, filename):
+    """Short-lived GET URL for an object this invocation just uploaded"""
+    global _presign_client
+    if _presign_client is None:
+        _presign_client = boto3.client(
+            's3', region_name=PRESIGN_REGION, endpoint_url=f'https://s3.{PRESIGN_REGION}.amazonaws.com',
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'virtual'}),
+        )
+    return _presign_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': key, 'ResponseContentDisposition': f'attachment; filename="{filename}"'},
+        ExpiresIn=PRESIGN_EXPIRES,
+    )
+
+def link_response(mode, bucket, key, filename, fields, headers=None):
+    """Response for response_mode "url" (JSON with download_url) or "stream" (303 redirect, so the
+    client reads the raw bytes straight from S3 instead of base64 through the Lambda)."""
+    url = presigned_url(bucket, key, filename)
+    print(f"===> Presigned link for s3://{bucket}/{key} ({mode}, expires in {PRESIGN_EXPIRES}s)")
+    if mode == "stream":
+        return {
+            "statusCode": 303,
+            "headers": {"Location": url, "Cache-Control": "no-store", **(headers or {})},
+            "body": ""
+        }
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": json.dumps({**fields, "download_url": url, "expires_in": PRESIGN_EXPIRES})
+    }
+
+def load_template_manifest():
+    """(Re)load TEMPLATE_MANIFEST once per TEMPLATE_MANIFEST_TTL (conditional GET). Indexes this
+    generator's templates by variant and by (bucket, key); drops in-memory copies whose ETag changed."""
+    if not TEMPLATE_MANIFEST.startswith('s3://') or time.time() - _manifest['loaded_at'] < TEMPLATE_MANIFEST_TTL:
+        return
+    _manifest['loaded_at'] = time.time()
+    bucket, key = TEMPLATE_MANIFEST[5:].split('/', 1)
+    try:
+        conditional = {'IfNoneMatch': _manifest['etag']} if _manifest['etag'] else {}
+        obj = boto3.client("s3").get_object(Bucket=bucket, Key=key, **conditional)
+        data = json.loads(obj['Body'].read())
+    except Exception as e:
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') != '304':
+            print(f"===> Template manifest unavailable, downloading templates on demand: {e}")
+        return
+    variants = {v: t for v, t in data.get('variants', {}).items() if t.get('generator') == RENDER_CACHE_NAME}
+    by_key = {(t['bucket'], t['key']): t for t in variants.values()}
+    for k, (etag, *_) in list(_template_bytes.items()):
+        if by_key.get(k, {}).get('etag') != etag:
+            del _template_bytes[k]
+    _manifest.update(version=data.get('version'), etag=obj.get('ETag'), variants=variants, by_key=by_key)
+    print(f"===> Template manifest v{data.get('version')}: {len(variants)} {RENDER_CACHE_NAME} templates")
+
+def prefetch_templates():
+    """Read the TEMPLATE_PREFETCH highest-ranked templates into memory (runs during init)"""
+    hot = sorted(_manifest['by_key'].values(), key=lambda t: t.get('rank', 0))[:TEMPLATE_PREFETCH]
+    if not hot:
+        return
+    started = time.time()
+    s3 = boto3.client("s3")
+
+    def fetch(t):
+        try:
+            # IfMatch: a template changed since the manifest was built is not trusted (no cached ETag either)
+            body = s3.get_object(Bucket=t['bucket'], Key=t['key'], IfMatch=f'"{t["etag"]}"')['Body'].read()
+            _template_bytes[(t['bucket'], t['key'])] = (t['etag'], body, time.time())
+        except Exception as e:
+            print(f"===> Prefetch skipped for {t['key']}: {e}")
+            _manifest['by_key'].pop((t['bucket'], t['key']), None)
+
+    with ThreadPoolExecutor(max_workers=len(hot)) as pool:
+        list(pool.map(fetch, hot))
+    print(f"===> Prefetched {len(_template_bytes)}/{len(hot)} templates in {(time.time() - started) * 1000:.0f}ms")
+
+def template_url_for(variant):
+    """s3:// URL of a manifest variant (O(1) lookup, no listing), or None"""
+    t = _manifest['variants'].get(variant) if variant else None
+    return f"s3://{t['bucket']}/{t['key']}" if t else None
+
+def template_etag(bucket, key):
+    """ETag of the in-memory template when S3 confirmed it within TEMPLATE_MANIFEST_TTL (saves the
+    render-cache HEAD), else None"""
+    cached = _template_bytes.get((bucket, key))
+    if cached and time.time() - cached[2] < TEMPLATE_MANIFEST_TTL:
+        return cached[0]
+    return None
+
+def confirm_template_etag(bucket, key, etag):
+    """Record an ETag just read from S3: re-confirms the in-memory copy, or drops it if the template changed"""
+    cached = _template_bytes.get((bucket, key))
+    if not cached:
+        return
+    if cached[0] == etag.strip('"'):
+        _template_bytes[(bucket, key)] = (cached[0], cached[1], time.time())
+    else:
+        print(f"===> Template s3://{bucket}/{key} changed in S3, dropping the in-memory copy")
+        del _template_bytes[(bucket, key)]
+
+def fetch_template(bucket, key, local_path):
+    """Write the template to local_path from memory when prefetched or seen before (re-checked with a
+    HEAD once per TEMPLATE_MANIFEST_TTL), else from S3. Manifest templates downloaded on demand are kept
+    in memory (up to TEMPLATE_MEMORY_ITEMS), but only when S3 returned the version the manifest lists."""
+    if (bucket, key) in _template_bytes and not template_etag(bucket, key):
+        try:
+            confirm_template_etag(bucket, key, boto3.client("s3").head_object(Bucket=bucket, Key=key)['ETag'])
+        except Exception as e:
+            print(f"===> Template HEAD failed ({e}), using the in-memory copy")
+    cached = _template_bytes.get((bucket, key))
+    if cached:
+        with open(local_path, 'wb') as f:
+            f.write(cached[1])
+        print(f"===> Template s3://{bucket}/{key} from memory (manifest v{_manifest['version']})")
+        return
+    entry = _manifest['by_key'].get((bucket, key))
+    if not entry:
+        download_from_s3(bucket, key, local_path)
+        return
+    print(f"===> Downloading s3://{bucket}/{key} to {local_path}")
+    obj = boto3.client("s3").get_object(Bucket=bucket, Key=key)
+    body = obj['Body'].read()
+    with open(local_path, 'wb') as f:
+        f.write(body)
+    if obj['ETag'].strip('"') != entry['etag']:
+        # Re-uploaded without rebuilding the manifest: use it, but trust neither the bytes nor the manifest ETag
+        print(f"===> Template s3://{bucket}/{key} differs from manifest v{_manifest['version']}, not cached")
+        _manifest['by_key'].pop((bucket, key), None)
+    elif len(_template_bytes) < TEMPLATE_MEMORY_ITEMS:
+        _template_bytes[(bucket, key)] = (entry['etag'], body, time.time())
+
+load_template_manifest()
+prefetch_templates()
+
+def render_cache_key(template_bucket, template_key, form_data, **extra):
+    """Deterministic render-cache key from the template ETag, GENERATOR_VERSION and canonical
+    form_data (sorted keys). The ETag is HEADed unless the in-memory template was confirmed within
+    TEMPLATE_MANIFEST_TTL. None when the cache is off or the template HEAD fails."""
+    if not RENDER_CACHE:
+        return None
+    etag = template_etag(template_bucket, template_key)
+    if not etag:
+        try:
+            etag = boto3.client("s3").head_object(Bucket=template_bucket, Key=template_key)['ETag']
+        except Exception as e:
+            print(f"===> Render cache skipped: template HEAD failed ({e})")
+            return None
+        confirm_template_etag(template_bucket, template_key, etag)
+    canonical = json.dumps(
+        {"template": f"{template_bucket}/{template_key}", "etag": etag.strip('"'), "version": GENERATOR_VERSION,
+         "form_data": form_data, **extra},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str,
+    )
+    return f"{RENDER_CACHE_PREFIX}{RENDER_CACHE_NAME}/{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}.pdf"
+
+def restore_render(cache_key, bucket, key, extras=False):
+    """Server-side copy of a cached render to bucket/key. Returns the extras stored with it
+    ({} unless extras=True), or None on a miss."""
+    s3 = boto3.client("s3")
+    cache_bucket = RENDER_CACHE_BUCKET or bucket
+    try:
+        stored = {}
+        if extras:
+            obj = s3.get_object(Bucket=cache_bucket, Key=cache_key + '.json')
+            stored = json.loads(obj['Body'].read())
+        s3.copy_object(
+            Bucket=bucket, Key=key, CopySource={'Bucket': cache_bucket, 'Key': cache_key}, MetadataDirective='COPY'
+        )
+        return stored
+    except Exception as e:
+        code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+        if code not in ('NoSuchKey', '404'):
+            print(f"===> Render cache lookup failed, rendering: {e}")
+        return None
+
+def store_render(cache_key, bucket, key, extras=None):
+    """Server-side copy of a fresh render at bucket/key into the cache (extras first, as JSON)"""
+    s3 = boto3.client("s3")
+    cache_bucket = RENDER_CACHE_BUCKET or bucket
+    try:
+        if extras is not None:
+            s3.put_object(
+                Bucket=cache_bucket, Key=cache_key + '.json',
+                Body=json.dumps(extras).encode('utf-8'), ContentType='application/json'
+            )
+        s3.copy_object(
+            Bucket=cache_bucket, Key=cache_key, CopySource={'Bucket': bucket, 'Key': key}, MetadataDirective='COPY'
+        )
+    except Exception as e:
+        print(f"===> Render cache store failed: {e}")
+
+def record_render(outcome, started):
+    """Log the render-cache outcome (hit/miss/off) and emit it as a CloudWatch embedded metric"""
+    _render_stats[outcome] = _render_stats.get(outcome, 0) + 1
+    elapsed_ms = round((time.time() - started) * 1000)
+    print(f"===> Render cache {outcome} in {elapsed_ms}ms (container totals: {_render_stats})")
+    if outcome != 'off':
+        print(json.dumps({
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": "DocumentGenerators",
+                    "Dimensions": [["Generator"]],
+                    "Metrics": [
+                        {"Name": "RenderCacheHit", "Unit": "Count"},
+                        {"Name": "RenderCacheMiss", "Unit": "Count"},
+                        {"Name": "RenderMs", "Unit": "Milliseconds"}
+                    ]
+                }]
+            },
+            "Generator": RENDER_CACHE_NAME,
+            "RenderCacheHit": int(outcome == 'hit'),
+            "RenderCacheMiss": int(outcome == 'miss'),
+            "RenderMs": elapsed_ms
+        }))
+
 def extract_s3_info(url):
     """Extract bucket and key from S3 URL"""
     if url.startswith('s3://'):
@@ -363,6 +606,7 @@ def extract_s3_info(url):
 def lambda_handler(event, context):
     print("===> RAW EVENT:")
     print(json.dumps(event))
+    load_template_manifest()
     
     try:
         # Parse request body
@@ -374,8 +618,9 @@ def lambda_handler(event, context):
         form_data = body.get("form_data")
         s3_bucket = body.get("s3_bucket")
         s3_key = body.get("s3_key")
-        templateUrl = body.get("templateUrl")
+        templateUrl = body.get("templateUrl") or template_url_for(body.get("template_variant"))
         return_pdf = body.get("return_pdf", False)
+        response_mode = body.get("response_mode", "base64")
         
         if not form_data:
             return {
@@ -395,6 +640,12 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "Missing 'templateUrl'"})
             }
         
+        if response_mode not in RESPONSE_MODES:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": f"Invalid 'response_mode' (expected one of {', '.join(RESPONSE_MODES)})"})
+            }
+        
         # Extract template bucket and key from URL
         template_bucket, template_key = extract_s3_info(templateUrl)
         if not template_bucket or not template_key:
@@ -419,21 +670,43 @@ def lambda_handler(event, context):
     output_path = os.path.join(tmpdir, "filled_8821.pdf")
     
     try:
-        # Download template from S3
-        download_from_s3(template_bucket, template_key, template_path)
+        # Render cache: a repeat of an earlier request is a server-side copy (no template download or fill)
+        started = time.time()
+        render_key = render_cache_key(template_bucket, template_key, form_data, year=time.strftime("%Y")) if body.get("render_cache", True) else None
+        cached = restore_render(render_key, s3_bucket, s3_key) if render_key else None
+        if cached is not None:
+            if return_pdf and response_mode == "base64":
+                download_from_s3(s3_bucket, s3_key, output_path)
+        else:
+            # Download template from S3
+            fetch_template(template_bucket, template_key, template_path)
+        
+            # Create overlay and merge
+            # form_data from TypeScript comes from transformDataFor8821 which sends:
+            # companyName, ein, companyAddress
+            # taxpayerName, taxpayerSSN, taxpayerAddress, taxpayerCity, taxpayerState, taxpayerZip
+            # designeeName, designeeAddress, designeeCity, designeeState, designeeZip, designeePhone, designeeFax
+            # taxYears, taxForms
+            print(f"===> Creating overlay with form data...")
+            create_overlay(form_data, overlay_path)
+            merge_pdfs(template_path, overlay_path, output_path)
         
-        # Create overlay and merge
-        # form_data from TypeScript comes from transformDataFor8821 which sends:
-        # companyName, ein, companyAddress
-        # taxpayerName, taxpayerSSN, taxpayerAddress, taxpayerCity, taxpayerState, taxpayerZip
-        # designeeName, designeeAddress, designeeCity, designeeState, designeeZip, designeePhone, designeeFax
-        # taxYears, taxForms
-        print(f"===> Creating overlay with form data...")
-        create_overlay(form_data, overlay_path)
-        merge_pdfs(template_path, overlay_path, output_path)
+            # Upload to S3
+            upload_to_s3(s3_bucket, s3_key, output_path)
+            if render_key:
+                store_render(render_key, s3_bucket, s3_key)
+        render_outcome = "hit" if cached is not None else "miss" if render_key else "off"
+        record_render(render_outcome, started)
         
-        # Upload to S3
-        upload_to_s3(s3_bucket, s3_key, output_path)
+        # response_mode "url"/"stream": link to the uploaded PDF instead of reading it back into the body
+        if return_pdf and response_mode != "base64":
+            return link_response(response_mode, s3_bucket, s3_key, "8821.pdf", {
+                "message": "✅ Form 8821 PDF uploaded to S3",
+                "s3_bucket": s3_bucket,
+                "s3_key": s3_key,
+                "s3_url": f"s3://{s3_bucket}/{s3_key}",
+                "render_cache": render_outcome
+            })
         
         # Read PDF for return if requested
         pdf_bytes = None
@@ -447,7 +720,8 @@ def lambda_handler(event, context):
                 "message": "✅ Form 8821 PDF uploaded to S3",
                 "s3_bucket": s3_bucket,
                 "s3_key": s3_key,
-                "s3_url": f"s3://{s3_bucket}/{s3_key}"
+                "s3_url": f"s3://{s3_bucket}/{s3_key}",
+                "render_cache": render_outcome
             })
         }
         
@@ -457,7 +731,8 @@ def lambda_handler(event, context):
             response["statusCode"] = 200
             response["headers"] = {
                 "Content-Type": "application/pdf",
-                "Content-Disposition": f"attachment; filename=8821.pdf"
+                "Content-Disposition": f"attachment; filename=8821.pdf",
+                "X-Render-Cache": render_outcome
             }
             response["body"] = base64.b64encode(pdf_bytes).decode('utf-8')
             response["isBase64Encoded"] = True
@@ -0,0 +1,74 @@
+"""
+Lambda: Push Airtable record IDs onto the Sunbiz autofill queue.
+Called (via a Function URL) by the Airtable automation that fires when Autofill is set to "Yes",
+so autofill_watcher.py --watch picks the record up within seconds instead of on its next sweep.
+Requires AUTOFILL_QUEUE_URL and AUTOFILL_ENQUEUE_SECRET in env.
+
+Request: POST {"record_id": "recXXX"} or {"record_ids": ["recXXX", ...]}
+with header X-Autofill-Secret: <AUTOFILL_ENQUEUE_SECRET>
+"""
+
+import os
+import json
+import hmac
+
+import boto3
+
+QUEUE_URL = os.environ.get("AUTOFILL_QUEUE_URL", "")
+ENQUEUE_SECRET = os.environ.get("AUTOFILL_ENQUEUE_SECRET", "")
+
+_sqs = None
+
+
+def get_sqs():
+    global _sqs
+    if _sqs is None:
+        region = QUEUE_URL.split(".")[1] if QUEUE_URL.startswith("https://sqs.") else "us-west-1"
+        _sqs = boto3.client("sqs", region_name=region)
+    return _sqs
+
+
+def enqueue(record_id):
+    params = {"QueueUrl": QUEUE_URL, "MessageBody": json.dumps({"record_id": record_id})}
+    if QUEUE_URL.endswith(".fifo"):
+        params["MessageGroupId"] = record_id
+        params["MessageDeduplicationId"] = record_id
+    return get_sqs().send_message(**params)["MessageId"]
+
+
+def lambda_handler(event, context):
+    if not QUEUE_URL or not ENQUEUE_SECRET:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": "Missing AUTOFILL_QUEUE_URL or AUTOFILL_ENQUEUE_SECRET in Lambda environment"}),
+        }
+
+    headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    if not hmac.compare_digest(headers.get("x-autofill-secret", ""), ENQUEUE_SECRET):
+        print("===> Rejected enqueue request: bad or missing X-Autofill-Secret")
+        return {"statusCode": 403, "body": json.dumps({"error": "Forbidden"})}
+
+    try:
+        body = event.get("body") or "{}"
+        if isinstance(body, str):
+            body = json.loads(body)
+    except ValueError:
+        return {"statusCode": 400, "body": json.dumps({"error": "Body must be JSON"})}
+
+    record_ids = body.get("record_ids") or ([body["record_id"]] if body.get("record_id") else [])
+    invalid = [r for r in record_ids if not isinstance(r, str) or not r.startswith("rec")]
+    if not record_ids or invalid:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Provide 'record_id' or 'record_ids' (Airtable rec... IDs)", "invalid": invalid}),
+        }
+
+    try:
+        queued = {}
+        for record_id in dict.fromkeys(record_ids):
+            queued[record_id] = enqueue(record_id)
+            print(f"===> Queued {record_id} for autofill ({queued[record_id]})")
+        return {"statusCode": 200, "body": json.dumps({"queued": queued})}
+    except Exception as e:
+        print(f"===> Failed to queue {record_ids}: {e}")
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
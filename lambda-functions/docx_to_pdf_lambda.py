@@ -3,163 +3,1257 @@ Convert DOCX to PDF using LibreOffice headless.
 Attach a LibreOffice Lambda layer (e.g. shelfio/libreoffice-lambda-layer).
 Expects JSON body: { "docx_base64": "<base64>" }
 Returns: { "pdf_base64": "<base64>" }
+
+Batch: { "documents": [ { "name": "bylaws.docx", "docx_base64": "<base64>" },
+                        { "s3_bucket": "...", "s3_key": ".../registry.docx" }, ... ] }
+Returns: { "results": [ { "index", "name", "pdf_base64", "elapsed_ms" } or
+                        { "index", "name", "error" }, ... ],
+           "converted": n, "failed": n, "elapsed_ms": total }
+All documents of a batch are converted in one LibreOffice session (one --convert-to
+run, or the daemon below), so a formation's four to six documents pay one startup.
+
+Daemon mode (LO_DAEMON=auto|1|0, default auto): when LibreOffice's pyuno bridge can be
+imported, one soffice listener is started per container and every conversion goes over
+its UNO socket, so only the first request pays the LibreOffice boot. The listener is
+health-checked before each conversion, restarted if it died or hung, and recycled after
+LO_DAEMON_MAX_DOCS documents. Without pyuno each request runs soffice --convert-to.
+
+Cold starts: the container image bakes a fontconfig cache and a pristine user profile into
+LO_ASSETS_DIR. Every soffice shares one fonts.conf that reads that cache (and writes misses to
+/tmp once), and each conversion starts from an in-memory copy of the profile instead of an
+empty UserInstallation. LO_PROFILE_CACHE=0 restores the per-request scan and profile.
+
+Native fast path: documents made only of paragraphs, runs (bold/italic/underline, size, font,
+color) and grid tables with borders, like the registries, are drawn with reportlab in tens of
+milliseconds. Anything outside that subset goes to LibreOffice. NATIVE_RENDER=0 turns it off,
+and a request with "native": false skips it.
+
+PDF cache: converted PDFs are keyed by SHA-256 of the DOCX bytes + LibreOffice build + export
+options and kept in an in-memory LRU, backed by S3 (PDF_CACHE_BUCKET) or a local directory
+(PDF_CACHE_DIR). A hit returns without touching LibreOffice. Send { "cache_stats": true } for
+this container's hit/miss counters.
 """
 
 import os
 import sys
 import json
 import base64
+import glob
+import hashlib
+import io
+import re
+import shutil
 import subprocess
 import tempfile
 import tarfile
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from botocore.exceptions import ClientError
+
+LO_DAEMON = os.environ.get('LO_DAEMON', 'auto').lower()
+LO_DAEMON_PORT = int(os.environ.get('LO_DAEMON_PORT', '2002'))
+LO_DAEMON_MAX_DOCS = int(os.environ.get('LO_DAEMON_MAX_DOCS', '200'))
+LO_DAEMON_TIMEOUT = int(os.environ.get('LO_DAEMON_TIMEOUT', '60'))
+LO_DAEMON_START_TIMEOUT = int(os.environ.get('LO_DAEMON_START_TIMEOUT', '30'))
+LO_DAEMON_PROFILE = '/tmp/lo-daemon'
+# Font cache and pristine user profile baked into the image (see Dockerfile.docx-to-pdf)
+LO_ASSETS_DIR = os.environ.get('LO_ASSETS_DIR', '/opt/lo-assets')
+# 0 = fresh font cache and profile per request (the old behaviour, kept for benchmarking)
+LO_PROFILE_CACHE = os.environ.get('LO_PROFILE_CACHE', '1').lower() not in ('0', 'false', 'off', 'no')
+LO_FONTS_HOME = '/tmp/lo-fonts'
 
-# Shelfio layer: archive at /opt/lo.tar.br or /opt/lo.tar.gz; extract to /tmp on first use
+# Conversion cache: S3 bucket or local dir (tests), plus an in-memory LRU per container
+PDF_CACHE = os.environ.get('PDF_CACHE', '1').lower() not in ('0', 'false', 'off', 'no')
+PDF_CACHE_BUCKET = os.environ.get('PDF_CACHE_BUCKET', '')
+PDF_CACHE_PREFIX = os.environ.get('PDF_CACHE_PREFIX', 'pdf-cache/')
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', '')
+PDF_CACHE_MEMORY_MB = int(os.environ.get('PDF_CACHE_MEMORY_MB', '64'))
+# Part of every cache key; bump when the export path or its options change
+PDF_EXPORT_OPTIONS = 'writer_pdf_Export;SelectPdfVersion=1;fallback=pdf;v1'
+
+# Render simple paragraph/table documents (the registries) with reportlab instead of LibreOffice
+NATIVE_RENDER = os.environ.get('NATIVE_RENDER', 'auto').lower() not in ('0', 'false', 'off', 'no')
+NATIVE_MAX_PARAGRAPHS = int(os.environ.get('NATIVE_MAX_PARAGRAPHS', '150'))
+
+s3_client = boto3.client('s3', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
+
+# Layer archives: /opt/lo.tar.{zst,gz,br} or /opt/lo.tar, or split parts /opt/lo.part-*.tar.*
+# (scripts/repack-libreoffice-layer.sh), unpacked to /tmp/instdir while the module loads.
+LO_UNPACK_DIR = '/tmp'
+LO_UNPACK_MARKER = '/tmp/instdir/.lo-unpacked'
+_LO_ARCHIVE_PATTERNS = ('/opt/lo.part-*.tar.zst', '/opt/lo.part-*.tar.gz', '/opt/lo.part-*.tar',
+                        '/opt/lo.tar.zst', '/opt/lo.tar.gz', '/opt/lo.tar', '/opt/lo.tar.br')
 _LO_UNPACKED = None
 
-def _get_lo_bin():
-    global _LO_UNPACKED
+
+def _lo_archives():
+    """Archives of the first layout present (all parts of a split layer, or one archive)."""
+    for pattern in _LO_ARCHIVE_PATTERNS:
+        found = sorted(glob.glob(pattern))
+        if found:
+            return found
+    return []
+
+
+def _archive_signature(archives):
+    return '\n'.join('%s %d %d' % (a, os.path.getsize(a), int(os.path.getmtime(a))) for a in archives)
+
+
+def _pipe_to_tar(decompress_cmd, dest):
+    """decompress_cmd | tar -x -C dest, both as subprocesses so parts run truly in parallel."""
+    decompress = subprocess.Popen(decompress_cmd, stdout=subprocess.PIPE)
+    untar = subprocess.run(['tar', '-x', '-C', dest], stdin=decompress.stdout, capture_output=True)
+    decompress.stdout.close()
+    if decompress.wait() != 0 or untar.returncode != 0:
+        raise RuntimeError(f"{decompress_cmd[0]} | tar failed: {untar.stderr.decode('utf-8', errors='replace')[:300]}")
+
+
+def _tool(name):
+    return shutil.which(name) or shutil.which(name, path='/opt/bin')
+
+
+def _extract_archive(archive, dest):
+    if archive.endswith('.zst'):
+        try:
+            import zstandard
+            with open(archive, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                with tarfile.open(fileobj=reader, mode='r|') as tar:
+                    tar.extractall(dest)
+        except ImportError:
+            if not _tool('zstd'):
+                raise RuntimeError('zstd archive but neither the zstandard module nor a zstd binary is available')
+            _pipe_to_tar([_tool('zstd'), '-dc', archive], dest)
+    elif archive.endswith('.br'):
+        if not _tool('brotli'):
+            raise RuntimeError('brotli archive but no brotli binary is available')
+        _pipe_to_tar([_tool('brotli'), '-dc', archive], dest)
+    elif archive.endswith('.gz') and (_tool('pigz') or _tool('gzip')) and _tool('tar'):
+        _pipe_to_tar([_tool('pigz') or _tool('gzip'), '-dc', archive], dest)
+    elif archive.endswith('.tar') and _tool('tar'):
+        subprocess.run(['tar', '-xf', archive, '-C', dest], check=True, capture_output=True)
+    else:
+        with tarfile.open(archive, 'r:*') as tar:
+            tar.extractall(dest)
+
+
+def _unpack_lo():
+    """Extract the layer's LibreOffice to /tmp/instdir, parts in parallel. A marker recording the
+    archives is written last, so a partial extraction (timeout, crash) is wiped and redone."""
+    lo_bin = os.path.join(LO_UNPACK_DIR, 'instdir', 'program', 'soffice.bin')
+    archives = _lo_archives()
+    if not archives:
+        return lo_bin if os.path.isfile(lo_bin) else False
+    signature = _archive_signature(archives)
+    try:
+        with open(LO_UNPACK_MARKER) as f:
+            if f.read() == signature and os.path.isfile(lo_bin):
+                return lo_bin
+    except OSError:
+        pass
+    started = time.time()
+    shutil.rmtree(os.path.join(LO_UNPACK_DIR, 'instdir'), ignore_errors=True)
+    with ThreadPoolExecutor(max_workers=min(len(archives), os.cpu_count() or 1)) as pool:
+        for future in [pool.submit(_extract_archive, a, LO_UNPACK_DIR) for a in archives]:
+            future.result()
+    if not os.path.isfile(lo_bin):
+        print(f"===> Unpacked {len(archives)} archive(s) but {lo_bin} is missing")
+        return False
+    with open(LO_UNPACK_MARKER + '.tmp', 'w') as f:
+        f.write(signature)
+    os.replace(LO_UNPACK_MARKER + '.tmp', LO_UNPACK_MARKER)
+    print(f"===> Unpacked LibreOffice from {len(archives)} archive(s) in {time.time() - started:.2f}s")
+    return lo_bin
+
+
+def _preinstalled_lo_bin():
     # Container image (e.g. unofunction LibreOffice) sets LIBREOFFICE_PATH
     for env_key in ('LIBREOFFICE_PATH', 'LIBREOFFICE_BIN'):
         env_bin = os.environ.get(env_key)
         if env_bin and os.path.isfile(env_bin):
             return env_bin
-    for path in ('/opt/instdir/program/soffice.bin', '/tmp/instdir/program/soffice.bin', '/opt/libreoffice/program/soffice.bin'):
+    for path in ('/opt/instdir/program/soffice.bin', '/opt/libreoffice/program/soffice.bin'):
         if os.path.isfile(path):
             return path
+    return None
+
+
+def _get_lo_bin():
+    global _LO_UNPACKED
+    lo_bin = _preinstalled_lo_bin()
+    if lo_bin:
+        return lo_bin
     if _LO_UNPACKED is None:
-        lo_bin = '/tmp/instdir/program/soffice.bin'
-        if not os.path.isfile(lo_bin):
-            # Prefer gzip layer (/opt/lo.tar.gz) - no extra deps; brotli layer needs brotli CLI
-            for arc in ('/opt/lo.tar.gz', '/opt/lo.tar.br'):
-                if os.path.isfile(arc):
-                    if arc.endswith('.gz'):
-                        with tarfile.open(arc, 'r:gz') as tar:
-                            tar.extractall('/tmp')
-                    break
-        _LO_UNPACKED = lo_bin if os.path.isfile(lo_bin) else False
+        # Init-time unpack failed or was skipped; try once on the request path
+        try:
+            _LO_UNPACKED = _unpack_lo()
+        except Exception as e:
+            print(f"===> LibreOffice unpack failed: {e}")
+            _LO_UNPACKED = False
     if _LO_UNPACKED and os.path.isfile(_LO_UNPACKED):
         return _LO_UNPACKED
     return 'soffice'
 
 
-def lambda_handler(event, context):
+# Unpack during the Lambda init phase (full CPU, outside the first request's latency)
+if _preinstalled_lo_bin() is None:
     try:
-        # Support both: Function URL (event.body) and direct Invoke (event.docx_base64)
-        body = event.get('body')
-        if isinstance(body, str):
-            body = json.loads(body)
-        payload = body if body else event
-        docx_b64 = (payload or {}).get('docx_base64')
-        if not docx_b64:
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'error': 'Missing docx_base64'}),
-            }
-        docx_bytes = base64.b64decode(docx_b64)
+        _LO_UNPACKED = _unpack_lo()
     except Exception as e:
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': str(e)}),
-        }
+        print(f"===> LibreOffice unpack at init failed ({e}), retrying on first request")
+        _LO_UNPACKED = None
 
-    LO_BIN = _get_lo_bin()
-    lo_dir = os.path.dirname(LO_BIN)
-    lo_root = os.path.dirname(os.path.dirname(LO_BIN))  # e.g. /tmp/instdir or /opt/libreoffice
-    with tempfile.TemporaryDirectory() as tmpdir:
-        inp = os.path.join(tmpdir, 'input.docx')
-        with open(inp, 'wb') as f:
-            f.write(docx_bytes)
-        out_pdf = os.path.join(tmpdir, 'input.pdf')
-        env = os.environ.copy()
-        env['HOME'] = tmpdir
-        env['SAL_USE_VCLPLUGIN'] = 'svp'
-        env['LD_LIBRARY_PATH'] = (lo_dir + os.pathsep + env.get('LD_LIBRARY_PATH', '')).strip(os.pathsep)
-        # Point fontconfig at all available font dirs so LO can substitute (e.g. Calibri→Liberation) and embed in PDF
-        fonts_dirs = [
-            os.path.join(lo_root, 'share', 'fonts'),
-            '/usr/share/fonts',
-            '/usr/share/fonts/liberation',
-            '/tmp',
-        ]
-        existing_dirs = [d for d in fonts_dirs if os.path.isdir(d)]
-        if not existing_dirs:
-            existing_dirs = [tmpdir]
-        cache_dir = os.path.join(tmpdir, 'fontcache')
-        dir_lines = ''.join('<dir>%s</dir>' % d for d in existing_dirs)
-        fonts_conf = os.path.join(tmpdir, 'fonts.conf')
-        with open(fonts_conf, 'w') as f:
-            f.write('<?xml version="1.0"?><fontconfig>%s<cachedir>%s</cachedir></fontconfig>' % (dir_lines, cache_dir))
+
+def _font_dirs(lo_bin):
+    lo_root = os.path.dirname(os.path.dirname(lo_bin))  # e.g. /tmp/instdir or /opt/libreoffice
+    # Point fontconfig at all available font dirs so LO can substitute (e.g. Calibri→Liberation) and embed in PDF
+    fonts_dirs = [
+        os.path.join(lo_root, 'share', 'fonts'),
+        '/usr/share/fonts',
+        '/usr/share/fonts/liberation',
+    ]
+    return [d for d in fonts_dirs if os.path.isdir(d)]
+
+
+def _write_fonts_conf(path, font_dirs, cache_dirs):
+    dir_lines = ''.join('<dir>%s</dir>' % d for d in font_dirs)
+    cache_lines = ''.join('<cachedir>%s</cachedir>' % d for d in cache_dirs)
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0"?><fontconfig>%s%s</fontconfig>' % (dir_lines, cache_lines))
+
+
+_FONTS_CONF = None
+
+
+def _shared_fonts_conf(lo_bin):
+    """One fonts.conf per container. fontconfig reads the cache built into the image first and
+    writes whatever is missing or stale to /tmp once, so later soffice runs skip the font scan."""
+    global _FONTS_CONF
+    if _FONTS_CONF is None or not os.path.isfile(_FONTS_CONF):
+        cache_dirs = []
+        prebuilt = os.path.join(LO_ASSETS_DIR, 'fontcache')
+        if os.path.isdir(prebuilt):
+            cache_dirs.append(prebuilt)
+        cache_dirs.append(os.path.join(LO_FONTS_HOME, 'cache'))  # first writable cachedir gets new entries
+        os.makedirs(LO_FONTS_HOME, exist_ok=True)
+        conf = os.path.join(LO_FONTS_HOME, 'fonts.conf')
+        _write_fonts_conf(conf, _font_dirs(lo_bin) or [LO_FONTS_HOME], cache_dirs)
+        print(f"===> fontconfig caches: {', '.join(cache_dirs)}")
+        _FONTS_CONF = conf
+    return _FONTS_CONF
+
+
+def _lo_env(lo_bin, home):
+    """Environment for a soffice process whose HOME lives under home."""
+    lo_dir = os.path.dirname(lo_bin)
+    env = os.environ.copy()
+    env['HOME'] = home
+    env['SAL_USE_VCLPLUGIN'] = 'svp'
+    env['LD_LIBRARY_PATH'] = (lo_dir + os.pathsep + env.get('LD_LIBRARY_PATH', '')).strip(os.pathsep)
+    if LO_PROFILE_CACHE:
+        env['FONTCONFIG_FILE'] = _shared_fonts_conf(lo_bin)
+    else:
+        fonts_conf = os.path.join(home, 'fonts.conf')
+        _write_fonts_conf(fonts_conf, _font_dirs(lo_bin) or [home], [os.path.join(home, 'fontcache')])
         env['FONTCONFIG_FILE'] = fonts_conf
-        user_install = 'file://' + tmpdir
-        # Prefer PDF/A-1b so all fonts are embedded (avoids black rectangles when fonts are missing)
-        convert_options = [
-            'pdf:writer_pdf_Export:{"SelectPdfVersion":{"type":"long","value":"1"}}',
-            'pdf',  # fallback if PDF/A filter not supported
+    return env
+
+
+# Pristine user profile as [(relative path, bytes)], loaded once per container. Writing it from
+# memory avoids LibreOffice's first-start setup and the lazy image-layer reads of /opt.
+_PROFILE_SNAPSHOT = None
+
+
+def _snapshot_profile(src):
+    files = []
+    for root, dirs, names in os.walk(src):
+        dirs[:] = [d for d in dirs if d not in ('crash', 'backup')]
+        for name in names:
+            if name.endswith('.lock'):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files.append((os.path.relpath(path, src), f.read()))
+    return files
+
+
+def _seed_profile(dest):
+    """Fill dest with the pristine profile (image template, else the first one this container made)."""
+    global _PROFILE_SNAPSHOT
+    if not LO_PROFILE_CACHE:
+        return False
+    if _PROFILE_SNAPSHOT is None:
+        template = os.path.join(LO_ASSETS_DIR, 'profile')
+        if os.path.isdir(os.path.join(template, 'user')):
+            started = time.time()
+            _PROFILE_SNAPSHOT = _snapshot_profile(template)
+            print(f"===> Loaded LibreOffice profile template ({len(_PROFILE_SNAPSHOT)} files) in {time.time() - started:.2f}s")
+    if not _PROFILE_SNAPSHOT:
+        return False
+    for rel, data in _PROFILE_SNAPSHOT:
+        path = os.path.join(dest, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    return True
+
+
+def _remember_profile(src):
+    """Keep the profile of this container's first successful conversion when the image has none."""
+    global _PROFILE_SNAPSHOT
+    if LO_PROFILE_CACHE and not _PROFILE_SNAPSHOT and os.path.isdir(os.path.join(src, 'user')):
+        _PROFILE_SNAPSHOT = _snapshot_profile(src)
+
+
+def _error(status, body):
+    return {
+        'statusCode': status,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps(body),
+    }
+
+
+def _pdf_path(inp):
+    return os.path.splitext(inp)[0] + '.pdf'
+
+
+def _convert_with_subprocess(lo_bin, inputs, outdir):
+    """Run soffice --convert-to over all inputs in one process; retries only files still missing.
+    Returns None when every PDF was written, else an error response."""
+    env = _lo_env(lo_bin, outdir)
+    profile = os.path.join(outdir, 'lo-profile')
+    _seed_profile(profile)
+    user_install = 'file://' + profile
+    # Prefer PDF/A-1b so all fonts are embedded (avoids black rectangles when fonts are missing)
+    convert_options = [
+        'pdf:writer_pdf_Export:{"SelectPdfVersion":{"type":"long","value":"1"}}',
+        'pdf',  # fallback if PDF/A filter not supported
+    ]
+    last_stderr = ''
+    last_stdout = ''
+    last_rc = -1
+    pending = list(inputs)
+    for convert_to in convert_options:
+        cmd = [
+            lo_bin,
+            '-env:UserInstallation=' + user_install,
+            '--headless',
+            '--invisible',
+            '--nofirststartwizard',
+            '--nolockcheck',
+            '--nologo',
+            '--norestore',
+            '--writer',
+            '--convert-to', convert_to,
+            '--outdir', outdir,
         ]
-        last_stderr = ''
-        last_stdout = ''
-        last_rc = -1
-        for convert_to in convert_options:
-            cmd = [
-                LO_BIN,
-                '-env:UserInstallation=' + user_install,
-                '--headless',
-                '--invisible',
-                '--nofirststartwizard',
-                '--nolockcheck',
-                '--nologo',
-                '--norestore',
-                '--writer',
-                '--convert-to', convert_to,
-                '--outdir', tmpdir,
-                inp,
-            ]
-            for attempt in range(3):  # Cold start often needs retries (unofunction pattern)
-                try:
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        timeout=90,
-                        env=env,
-                        cwd=lo_dir,
-                    )
-                    last_rc = result.returncode
-                    last_stderr = (result.stderr or b'').decode('utf-8', errors='replace')
-                    last_stdout = (result.stdout or b'').decode('utf-8', errors='replace')
-                    if result.returncode == 0 and os.path.isfile(out_pdf):
-                        break
-                except subprocess.TimeoutExpired as e:
-                    last_stderr = str(e)
-                    last_rc = -1
+        for attempt in range(3):  # Cold start often needs retries (unofunction pattern)
+            try:
+                result = subprocess.run(
+                    cmd + pending,
+                    capture_output=True,
+                    timeout=90,
+                    env=env,
+                    cwd=os.path.dirname(lo_bin),
+                )
+                last_rc = result.returncode
+                last_stderr = (result.stderr or b'').decode('utf-8', errors='replace')
+                last_stdout = (result.stdout or b'').decode('utf-8', errors='replace')
+                pending = [i for i in pending if not os.path.isfile(_pdf_path(i))]
+                if result.returncode == 0 and not pending:
                     break
-                except FileNotFoundError:
-                    return {
-                        'statusCode': 503,
-                        'headers': {'Content-Type': 'application/json'},
-                        'body': json.dumps({
-                            'error': 'LibreOffice not available. Attach the LibreOffice Lambda layer.',
-                        }),
-                    }
-            if last_rc == 0 and os.path.isfile(out_pdf):
+            except subprocess.TimeoutExpired as e:
+                last_stderr = str(e)
+                last_rc = -1
                 break
-        if last_rc != 0 or not os.path.isfile(out_pdf):
+            except FileNotFoundError:
+                return _error(503, {
+                    'error': 'LibreOffice not available. Attach the LibreOffice Lambda layer.',
+                })
+        if last_rc == 0 and not pending:
+            break
+    if pending:
+        return _error(500, {
+            'error': 'Conversion failed',
+            'stderr': last_stderr,
+            'stdout': last_stdout[:500],
+            'returncode': last_rc,
+        })
+    _remember_profile(profile)
+    return None
+
+
+# ---------- Daemon mode: one soffice listener per container ----------
+
+def _import_uno(lo_bin):
+    """Import LibreOffice's pyuno bridge from the program dir, or None if unavailable."""
+    program_dir = os.path.dirname(lo_bin)
+    if program_dir and program_dir not in sys.path:
+        sys.path.append(program_dir)
+    try:
+        import uno
+        return uno
+    except ImportError:
+        return None
+
+
+class _LibreOfficeDaemon:
+    """Headless soffice accepting UNO connections on a local socket."""
+
+    def __init__(self, lo_bin, uno):
+        self.lo_bin = lo_bin
+        self.uno = uno
+        self.accept = f'socket,host=127.0.0.1,port={LO_DAEMON_PORT};urp;StarOffice.ComponentContext'
+        self.proc = None
+        self.desktop = None
+        self.converted = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.stop()
+        os.makedirs(LO_DAEMON_PROFILE, exist_ok=True)
+        if not os.path.isdir(os.path.join(LO_DAEMON_PROFILE, 'user')):
+            _seed_profile(LO_DAEMON_PROFILE)
+        cmd = [
+            self.lo_bin,
+            '-env:UserInstallation=file://' + LO_DAEMON_PROFILE,
+            '--headless',
+            '--invisible',
+            '--nofirststartwizard',
+            '--nolockcheck',
+            '--nologo',
+            '--norestore',
+            '--accept=' + self.accept,
+        ]
+        started = time.time()
+        self.proc = subprocess.Popen(
+            cmd,
+            env=_lo_env(self.lo_bin, LO_DAEMON_PROFILE),
+            cwd=os.path.dirname(self.lo_bin),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        local_ctx = self.uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            'com.sun.star.bridge.UnoUrlResolver', local_ctx)
+        while True:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f'soffice exited with {self.proc.returncode} during startup')
+            try:
+                ctx = resolver.resolve('uno:' + self.accept)
+                break
+            except Exception:
+                if time.time() - started > LO_DAEMON_START_TIMEOUT:
+                    self.stop()
+                    raise RuntimeError(f'soffice listener not ready after {LO_DAEMON_START_TIMEOUT}s')
+                time.sleep(0.1)
+        self.desktop = ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+        self.converted = 0
+        print(f"===> LibreOffice daemon started (pid {self.proc.pid}) in {time.time() - started:.2f}s")
+
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc = None
+
+    def _kill(self):
+        print(f"===> LibreOffice daemon exceeded {LO_DAEMON_TIMEOUT}s, killing it")
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.kill()
+
+    def healthy(self):
+        if self.proc is None or self.proc.poll() is not None or self.desktop is None:
+            return False
+        try:
+            self.desktop.getFrames()
+            return True
+        except Exception:
+            return False
+
+    def _prop(self, name, value):
+        prop = self.uno.createUnoStruct('com.sun.star.beans.PropertyValue')
+        prop.Name = name
+        prop.Value = value
+        return prop
+
+    def _export(self, inp, out_pdf):
+        uno = self.uno
+        load_props = (self._prop('Hidden', True), self._prop('ReadOnly', True))
+        doc = self.desktop.loadComponentFromURL(uno.systemPathToFileUrl(inp), '_blank', 0, load_props)
+        if doc is None:
+            raise RuntimeError('LibreOffice could not open the document')
+        try:
+            out_url = uno.systemPathToFileUrl(out_pdf)
+            try:
+                # PDF/A-1b first so all fonts are embedded, same as the --convert-to path
+                filter_data = uno.Any('[]com.sun.star.beans.PropertyValue',
+                                      (self._prop('SelectPdfVersion', 1),))
+                store_props = (self._prop('FilterName', 'writer_pdf_Export'),
+                               self._prop('FilterData', filter_data))
+                uno.invoke(doc, 'storeToURL',
+                           (out_url, uno.Any('[]com.sun.star.beans.PropertyValue', store_props)))
+            except Exception as e:
+                print(f"===> PDF/A export failed ({e}), retrying plain PDF")
+                doc.storeToURL(out_url, (self._prop('FilterName', 'writer_pdf_Export'),))
+        finally:
+            try:
+                doc.close(True)
+            except Exception:
+                doc.dispose()
+
+    def convert(self, inp, out_pdf):
+        with self.lock:
+            if self.converted >= LO_DAEMON_MAX_DOCS:
+                print(f"===> Recycling LibreOffice daemon after {self.converted} documents")
+                self.start()
+            elif not self.healthy():
+                if self.proc is not None:
+                    print("===> LibreOffice daemon unhealthy, restarting")
+                self.start()
+            watchdog = threading.Timer(LO_DAEMON_TIMEOUT, self._kill)
+            watchdog.start()
+            started = time.time()
+            try:
+                self._export(inp, out_pdf)
+            except Exception:
+                self.desktop = None  # restart before the next conversion
+                raise
+            finally:
+                watchdog.cancel()
+            self.converted += 1
+            print(f"===> Daemon conversion #{self.converted} in {time.time() - started:.2f}s")
+
+
+_DAEMON = None  # None = not tried yet, False = unavailable in this container
+
+
+def _get_daemon(lo_bin):
+    global _DAEMON
+    if _DAEMON is None:
+        _DAEMON = False
+        if LO_DAEMON in ('0', 'false', 'off', 'no'):
+            print("===> LibreOffice daemon disabled (LO_DAEMON=0)")
+        else:
+            uno = _import_uno(lo_bin)
+            if uno is None:
+                print("===> pyuno not importable, converting with soffice --convert-to per request")
+            else:
+                daemon = _LibreOfficeDaemon(lo_bin, uno)
+                try:
+                    daemon.start()
+                    _DAEMON = daemon
+                except Exception as e:
+                    print(f"===> LibreOffice daemon failed to start ({e}), using soffice --convert-to")
+    return _DAEMON or None
+
+
+# ---------- Conversion cache: SHA-256(docx) + converter version + options ----------
+
+_CONVERTER_VERSION = None
+
+
+def _converter_version(lo_bin):
+    """LibreOffice build id from program/versionrc (or CONVERTER_VERSION), part of the cache key."""
+    global _CONVERTER_VERSION
+    if _CONVERTER_VERSION is None:
+        version = os.environ.get('CONVERTER_VERSION', '')
+        if not version:
+            try:
+                with open(os.path.join(os.path.dirname(lo_bin), 'versionrc')) as f:
+                    values = dict(line.strip().split('=', 1) for line in f if '=' in line)
+                version = '%s-%s' % (values.get('ProductVersion', values.get('ProductMajor', '')),
+                                     values.get('buildid', ''))
+            except OSError:
+                version = 'unknown'
+        _CONVERTER_VERSION = version
+    return _CONVERTER_VERSION
+
+
+class _PdfCache:
+    """In-memory LRU in front of an S3 prefix or a local directory."""
+
+    def __init__(self):
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.memory_limit = PDF_CACHE_MEMORY_MB * 1024 * 1024
+        self.counters = {'memory_hits': 0, 'store_hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+
+    def key(self, docx_bytes, lo_bin):
+        h = hashlib.sha256(docx_bytes)
+        h.update(b'\0' + _converter_version(lo_bin).encode() + b'\0' + PDF_EXPORT_OPTIONS.encode())
+        return h.hexdigest()
+
+    def _remember(self, key, pdf_bytes):
+        if len(pdf_bytes) > self.memory_limit:
+            return
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key))
+        self.memory[key] = pdf_bytes
+        self.memory_bytes += len(pdf_bytes)
+        while self.memory_bytes > self.memory_limit:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def _local_path(self, key):
+        return os.path.join(PDF_CACHE_DIR, key[:2], key + '.pdf')
+
+    def get(self, key):
+        """Returns (pdf bytes, 'memory' | 'store') or (None, 'miss')."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.counters['memory_hits'] += 1
+            return self.memory[key], 'memory'
+        pdf_bytes = None
+        try:
+            if PDF_CACHE_BUCKET:
+                obj = s3_client.get_object(Bucket=PDF_CACHE_BUCKET, Key=PDF_CACHE_PREFIX + key + '.pdf')
+                pdf_bytes = obj['Body'].read()
+            elif PDF_CACHE_DIR and os.path.isfile(self._local_path(key)):
+                with open(self._local_path(key), 'rb') as f:
+                    pdf_bytes = f.read()
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                self.counters['errors'] += 1
+                print(f"===> PDF cache read failed: {e}")
+        except OSError as e:
+            self.counters['errors'] += 1
+            print(f"===> PDF cache read failed: {e}")
+        if pdf_bytes:
+            self.counters['store_hits'] += 1
+            self._remember(key, pdf_bytes)
+            return pdf_bytes, 'store'
+        self.counters['misses'] += 1
+        return None, 'miss'
+
+    def put(self, key, pdf_bytes):
+        self._remember(key, pdf_bytes)
+        try:
+            if PDF_CACHE_BUCKET:
+                s3_client.put_object(Bucket=PDF_CACHE_BUCKET, Key=PDF_CACHE_PREFIX + key + '.pdf',
+                                     Body=pdf_bytes, ContentType='application/pdf')
+            elif PDF_CACHE_DIR:
+                path = self._local_path(key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f'{path}.{os.getpid()}.tmp'
+                with open(tmp, 'wb') as f:
+                    f.write(pdf_bytes)
+                os.replace(tmp, path)  # readers never see a partial PDF
+            else:
+                return
+            self.counters['stores'] += 1
+        except (ClientError, OSError) as e:
+            self.counters['errors'] += 1
+            print(f"===> PDF cache write failed: {e}")
+
+    def stats(self):
+        hits = self.counters['memory_hits'] + self.counters['store_hits']
+        lookups = hits + self.counters['misses']
+        return dict(self.counters,
+                    hit_rate=round(hits / lookups, 3) if lookups else None,
+                    memory_items=len(self.memory),
+                    memory_bytes=self.memory_bytes,
+                    backend='s3' if PDF_CACHE_BUCKET else ('dir' if PDF_CACHE_DIR else 'memory'))
+
+
+_PDF_CACHE = _PdfCache() if PDF_CACHE else None
+
+
+# ---------- Native fast path: simple paragraph/table documents rendered with reportlab ----------
+# The registries are a title, a few paragraphs and one ledger table. Documents that use only the
+# elements in _NATIVE_TAGS are drawn directly (tens of ms); anything else goes to LibreOffice.
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+_NATIVE_TAGS = {
+    'document', 'body', 'sectPr', 'pgSz', 'pgMar', 'cols', 'docGrid',
+    'p', 'pPr', 'pStyle', 'jc', 'spacing', 'ind', 'keepNext', 'keepLines', 'widowControl', 'tabs',
+    'r', 'rPr', 't', 'tab', 'br', 'lastRenderedPageBreak', 'proofErr', 'bookmarkStart', 'bookmarkEnd',
+    'rFonts', 'sz', 'szCs', 'sz-cs', 'b', 'bCs', 'i', 'iCs', 'u', 'color', 'lang', 'noProof',
+    'tbl', 'tblPr', 'tblStyle', 'tblW', 'tblInd', 'tblLook', 'tblLayout', 'tblBorders', 'tblCellMar',
+    'top', 'left', 'bottom', 'right', 'start', 'end', 'insideH', 'insideV',
+    'tblGrid', 'gridCol', 'tr', 'trPr', 'tblHeader', 'cantSplit', 'tc', 'tcPr', 'tcW', 'vAlign',
+}
+
+# Style metadata that does not affect rendering
+_NATIVE_STYLE_TAGS = {'style', 'name', 'aliases', 'basedOn', 'next', 'link', 'qFormat', 'uiPriority',
+                      'semiHidden', 'unhideWhenUsed', 'hidden', 'locked', 'autoRedefine', 'rsid'}
+
+_NATIVE_FAMILIES = {
+    # Word family -> (Liberation TTF family, base-14 fallback); Liberation is metric-compatible
+    'serif': ('LiberationSerif', ('Times-Roman', 'Times-Bold', 'Times-Italic', 'Times-BoldItalic')),
+    'sans': ('LiberationSans', ('Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique', 'Helvetica-BoldOblique')),
+    'mono': ('LiberationMono', ('Courier', 'Courier-Bold', 'Courier-Oblique', 'Courier-BoldOblique')),
+}
+_NATIVE_FONT_ALIASES = {
+    'times new roman': 'serif', 'times': 'serif', 'liberation serif': 'serif', 'tinos': 'serif',
+    'georgia': 'serif', 'cambria': 'serif', 'garamond': 'serif', 'book antiqua': 'serif',
+    'arial': 'sans', 'helvetica': 'sans', 'liberation sans': 'sans', 'arimo': 'sans', 'calibri': 'sans',
+    'carlito': 'sans', 'aptos': 'sans', 'verdana': 'sans', 'tahoma': 'sans', 'segoe ui': 'sans',
+    'courier new': 'mono', 'courier': 'mono', 'liberation mono': 'mono', 'cousine': 'mono', 'consolas': 'mono',
+}
+_NATIVE_FONT_DIRS = ('/usr/share/fonts', '/opt/libreoffice/share/fonts', '/tmp/instdir/share/fonts')
+
+try:
+    from reportlab.lib.colors import HexColor, black
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+    _REPORTLAB = True
+except ImportError:
+    _REPORTLAB = False
+
+_NATIVE_FACES = {}
+_NATIVE_FONT_FILES = None
+
+
+class _NativeUnsupported(Exception):
+    pass
+
+
+def _w(el, name):
+    return el.find(_W + name) if el is not None else None
+
+
+def _wval(el, name='val', default=None):
+    return el.get(_W + name, default) if el is not None else default
+
+
+def _native_face(family, bold, italic):
+    """reportlab font name for a Word family/style; Liberation TTFs when installed, else base-14."""
+    kind = _NATIVE_FONT_ALIASES.get((family or '').strip().lower())
+    if kind is None:
+        raise _NativeUnsupported(f'font {family!r}')
+    key = (kind, bold, italic)
+    if key not in _NATIVE_FACES:
+        global _NATIVE_FONT_FILES
+        if _NATIVE_FONT_FILES is None:
+            _NATIVE_FONT_FILES = {}
+            for font_dir in _NATIVE_FONT_DIRS:
+                for root, _, names in os.walk(font_dir):
+                    for name in names:
+                        _NATIVE_FONT_FILES.setdefault(name, os.path.join(root, name))
+        ttf_family, base14 = _NATIVE_FAMILIES[kind]
+        style = ('Regular', 'Bold', 'Italic', 'BoldItalic')[bold + 2 * italic]
+        path = _NATIVE_FONT_FILES.get(f'{ttf_family}-{style}.ttf')
+        if path:
+            pdfmetrics.registerFont(TTFont(f'{ttf_family}-{style}', path))
+            _NATIVE_FACES[key] = f'{ttf_family}-{style}'
+        else:
+            _NATIVE_FACES[key] = base14[bold + 2 * italic]
+    return _NATIVE_FACES[key]
+
+
+def _native_rpr(rpr, theme, props):
+    """props updated with one w:rPr (bold, italic, underline, size, font, color)."""
+    if rpr is None:
+        return props
+    props = dict(props)
+    for child in rpr:
+        tag = child.tag[len(_W):]
+        val = child.get(_W + 'val')
+        if tag in ('b', 'i'):
+            props['bold' if tag == 'b' else 'italic'] = val not in ('0', 'false', 'off')
+        elif tag == 'u':
+            props['underline'] = val not in ('none', '0', 'false')
+        elif tag == 'sz':
+            props['size'] = int(val) / 2
+        elif tag == 'color':
+            props['color'] = None if val in (None, 'auto') else val
+        elif tag == 'rFonts':
+            theme_ref = child.get(_W + 'asciiTheme') or child.get(_W + 'hAnsiTheme')
+            if theme_ref:
+                props['font'] = theme['major' if theme_ref.startswith('major') else 'minor']
+            elif child.get(_W + 'ascii') or child.get(_W + 'hAnsi'):
+                props['font'] = child.get(_W + 'ascii') or child.get(_W + 'hAnsi')
+    return props
+
+
+def _native_ppr(ppr, props):
+    """props updated with one w:pPr (alignment, spacing, indents, tab stops, keep-with-next)."""
+    if ppr is None:
+        return props
+    props = dict(props)
+    jc = _wval(_w(ppr, 'jc'))
+    if jc:
+        props['jc'] = jc
+    spacing = _w(ppr, 'spacing')
+    if spacing is not None:
+        for attr in ('before', 'after', 'line', 'lineRule'):
+            if spacing.get(_W + attr) is not None:
+                props[attr] = spacing.get(_W + attr)
+    ind = _w(ppr, 'ind')
+    if ind is not None:
+        for attr, key in (('left', 'left'), ('start', 'left'), ('right', 'right'), ('end', 'right'),
+                          ('firstLine', 'firstLine'), ('hanging', 'hanging')):
+            if ind.get(_W + attr) is not None:
+                props[key] = int(ind.get(_W + attr))
+    if _w(ppr, 'keepNext') is not None:
+        props['keepNext'] = _wval(_w(ppr, 'keepNext')) not in ('0', 'false')
+    tabs = _w(ppr, 'tabs')
+    if tabs is not None:
+        props['tabs'] = sorted(int(t.get(_W + 'pos')) for t in tabs if t.get(_W + 'val') != 'clear')
+    return props
+
+
+class _NativeDoc:
+    """Resolved styles, theme fonts and defaults of one DOCX for the native renderer."""
+
+    def __init__(self, parts):
+        self.theme = {'major': 'Times New Roman', 'minor': 'Times New Roman'}
+        if 'word/theme/theme1.xml' in parts:
+            theme = ET.fromstring(parts['word/theme/theme1.xml'])
+            for which in ('major', 'minor'):
+                latin = theme.find(f'.//{_A}{which}Font/{_A}latin')
+                if latin is not None and latin.get('typeface'):
+                    self.theme[which] = latin.get('typeface')
+        self.styles = {}
+        self.rpr = {'bold': False, 'italic': False, 'underline': False, 'size': 10.0,
+                    'font': 'Times New Roman', 'color': None}
+        self.ppr = {'jc': 'left', 'before': '0', 'after': '0', 'line': '240', 'lineRule': 'auto',
+                    'left': 0, 'right': 0, 'firstLine': 0, 'hanging': 0, 'keepNext': False, 'tabs': []}
+        self.default_pstyle = None
+        if 'word/styles.xml' in parts:
+            styles = ET.fromstring(parts['word/styles.xml'])
+            defaults = _w(styles, 'docDefaults')
+            self.rpr = _native_rpr(_w(_w(defaults, 'rPrDefault'), 'rPr'), self.theme, self.rpr)
+            self.ppr = _native_ppr(_w(_w(defaults, 'pPrDefault'), 'pPr'), self.ppr)
+            for style in styles.findall(_W + 'style'):
+                self.styles[style.get(_W + 'styleId')] = style
+                if style.get(_W + 'type') == 'paragraph' and style.get(_W + 'default') == '1':
+                    self.default_pstyle = style.get(_W + 'styleId')
+
+    def style_chain(self, style_id):
+        chain = []
+        while style_id and style_id in self.styles and len(chain) < 10:
+            style = self.styles[style_id]
+            for el in style.iter():
+                if el.tag.startswith(_W) and el.tag[len(_W):] not in _NATIVE_TAGS | _NATIVE_STYLE_TAGS:
+                    raise _NativeUnsupported(f'style {style_id} uses w:{el.tag[len(_W):]}')
+            chain.insert(0, style)
+            style_id = _wval(_w(style, 'basedOn'))
+        return chain
+
+    def paragraph_props(self, ppr_el):
+        ppr, rpr = self.ppr, self.rpr
+        for style in self.style_chain(_wval(_w(ppr_el, 'pStyle')) or self.default_pstyle):
+            ppr = _native_ppr(_w(style, 'pPr'), ppr)
+            rpr = _native_rpr(_w(style, 'rPr'), self.theme, rpr)
+        return _native_ppr(ppr_el, ppr), rpr
+
+
+def _native_paragraph(p, doc, flowables):
+    ppr_el = _w(p, 'pPr')
+    ppr, base_rpr = doc.paragraph_props(ppr_el)
+    mark_rpr = _native_rpr(_w(ppr_el, 'rPr'), doc.theme, base_rpr)
+    first = (ppr['firstLine'] - ppr['hanging']) / 20
+    x = first
+    sizes = []
+    parts = []
+    face = size = None
+
+    def flush(page_break=False):
+        nonlocal parts, sizes, x
+        props = mark_rpr if not sizes else None
+        if props is not None:
+            parts.append('&nbsp;')
+            sizes.append(props['size'])
+        font_size = max(sizes)
+        line, rule = int(ppr['line']), ppr['lineRule']
+        leading = line / 20 if rule in ('exact', 'atLeast') else font_size * 1.15 * line / 240
+        if rule == 'atLeast':
+            leading = max(leading, font_size * 1.15)
+        style = ParagraphStyle(
+            'p',
+            fontName=_native_face(mark_rpr['font'], mark_rpr['bold'], mark_rpr['italic']),
+            fontSize=font_size,
+            leading=leading,
+            alignment={'center': TA_CENTER, 'right': TA_RIGHT, 'end': TA_RIGHT,
+                       'both': TA_JUSTIFY, 'distribute': TA_JUSTIFY}.get(ppr['jc'], TA_LEFT),
+            leftIndent=ppr['left'] / 20,
+            rightIndent=ppr['right'] / 20,
+            firstLineIndent=first,
+            spaceBefore=int(ppr['before']) / 20,
+            spaceAfter=int(ppr['after']) / 20,
+            keepWithNext=ppr['keepNext'],
+        )
+        flowables.append(Paragraph(''.join(parts), style))
+        if page_break:
+            flowables.append(PageBreak())
+        parts, sizes, x = [], [], first
+
+    for r in p.findall(_W + 'r'):
+        props = _native_rpr(_w(r, 'rPr'), doc.theme, base_rpr)
+        face = _native_face(props['font'], props['bold'], props['italic'])
+        size = props['size']
+        open_tag = f'<font name="{face}" size="{size:g}"' + (f' color="#{props["color"]}"' if props['color'] else '') + '>'
+        close_tag = '</font>'
+        if props['underline']:
+            open_tag, close_tag = open_tag + '<u>', '</u>' + close_tag
+        for child in r:
+            tag = child.tag[len(_W):]
+            if tag == 't' and child.text:
+                parts.append(open_tag + child.text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;') + close_tag)
+                sizes.append(size)
+                x += pdfmetrics.stringWidth(child.text, face, size)
+            elif tag == 'tab':
+                # No tab stops in reportlab paragraphs: pad with spaces to the next stop
+                stops = [pos / 20 for pos in ppr['tabs'] if pos / 20 > x + 1]
+                stop = stops[0] if stops else (int(x // 36) + 1) * 36
+                space = pdfmetrics.stringWidth(' ', face, size) or size / 4
+                parts.append(open_tag + '&nbsp;' * max(1, int(round((stop - x) / space))) + close_tag)
+                sizes.append(size)
+                x = stop
+            elif tag == 'br':
+                if _wval(child, 'type') == 'page':
+                    flush(page_break=True)
+                else:
+                    parts.append('<br/>')
+                    x = ppr['left'] / 20
+    flush()
+
+
+def _native_border(el):
+    val = _wval(el)
+    if val in ('nil', 'none'):
+        return None
+    if val not in ('single', 'thick'):
+        raise _NativeUnsupported(f'border {val}')
+    color = _wval(el, 'color')
+    return (max(int(_wval(el, 'sz', '4')) / 8, 0.25), black if color in (None, 'auto') else HexColor('#' + color))
+
+
+def _native_table(tbl, doc, flowables):
+    tbl_pr = _w(tbl, 'tblPr')
+    style_tbl_pr = None
+    for style in doc.style_chain(_wval(_w(tbl_pr, 'tblStyle'))):
+        style_tbl_pr = _w(style, 'tblPr') if _w(style, 'tblPr') is not None else style_tbl_pr
+    borders = {}
+    for source in (style_tbl_pr, tbl_pr):
+        for side_el in (_w(_w(source, 'tblBorders'), name) for name in ('top', 'left', 'bottom', 'right', 'start', 'end', 'insideH', 'insideV')):
+            if side_el is not None:
+                side = {'start': 'left', 'end': 'right'}.get(side_el.tag[len(_W):], side_el.tag[len(_W):])
+                borders[side] = _native_border(side_el)
+    margins = {'top': 0, 'left': 108, 'bottom': 0, 'right': 108}
+    for source in (style_tbl_pr, tbl_pr):
+        for side_el in list(_w(source, 'tblCellMar') if _w(source, 'tblCellMar') is not None else []):
+            side = {'start': 'left', 'end': 'right'}.get(side_el.tag[len(_W):], side_el.tag[len(_W):])
+            margins[side] = int(_wval(side_el, 'w', '0'))
+    widths = [int(_wval(col, 'w', '0')) / 20 for col in _w(tbl, 'tblGrid').findall(_W + 'gridCol')]
+    rows, commands, header_rows = [], [], 0
+    for r_idx, tr in enumerate(tbl.findall(_W + 'tr')):
+        cells = tr.findall(_W + 'tc')
+        if len(cells) != len(widths):
+            raise _NativeUnsupported('row does not match the table grid')
+        if _w(_w(tr, 'trPr'), 'tblHeader') is not None and header_rows == r_idx:
+            header_rows += 1
+        row = []
+        for c_idx, tc in enumerate(cells):
+            content = []
+            for child in tc:
+                if child.tag == _W + 'p':
+                    _native_paragraph(child, doc, content)
+                elif child.tag != _W + 'tcPr':
+                    raise _NativeUnsupported('nested table')
+            row.append(content)
+            v_align = _wval(_w(_w(tc, 'tcPr'), 'vAlign'))
+            if v_align in ('center', 'bottom'):
+                commands.append(('VALIGN', (c_idx, r_idx), (c_idx, r_idx), 'MIDDLE' if v_align == 'center' else 'BOTTOM'))
+        rows.append(row)
+    if not rows:
+        return
+    for side, pad in (('TOP', 'top'), ('LEFT', 'left'), ('BOTTOM', 'bottom'), ('RIGHT', 'right')):
+        commands.append((side + 'PADDING', (0, 0), (-1, -1), margins[pad] / 20))
+    lines = (('top', 'LINEABOVE', (0, 0), (-1, 0)), ('bottom', 'LINEBELOW', (0, -1), (-1, -1)),
+             ('left', 'LINEBEFORE', (0, 0), (0, -1)), ('right', 'LINEAFTER', (-1, 0), (-1, -1)),
+             ('insideH', 'LINEBELOW', (0, 0), (-1, -2)), ('insideV', 'LINEAFTER', (0, 0), (-2, -1)))
+    for side, op, start, stop in lines:
+        if borders.get(side) and not (side == 'insideH' and len(rows) < 2) and not (side == 'insideV' and len(widths) < 2):
+            commands.append((op, start, stop) + borders[side])
+    commands.insert(0, ('VALIGN', (0, 0), (-1, -1), 'TOP'))  # per-cell vAlign commands override it
+    jc = _wval(_w(tbl_pr, 'jc'))
+    table = Table(rows, colWidths=widths, repeatRows=header_rows,
+                  hAlign={'center': 'CENTER', 'right': 'RIGHT', 'end': 'RIGHT'}.get(jc, 'LEFT'))
+    table.setStyle(TableStyle(commands))
+    flowables.append(table)
+
+
+def _render_native(docx_bytes):
+    """PDF bytes for documents inside the supported subset, else None (use LibreOffice)."""
+    if not (NATIVE_RENDER and _REPORTLAB):
+        return None
+    started = time.time()
+    try:
+        with zipfile.ZipFile(io.BytesIO(docx_bytes)) as z:
+            names = set(z.namelist())
+            parts = {name: z.read(name) for name in ('word/document.xml', 'word/styles.xml', 'word/theme/theme1.xml') if name in names}
+        body = _w(ET.fromstring(parts['word/document.xml']), 'body')
+        paragraphs = 0
+        for el in body.iter():
+            if not el.tag.startswith(_W) or el.tag[len(_W):] not in _NATIVE_TAGS:
+                raise _NativeUnsupported(el.tag.rsplit('}', 1)[-1])
+            paragraphs += el.tag == _W + 'p'
+        if paragraphs > NATIVE_MAX_PARAGRAPHS:
+            raise _NativeUnsupported(f'{paragraphs} paragraphs')
+        cols = _w(_w(body, 'sectPr'), 'cols')
+        if cols is not None and int(_wval(cols, 'num', '1')) > 1:
+            raise _NativeUnsupported('multiple columns')
+
+        doc = _NativeDoc(parts)
+        flowables = []
+        for child in body:
+            if child.tag == _W + 'p':
+                _native_paragraph(child, doc, flowables)
+            elif child.tag == _W + 'tbl':
+                _native_table(child, doc, flowables)
+        sect = _w(body, 'sectPr')
+        pg_sz, pg_mar = _w(sect, 'pgSz'), _w(sect, 'pgMar')
+
+        def twips(el, name, default):
+            return int(_wval(el, name, default)) / 20
+
+        out = io.BytesIO()
+        SimpleDocTemplate(
+            out,
+            pagesize=(twips(pg_sz, 'w', '12240'), twips(pg_sz, 'h', '15840')),
+            topMargin=twips(pg_mar, 'top', '1440'),
+            bottomMargin=twips(pg_mar, 'bottom', '1440'),
+            leftMargin=twips(pg_mar, 'left', '1440'),
+            rightMargin=twips(pg_mar, 'right', '1440'),
+        ).build(flowables)
+    except _NativeUnsupported as e:
+        print(f"===> Native render skipped ({e}), using LibreOffice")
+        return None
+    except Exception as e:
+        print(f"===> Native render failed ({e}), using LibreOffice")
+        return None
+    print(f"===> Native render: {paragraphs} paragraphs in {(time.time() - started) * 1000:.0f}ms")
+    return out.getvalue()
+
+
+def _convert_all(lo_bin, inputs, outdir):
+    """Convert every input in one LibreOffice session: the daemon if available, else one
+    --convert-to run for whatever it did not produce. Returns (error response or None, {inp: ms})."""
+    timings = {}
+    daemon = _get_daemon(lo_bin)
+    if daemon is not None:
+        for inp in inputs:
+            started = time.time()
+            try:
+                daemon.convert(inp, _pdf_path(inp))
+                timings[inp] = int((time.time() - started) * 1000)
+            except Exception as e:
+                print(f"===> Daemon conversion of {os.path.basename(inp)} failed ({e}), falling back to soffice --convert-to")
+    remaining = [inp for inp in inputs if not os.path.isfile(_pdf_path(inp))]
+    if not remaining:
+        return None, timings
+    started = time.time()
+    error = _convert_with_subprocess(lo_bin, remaining, outdir)
+    elapsed = int((time.time() - started) * 1000)
+    # One process converted them all; attribute the run evenly
+    for inp in remaining:
+        if os.path.isfile(_pdf_path(inp)):
+            timings[inp] = elapsed // len(remaining)
+    return error, timings
+
+
+def _read_document(doc):
+    """Bytes of one batch entry: inline docx_base64 or an S3 object."""
+    if doc.get('docx_base64'):
+        return base64.b64decode(doc['docx_base64'])
+    if doc.get('s3_bucket') and doc.get('s3_key'):
+        return s3_client.get_object(Bucket=doc['s3_bucket'], Key=doc['s3_key'])['Body'].read()
+    raise ValueError('Each document needs docx_base64 or s3_bucket + s3_key')
+
+
+def _write_output(doc, pdf_bytes):
+    """Where the PDF goes: S3 when output_s3_key is given or the input came from S3 (default key:
+    the input key with .pdf), else inline base64. Returns the response fields for it."""
+    key = doc.get('output_s3_key')
+    if not key and doc.get('s3_key') and not doc.get('docx_base64'):
+        key = os.path.splitext(doc['s3_key'])[0] + '.pdf'
+    if not key:
+        return {'pdf_base64': base64.b64encode(pdf_bytes).decode('ascii')}
+    bucket = doc.get('output_s3_bucket') or doc.get('s3_bucket')
+    if not bucket:
+        raise ValueError('output_s3_key needs output_s3_bucket')
+    s3_client.put_object(Bucket=bucket, Key=key, Body=pdf_bytes, ContentType='application/pdf')
+    print(f"===> Uploaded PDF to s3://{bucket}/{key} ({len(pdf_bytes)} bytes)")
+    return {'s3_bucket': bucket, 's3_key': key, 'size': len(pdf_bytes)}
+
+
+def _store_result(result, doc, pdf_bytes):
+    try:
+        result.update(_write_output(doc, pdf_bytes))
+    except Exception as e:
+        result['error'] = f'Could not store PDF: {e}'
+
+
+def _convert_batch(documents, native=True):
+    """Convert a list of documents in one LibreOffice session with per-file results."""
+    started = time.time()
+    LO_BIN = _get_lo_bin()
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        inputs = {}
+        sources = {}
+        keys = {}
+        for index, doc in enumerate(documents):
+            doc = doc or {}
+            name = doc.get('name') or os.path.basename(doc.get('s3_key') or '') or f'document-{index + 1}.docx'
+            result = {'index': index, 'name': name}
+            results.append(result)
+            try:
+                docx_bytes = _read_document(doc)
+            except Exception as e:
+                result['error'] = str(e)
+                continue
+            native_started = time.time()
+            pdf_bytes = _render_native(docx_bytes) if native else None
+            if pdf_bytes is not None:
+                result['renderer'] = 'native'
+                result['elapsed_ms'] = int((time.time() - native_started) * 1000)
+                _store_result(result, doc, pdf_bytes)
+                continue
+            result['renderer'] = 'libreoffice'
+            if _PDF_CACHE is not None:
+                keys[index] = _PDF_CACHE.key(docx_bytes, LO_BIN)
+                pdf_bytes, source = _PDF_CACHE.get(keys[index])
+                if pdf_bytes is not None:
+                    result['cached'] = source
+                    result['elapsed_ms'] = 0
+                    _store_result(result, doc, pdf_bytes)
+                    continue
+            # Index prefix keeps output PDFs distinct when two inputs share a name
+            stem = re.sub(r'[^A-Za-z0-9._-]+', '_', os.path.splitext(name)[0])[:80]
+            inp = os.path.join(tmpdir, f'{index:03d}-{stem}.docx')
+            with open(inp, 'wb') as f:
+                f.write(docx_bytes)
+            inputs[index] = inp
+            sources[index] = doc
+
+        error, timings = _convert_all(LO_BIN, list(inputs.values()), tmpdir) if inputs else (None, {})
+        error_body = json.loads(error['body']) if error else {'error': 'Conversion failed'}
+        if error is not None and error['statusCode'] == 503:
+            return error
+        for index, inp in inputs.items():
+            result = results[index]
+            out_pdf = _pdf_path(inp)
+            if os.path.isfile(out_pdf):
+                with open(out_pdf, 'rb') as f:
+                    pdf_bytes = f.read()
+                if index in keys:
+                    _PDF_CACHE.put(keys[index], pdf_bytes)
+                result['elapsed_ms'] = timings.get(inp)
+                _store_result(result, sources[index], pdf_bytes)
+            else:
+                result['error'] = error_body.get('error', 'Conversion failed')
+                if error_body.get('stderr'):
+                    result['stderr'] = error_body['stderr'][-500:]
+
+    converted = sum(1 for r in results if 'error' not in r)
+    elapsed_ms = int((time.time() - started) * 1000)
+    cached = sum(1 for r in results if r.get('cached'))
+    print(f"===> Batch converted {converted}/{len(results)} documents ({cached} cached) in {elapsed_ms}ms")
+    response = {
+        'results': results,
+        'converted': converted,
+        'failed': len(results) - converted,
+        'elapsed_ms': elapsed_ms,
+    }
+    if _PDF_CACHE is not None:
+        response['cache'] = _PDF_CACHE.stats()
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps(response),
+    }
+
+
+def lambda_handler(event, context):
+    try:
+        # Support both: Function URL (event.body) and direct Invoke (event.docx_base64)
+        body = event.get('body')
+        if isinstance(body, str):
+            body = json.loads(body)
+        payload = (body if body else event) or {}
+        if payload.get('cache_stats'):
             return {
-                'statusCode': 500,
+                'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({
-                    'error': 'Conversion failed',
-                    'stderr': last_stderr,
-                    'stdout': last_stdout[:500],
-                    'returncode': last_rc,
-                }),
+                'body': json.dumps({'cache': _PDF_CACHE.stats() if _PDF_CACHE is not None else None}),
             }
-        with open(out_pdf, 'rb') as f:
-            pdf_b64 = base64.b64encode(f.read()).decode('ascii')
+        documents = payload.get('documents')
+        if documents is not None:
+            if not isinstance(documents, list) or not documents:
+                return _error(400, {'error': 'documents must be a non-empty list'})
+            return _convert_batch(documents, native=payload.get('native', True) is not False)
+        if not payload.get('docx_base64') and not payload.get('s3_key'):
+            return _error(400, {'error': 'Missing docx_base64 (or s3_bucket + s3_key)'})
+        if payload.get('output_s3_key') and not (payload.get('output_s3_bucket') or payload.get('s3_bucket')):
+            return _error(400, {'error': 'output_s3_key needs output_s3_bucket'})
+        docx_bytes = _read_document(payload)
+    except Exception as e:
+        return _error(400, {'error': str(e)})
 
+    pdf_bytes = _render_native(docx_bytes) if payload.get('native', True) is not False else None
+    if pdf_bytes is not None:
+        headers = {'Content-Type': 'application/json', 'X-Pdf-Renderer': 'native'}
+    else:
+        pdf_bytes, headers = _convert_single(docx_bytes)
+        if pdf_bytes is None:
+            return headers  # the conversion's error response
+    try:
+        output = _write_output(payload, pdf_bytes)
+    except Exception as e:
+        return _error(500, {'error': f'Could not store PDF: {e}'})
     return {
         'statusCode': 200,
-        'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps({'pdf_base64': pdf_b64}),
+        'headers': headers,
+        'body': json.dumps(output),
     }
+
+
+def _convert_single(docx_bytes):
+    """LibreOffice conversion of one document through the cache. Returns (pdf bytes, headers),
+    or (None, error response)."""
+    LO_BIN = _get_lo_bin()
+    pdf_bytes = None
+    cache_key, source = None, 'off'
+    if _PDF_CACHE is not None:
+        cache_key = _PDF_CACHE.key(docx_bytes, LO_BIN)
+        pdf_bytes, source = _PDF_CACHE.get(cache_key)
+    if pdf_bytes is None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, 'input.docx')
+            with open(inp, 'wb') as f:
+                f.write(docx_bytes)
+            out_pdf = _pdf_path(inp)
+            error, _ = _convert_all(LO_BIN, [inp], tmpdir)
+            if error is not None:
+                return None, error
+            with open(out_pdf, 'rb') as f:
+                pdf_bytes = f.read()
+        if cache_key is not None:
+            _PDF_CACHE.put(cache_key, pdf_bytes)
+    if _PDF_CACHE is not None:
+        stats = _PDF_CACHE.stats()
+        print(f"===> PDF cache lookup: {source} (hit rate {stats['hit_rate']}, {stats['memory_items']} in memory)")
+
+    return pdf_bytes, {'Content-Type': 'application/json', 'X-Pdf-Renderer': 'libreoffice', 'X-Pdf-Cache': source}
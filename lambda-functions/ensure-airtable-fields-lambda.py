@@ -1,5 +1,5 @@
 """
-Lambda: Ensure Airtable Formations table has all required document URL fields.
+Lambda: Ensure Airtable Formations table has all required document URL (and autofill) fields.
 Creates any missing fields via Airtable Metadata API so the app stops getting UNKNOWN_FIELD_NAME.
 Run on deploy or invoke manually. Requires AIRTABLE_API_KEY and AIRTABLE_BASE_ID in env (or from SSM).
 """
@@ -23,6 +23,11 @@ REQUIRED_DOCUMENT_URL_FIELDS = [
     "8821 URL",
 ]
 
+# Text fields used by the Sunbiz autofill watcher (claim tokens)
+REQUIRED_TEXT_FIELDS = [
+    "Autofill Claim",
+]
+
 
 def get_table_id(base_id: str, api_key: str) -> str:
     req = urllib.request.Request(
@@ -47,8 +52,8 @@ def get_existing_field_names(base_id: str, table_id: str, api_key: str) -> list:
     return [f["name"] for f in data.get("fields", [])]
 
 
-def create_field(base_id: str, table_id: str, field_name: str, api_key: str) -> dict:
-    body = json.dumps({"name": field_name, "type": "url"}).encode()
+def create_field(base_id: str, table_id: str, field_name: str, api_key: str, field_type: str = "url") -> dict:
+    body = json.dumps({"name": field_name, "type": field_type}).encode()
     req = urllib.request.Request(
         f"https://api.airtable.com/v0/meta/bases/{base_id}/tables/{table_id}/fields",
         data=body,
@@ -76,13 +81,15 @@ def lambda_handler(event, context):
     try:
         table_id = get_table_id(base_id, api_key)
         existing = get_existing_field_names(base_id, table_id, api_key)
-        missing = [f for f in REQUIRED_DOCUMENT_URL_FIELDS if f not in existing]
+        required = {f: "url" for f in REQUIRED_DOCUMENT_URL_FIELDS}
+        required.update({f: "singleLineText" for f in REQUIRED_TEXT_FIELDS})
+        missing = [f for f in required if f not in existing]
         created = []
         errors = []
 
         for field_name in missing:
             try:
-                create_field(base_id, table_id, field_name, api_key)
+                create_field(base_id, table_id, field_name, api_key, required[field_name])
                 created.append(field_name)
             except urllib.error.HTTPError as e:
                 body = e.read().decode() if e.fp else ""
@@ -96,7 +103,7 @@ def lambda_handler(event, context):
                 "table": TABLE_NAME,
                 "tableId": table_id,
                 "created": created,
-                "alreadyExisted": [f for f in REQUIRED_DOCUMENT_URL_FIELDS if f in existing],
+                "alreadyExisted": [f for f in required if f in existing],
                 "errors": errors if errors else None,
             }),
         }
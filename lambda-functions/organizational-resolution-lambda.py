@@ -1,7 +1,12 @@
 import os
 import json
 import tempfile
+import hashlib
+import io
+import zipfile
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
@@ -9,6 +14,7 @@ from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 import re
 import base64
+import time
 from copy import deepcopy
 from datetime import datetime
 
@@ -20,6 +26,35 @@ BUCKET_NAME = os.environ.get('BUCKET_NAME', TEMPLATE_BUCKET)
 # Initialize S3 client
 s3_client = boto3.client('s3', region_name='us-west-1')
 
+# DOCX->PDF converter for "also_pdf" requests (S3 hand-off, see convert_to_pdf)
+DOCX_TO_PDF_FUNCTION = os.environ.get('DOCX_TO_PDF_FUNCTION', 'docx-to-pdf-lambda')
+DOCX_TO_PDF_REGION = os.environ.get('DOCX_TO_PDF_REGION', 'us-west-2')
+_lambda_client = None
+
+# Download links for response_mode "url" / "stream" (see link_response)
+RESPONSE_MODES = ("base64", "url", "stream")
+PRESIGN_REGION = os.environ.get('PRESIGN_REGION', 'us-west-1')
+PRESIGN_EXPIRES = int(os.environ.get('PRESIGN_EXPIRES', '300'))
+_presign_client = None
+
+# Render cache: same template ETag + generator code + form_data -> server-side copy of the stored file
+RENDER_CACHE = os.environ.get('RENDER_CACHE', '1') != '0'
+RENDER_CACHE_BUCKET = os.environ.get('RENDER_CACHE_BUCKET', '')  # default: the request's s3_bucket
+RENDER_CACHE_PREFIX = os.environ.get('RENDER_CACHE_PREFIX', 'render-cache/')
+RENDER_CACHE_NAME = 'organizational-resolution'
+with open(__file__, 'rb') as _src:
+    # Any change to this file invalidates its cached renders
+    GENERATOR_VERSION = os.environ.get('GENERATOR_VERSION') or hashlib.sha256(_src.read()).hexdigest()[:16]
+_render_stats = {}
+
+# Template manifest (scripts/build-template-manifest.py): variant -> bucket/key/ETag/size, loaded at init
+TEMPLATE_MANIFEST = os.environ.get('TEMPLATE_MANIFEST', 's3://company-formation-template-llc-and-inc/template-manifest.json')
+TEMPLATE_MANIFEST_TTL = int(os.environ.get('TEMPLATE_MANIFEST_TTL', '300'))
+TEMPLATE_PREFETCH = int(os.environ.get('TEMPLATE_PREFETCH', '8'))
+TEMPLATE_MEMORY_ITEMS = int(os.environ.get('TEMPLATE_MEMORY_ITEMS', '32'))
+_manifest = {'version': None, 'etag': None, 'loaded_at': 0.0, 'variants': {}, 'by_key': {}}
+_template_bytes = {}  # (bucket, key) -> (etag, bytes, time S3 last confirmed the etag)
+
 def download_from_s3(bucket, key, local_path):
     """Download file from S3 to local path"""
     print(f"===> Downloading s3://{bucket}/{key} to {local_path}")
@@ -32,6 +67,251 @@ def upload_to_s3(local_path, bucket, key):
     s3_client.upload_file(local_path, bucket, key)
     print(f"===> Uploaded successfully")
 
+def convert_to_pdf(bucket, key, pdf_key=None):
+    """Have docx-to-pdf-lambda read s3://bucket/key and write the PDF to S3 (no bytes in JSON).
+    Returns response fields: pdf_s3_bucket/pdf_s3_key, or pdf_error (the DOCX is still delivered)."""
+    global _lambda_client
+    pdf_key = pdf_key or os.path.splitext(key)[0] + '.pdf'
+    print(f"===> Requesting PDF s3://{bucket}/{pdf_key} from {DOCX_TO_PDF_FUNCTION}")
+    try:
+        if _lambda_client is None:
+            _lambda_client = boto3.client('lambda', region_name=DOCX_TO_PDF_REGION)
+        response = _lambda_client.invoke(
+            FunctionName=DOCX_TO_PDF_FUNCTION,
+            InvocationType='RequestResponse',
+            Payload=json.dumps({'s3_bucket': bucket, 's3_key': key, 'output_s3_key': pdf_key}).encode('utf-8'),
+        )
+        result = json.loads(response['Payload'].read() or b'{}')
+        result_body = json.loads(result.get('body') or '{}')
+        if response.get('FunctionError') or result.get('statusCode') != 200:
+            raise RuntimeError(result_body.get('error') or result.get('errorMessage') or response.get('FunctionError') or f"status {result.get('statusCode')}")
+        print(f"===> PDF ready ({(result.get('headers') or {}).get('X-Pdf-Renderer', 'unknown')} renderer)")
+        return {'pdf_s3_bucket': result_body['s3_bucket'], 'pdf_s3_key': result_body['s3_key']}
+    except Exception as e:
+        print(f"===> PDF conversion failed: {e}")
+        return {'pdf_error': str(e)}
+
+def presigned_url(bucket, key, filename):
+    """Short-lived GET URL for an object this invocation just uploaded"""
+    global _presign_client
+    if _presign_client is None:
+        _presign_client = boto3.client(
+            's3', region_name=PRESIGN_REGION, endpoint_url=f'https://s3.{PRESIGN_REGION}.amazonaws.com',
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'virtual'}),
+        )
+    return _presign_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': key, 'ResponseContentDisposition': f'attachment; filename="{filename}"'},
+        ExpiresIn=PRESIGN_EXPIRES,
+    )
+
+def link_response(mode, bucket, key, filename, fields, headers=None):
+    """Response for response_mode "url" (JSON with download_url) or "stream" (303 redirect, so the
+    client reads the raw bytes straight from S3 instead of base64 through the Lambda)."""
+    url = presigned_url(bucket, key, filename)
+    print(f"===> Presigned link for s3://{bucket}/{key} ({mode}, expires in {PRESIGN_EXPIRES}s)")
+    if mode == "stream":
+        return {
+            "statusCode": 303,
+            "headers": {"Location": url, "Cache-Control": "no-store", **(headers or {})},
+            "body": ""
+        }
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": json.dumps({**fields, "download_url": url, "expires_in": PRESIGN_EXPIRES})
+    }
+
+def load_template_manifest():
+    """(Re)load TEMPLATE_MANIFEST once per TEMPLATE_MANIFEST_TTL (conditional GET). Indexes this
+    generator's templates by variant and by (bucket, key); drops in-memory copies whose ETag changed."""
+    if not TEMPLATE_MANIFEST.startswith('s3://') or time.time() - _manifest['loaded_at'] < TEMPLATE_MANIFEST_TTL:
+        return
+    _manifest['loaded_at'] = time.time()
+    bucket, key = TEMPLATE_MANIFEST[5:].split('/', 1)
+    try:
+        conditional = {'IfNoneMatch': _manifest['etag']} if _manifest['etag'] else {}
+        obj = s3_client.get_object(Bucket=bucket, Key=key, **conditional)
+        data = json.loads(obj['Body'].read())
+    except Exception as e:
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') != '304':
+            print(f"===> Template manifest unavailable, downloading templates on demand: {e}")
+        return
+    variants = {v: t for v, t in data.get('variants', {}).items() if t.get('generator') == RENDER_CACHE_NAME}
+    by_key = {(t['bucket'], t['key']): t for t in variants.values()}
+    for k, (etag, *_) in list(_template_bytes.items()):
+        if by_key.get(k, {}).get('etag') != etag:
+            del _template_bytes[k]
+    _manifest.update(version=data.get('version'), etag=obj.get('ETag'), variants=variants, by_key=by_key)
+    print(f"===> Template manifest v{data.get('version')}: {len(variants)} {RENDER_CACHE_NAME} templates")
+
+def prefetch_templates():
+    """Read the TEMPLATE_PREFETCH highest-ranked templates into memory (runs during init)"""
+    hot = sorted(_manifest['by_key'].values(), key=lambda t: t.get('rank', 0))[:TEMPLATE_PREFETCH]
+    if not hot:
+        return
+    started = time.time()
+
+    def fetch(t):
+        try:
+            # IfMatch: a template changed since the manifest was built is not trusted (no cached ETag either)
+            body = s3_client.get_object(Bucket=t['bucket'], Key=t['key'], IfMatch=f'"{t["etag"]}"')['Body'].read()
+            _template_bytes[(t['bucket'], t['key'])] = (t['etag'], body, time.time())
+        except Exception as e:
+            print(f"===> Prefetch skipped for {t['key']}: {e}")
+            _manifest['by_key'].pop((t['bucket'], t['key']), None)
+
+    with ThreadPoolExecutor(max_workers=len(hot)) as pool:
+        list(pool.map(fetch, hot))
+    print(f"===> Prefetched {len(_template_bytes)}/{len(hot)} templates in {(time.time() - started) * 1000:.0f}ms")
+
+def template_url_for(variant):
+    """s3:// URL of a manifest variant (O(1) lookup, no listing), or None"""
+    t = _manifest['variants'].get(variant) if variant else None
+    return f"s3://{t['bucket']}/{t['key']}" if t else None
+
+def template_etag(bucket, key):
+    """ETag of the in-memory template when S3 confirmed it within TEMPLATE_MANIFEST_TTL (saves the
+    render-cache HEAD), else None"""
+    cached = _template_bytes.get((bucket, key))
+    if cached and time.time() - cached[2] < TEMPLATE_MANIFEST_TTL:
+        return cached[0]
+    return None
+
+def confirm_template_etag(bucket, key, etag):
+    """Record an ETag just read from S3: re-confirms the in-memory copy, or drops it if the template changed"""
+    cached = _template_bytes.get((bucket, key))
+    if not cached:
+        return
+    if cached[0] == etag.strip('"'):
+        _template_bytes[(bucket, key)] = (cached[0], cached[1], time.time())
+    else:
+        print(f"===> Template s3://{bucket}/{key} changed in S3, dropping the in-memory copy")
+        del _template_bytes[(bucket, key)]
+
+def fetch_template(bucket, key, local_path):
+    """Write the template to local_path from memory when prefetched or seen before (re-checked with a
+    HEAD once per TEMPLATE_MANIFEST_TTL), else from S3. Manifest templates downloaded on demand are kept
+    in memory (up to TEMPLATE_MEMORY_ITEMS), but only when S3 returned the version the manifest lists."""
+    if (bucket, key) in _template_bytes and not template_etag(bucket, key):
+        try:
+            confirm_template_etag(bucket, key, s3_client.head_object(Bucket=bucket, Key=key)['ETag'])
+        except Exception as e:
+            print(f"===> Template HEAD failed ({e}), using the in-memory copy")
+    cached = _template_bytes.get((bucket, key))
+    if cached:
+        with open(local_path, 'wb') as f:
+            f.write(cached[1])
+        print(f"===> Template s3://{bucket}/{key} from memory (manifest v{_manifest['version']})")
+        return
+    entry = _manifest['by_key'].get((bucket, key))
+    if not entry:
+        download_from_s3(bucket, key, local_path)
+        return
+    print(f"===> Downloading s3://{bucket}/{key} to {local_path}")
+    obj = s3_client.get_object(Bucket=bucket, Key=key)
+    body = obj['Body'].read()
+    with open(local_path, 'wb') as f:
+        f.write(body)
+    if obj['ETag'].strip('"') != entry['etag']:
+        # Re-uploaded without rebuilding the manifest: use it, but trust neither the bytes nor the manifest ETag
+        print(f"===> Template s3://{bucket}/{key} differs from manifest v{_manifest['version']}, not cached")
+        _manifest['by_key'].pop((bucket, key), None)
+    elif len(_template_bytes) < TEMPLATE_MEMORY_ITEMS:
+        _template_bytes[(bucket, key)] = (entry['etag'], body, time.time())
+
+load_template_manifest()
+prefetch_templates()
+
+def render_cache_key(template_bucket, template_key, form_data, **extra):
+    """Deterministic render-cache key from the template ETag, GENERATOR_VERSION and canonical
+    form_data (sorted keys). The ETag is HEADed unless the in-memory template was confirmed within
+    TEMPLATE_MANIFEST_TTL. None when the cache is off or the template HEAD fails."""
+    if not RENDER_CACHE:
+        return None
+    etag = template_etag(template_bucket, template_key)
+    if not etag:
+        try:
+            etag = s3_client.head_object(Bucket=template_bucket, Key=template_key)['ETag']
+        except Exception as e:
+            print(f"===> Render cache skipped: template HEAD failed ({e})")
+            return None
+        confirm_template_etag(template_bucket, template_key, etag)
+    canonical = json.dumps(
+        {"template": f"{template_bucket}/{template_key}", "etag": etag.strip('"'), "version": GENERATOR_VERSION,
+         "form_data": form_data, **extra},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str,
+    )
+    return f"{RENDER_CACHE_PREFIX}{RENDER_CACHE_NAME}/{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}.docx"
+
+def restore_render(cache_key, bucket, key, extras=False):
+    """Server-side copy of a cached render to bucket/key. Returns the extras stored with it
+    ({} unless extras=True), or None on a miss."""
+    cache_bucket = RENDER_CACHE_BUCKET or bucket
+    try:
+        stored = {}
+        if extras:
+            obj = s3_client.get_object(Bucket=cache_bucket, Key=cache_key + '.json')
+            stored = json.loads(obj['Body'].read())
+        s3_client.copy_object(
+            Bucket=bucket, Key=key, CopySource={'Bucket': cache_bucket, 'Key': cache_key}, MetadataDirective='COPY'
+        )
+        return stored
+    except Exception as e:
+        code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+        if code not in ('NoSuchKey', '404'):
+            print(f"===> Render cache lookup failed, rendering: {e}")
+        return None
+
+def store_render(cache_key, bucket, key, extras=None):
+    """Server-side copy of a fresh render at bucket/key into the cache (extras first, as JSON)"""
+    cache_bucket = RENDER_CACHE_BUCKET or bucket
+    try:
+        if extras is not None:
+            s3_client.put_object(
+                Bucket=cache_bucket, Key=cache_key + '.json',
+                Body=json.dumps(extras).encode('utf-8'), ContentType='application/json'
+            )
+        s3_client.copy_object(
+            Bucket=cache_bucket, Key=cache_key, CopySource={'Bucket': bucket, 'Key': key}, MetadataDirective='COPY'
+        )
+    except Exception as e:
+        print(f"===> Render cache store failed: {e}")
+
+def record_render(outcome, started):
+    """Log the render-cache outcome (hit/miss/off) and emit it as a CloudWatch embedded metric"""
+    _render_stats[outcome] = _render_stats.get(outcome, 0) + 1
+    elapsed_ms = round((time.time() - started) * 1000)
+    print(f"===> Render cache {outcome} in {elapsed_ms}ms (container totals: {_render_stats})")
+    if outcome != 'off':
+        print(json.dumps({
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": "DocumentGenerators",
+                    "Dimensions": [["Generator"]],
+                    "Metrics": [
+                        {"Name": "RenderCacheHit", "Unit": "Count"},
+                        {"Name": "RenderCacheMiss", "Unit": "Count"},
+                        {"Name": "RenderMs", "Unit": "Milliseconds"}
+                    ]
+                }]
+            },
+            "Generator": RENDER_CACHE_NAME,
+            "RenderCacheHit": int(outcome == 'hit'),
+            "RenderCacheMiss": int(outcome == 'miss'),
+            "RenderMs": elapsed_ms
+        }))
+
+def save_docx(doc, path):
+    """doc.save with fixed zip entry timestamps, so the same input always gives the same bytes"""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(buffer) as src, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            dst.writestr(zipfile.ZipInfo(info.filename, date_time=(1980, 1, 1, 0, 0, 0)), src.read(info.filename),
+                         compress_type=zipfile.ZIP_DEFLATED)
+
 def extract_s3_info(url):
     """Extract bucket and key from S3 URL"""
     if not url:
@@ -447,6 +727,20 @@ def replace_placeholders(doc, data):
     def replace_placeholder_in_paragraph(paragraph, placeholder, value, bold_value=False):
         if placeholder not in paragraph.text:
             return
+        # Fast path: normalized templates keep each placeholder inside a single run
+        if placeholder not in value:
+            for run in paragraph.runs:
+                text = run.text
+                if placeholder not in text:
+                    continue
+                if not bold_value:
+                    run.text = text.replace(placeholder, value)
+                elif text == placeholder:
+                    run.text = value
+                    run.bold = True
+            if placeholder not in paragraph.text:
+                return
+        # Slow path: placeholder split across runs (or bold value inside a longer run)
         full_text = ''.join(run.text for run in paragraph.runs)
         search_start = 0
         while True:
@@ -1026,9 +1320,366 @@ def post_process_org_resolution(doc):
     print(f"===> Post-processing done: {removed} excess empties removed, {pages_removed} PAGE X removed, {resolved_fixed} RESOLVED keepNext")
 
 
+# ---------- Structural audit (docs/AGREEMENT_QA_STRATEGY.md, layers L1-L4) ----------
+
+# Python port of scripts/audit-corp-structure.mjs so every generated
+# document is checked in-process instead of only in the variant sweep.
+# One walk over document.xml builds a light record per paragraph; every
+# detector then runs over those records, so the whole audit stays well
+# under the 50 ms budget even for the 6-owner variants.
+
+AUDIT_BUDGET_MS = 50
+
+_AUDIT_SEC_RE = re.compile(r'^(\d+)\.(\d+)(?=\s|[A-Z]|$)')
+_AUDIT_LETTER_RE = re.compile(r'^([A-Z])\.(?:\s|[^.])')
+_AUDIT_ROMAN_RE = re.compile(r'^(i|ii|iii|iv|v|vi|vii|viii|ix|x)\.(?:\s|[^.])')
+_AUDIT_ROMAN_VALUES = {'i': 1, 'ii': 2, 'iii': 3, 'iv': 4, 'v': 5,
+                       'vi': 6, 'vii': 7, 'viii': 8, 'ix': 9, 'x': 10}
+_AUDIT_ARTICLE_RE = re.compile(r'^ARTICLE\s+([IVXLCDM]+)', re.IGNORECASE)
+_AUDIT_TITLE_ONLY_RE = re.compile(r"^\d+\.\d+\s*[A-Z][\w\s'’,&\-/]+\.\s*$")
+_AUDIT_INLINE_TITLED_RE = re.compile(r"^\d+\.\d+\s+[A-Z][\w\s'’,&-]+\.\s+\S")
+_AUDIT_CAPTION_RE = re.compile(r"^\d+\.\d+\s+[A-Z][\w\s'’,&-]*\.?\s*$")
+_AUDIT_SECTION_REF_RE = re.compile(
+    r'\b(?:Section|Sec\.?|Paragraph|paragraph)\s+(\d+)\.(\d+)'
+    r'(?:\.([A-Z])|\(([A-Z])\)|([A-Z])\b)?(?=[\s.,;)]|$)')
+_AUDIT_ARTICLE_REF_RE = re.compile(r'\bArticle\s+([IVXLCDM]+)\b')
+_AUDIT_SIG_HEADER_RE = re.compile(r'[“"]SHAREHOLDERS[”"]')
+_AUDIT_OWNER_TAG_RE = re.compile(r'^\d+(?:\.\d+)?%\s+Owner\s*$')
+_AUDIT_SIG_LINE_RE = re.compile(r'[“"](?:SHAREHOLDERS|CORPORATION)[”"]|Florida corporation|^(?:By:|Name:|Title:)')
+
+
+def _audit_int(value):
+    try:
+        return int(round(float(value)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _audit_on(el):
+    """True when an on/off property element is present and not switched off."""
+    return el is not None and el.get(qn('w:val')) not in ('0', 'false', 'off')
+
+
+def _audit_collect(body):
+    """Single pass over the body: one record per paragraph plus table anchors."""
+    P, TBL = qn('w:p'), qn('w:tbl')
+    T, R, TAB = qn('w:t'), qn('w:r'), qn('w:tab')
+    paras = []
+    pre_table = []
+    for el in body.iter(P, TBL):
+        if el.tag == TBL:
+            if paras:
+                pre_table.append(len(paras) - 1)
+            continue
+        pPr = el.find(qn('w:pPr'))
+        left = hanging = first_line = 0
+        style = jc = ''
+        keep_next = page_break = False
+        if pPr is not None:
+            ind = pPr.find(qn('w:ind'))
+            if ind is not None:
+                left = _audit_int(ind.get(qn('w:left')) or ind.get(qn('w:start')))
+                hanging = _audit_int(ind.get(qn('w:hanging')))
+                first_line = _audit_int(ind.get(qn('w:firstLine')))
+            pStyle = pPr.find(qn('w:pStyle'))
+            if pStyle is not None:
+                style = pStyle.get(qn('w:val')) or ''
+            jc_el = pPr.find(qn('w:jc'))
+            if jc_el is not None:
+                jc = jc_el.get(qn('w:val')) or ''
+            keep_next = _audit_on(pPr.find(qn('w:keepNext')))
+            page_break = _audit_on(pPr.find(qn('w:pageBreakBefore')))
+        text = ''.join(t.text or '' for t in el.iter(T))
+        lead_tabs = 0
+        first_run = el.find(R)
+        if first_run is not None:
+            for child in first_run:
+                if child.tag == T:
+                    break
+                if child.tag == TAB:
+                    lead_tabs += 1
+        paras.append({
+            'el': el, 'text': text, 'stripped': text.strip(),
+            'left': left, 'hanging': hanging, 'first_line': first_line,
+            'style': style, 'jc': jc, 'keep_next': keep_next,
+            'page_break': page_break, 'lead_tabs': lead_tabs,
+        })
+    return paras, pre_table
+
+
+def _audit_heading_runs(p_el):
+    """(text, underlined) per run, used by the L2 run-shape checks."""
+    runs = []
+    for r in p_el.iter(qn('w:r')):
+        u = r.find(qn('w:rPr') + '/' + qn('w:u'))
+        underlined = u is not None and u.get(qn('w:val')) not in (None, 'none')
+        runs.append((''.join(t.text or '' for t in r.iter(qn('w:t'))), underlined))
+    return runs
+
+
+def audit_document(doc):
+    """Run the L1-L4 structural checks on a generated resolution.
+
+    Returns a dict with the detected entity, the paragraph count, the list
+    of issues ({layer, code, para, message}) and the elapsed time. Issues are
+    reported only; the document is never modified.
+    """
+    started = time.perf_counter()
+    issues = []
+
+    def push(layer, code, para, message):
+        issues.append({'layer': layer, 'code': code, 'para': para, 'message': message})
+
+    paras, pre_table = _audit_collect(doc.element.body)
+    full_text = '\n'.join(p['text'] for p in paras)
+    if 'OPERATING AGREEMENT' in full_text:
+        entity = 'LLC'
+    elif "SHAREHOLDERS' AGREEMENT" in full_text or 'SHAREHOLDERS’ AGREEMENT' in full_text:
+        entity = 'CORP'
+    else:
+        entity = 'UNKNOWN'
+
+    sig_start = next((i for i, p in enumerate(paras) if _AUDIT_SIG_HEADER_RE.search(p['text'])), -1)
+
+    # --- Pass over paragraphs: hierarchy, sequences, targets, completeness ---
+    cur_article = None
+    cur_letter = last_letter = last_roman = None
+    article_idx = -1
+    article_has_section = False
+    existing_sections = set()
+    existing_articles = set()
+    section_letters = {}
+    cur_section = None
+    prev_section = None  # (major, minor) when the previous non-empty paragraph was a §X.Y
+
+    for i, p in enumerate(paras):
+        t = p['stripped']
+        if not t:
+            prev_section = None
+            continue
+
+        art_m = _AUDIT_ARTICLE_RE.match(t)
+        if art_m:
+            if article_idx >= 0 and not article_has_section:
+                push('L3', 'article_without_sections', article_idx,
+                     f"ARTICLE {cur_article} has no §X.Y subsections")
+            cur_article = art_m.group(1).upper()
+            existing_articles.add(cur_article)
+            article_idx, article_has_section = i, False
+            cur_letter = last_letter = last_roman = cur_section = prev_section = None
+            continue
+
+        sec_m = _AUDIT_SEC_RE.match(t)
+        if sec_m:
+            number = f"{sec_m.group(1)}.{sec_m.group(2)}"
+            article_has_section = True
+            cur_letter = last_letter = last_roman = None
+            if re.match(r'^\d+\.\d+\s*[A-Z]', t):
+                existing_sections.add(number)
+                section_letters.setdefault(number, set())
+                cur_section = number
+            if len(t) < 80 and _AUDIT_TITLE_ONLY_RE.match(t) and not p['keep_next']:
+                push('L1', 'title_without_keep_next', i, f"§{number} title without keepNext: {t[:60]}")
+            if prev_section and prev_section[0] == sec_m.group(1):
+                push('L1', 'missing_section_separator', i,
+                     f"no empty separator between §{'.'.join(prev_section)} and §{number}")
+            prev_section = (sec_m.group(1), sec_m.group(2))
+            continue
+        prev_section = None
+
+        let_m = _AUDIT_LETTER_RE.match(t)
+        if let_m:
+            letter = let_m.group(1)
+            if entity == 'CORP' and (p['left'] - p['hanging'] != 1440 or not 200 <= p['hanging'] <= 800):
+                push('L1', 'letter_indent', i,
+                     f"letter {letter}. has non-canonical indent "
+                     f"(left={p['left']} hanging={p['hanging']}): {t[:60]}")
+            if last_letter is None:
+                if letter != 'A':
+                    push('L1', 'letter_sequence', i,
+                         f"first letter in ARTICLE {cur_article} sequence is {letter}., expected A.")
+            elif letter != chr(ord(last_letter) + 1):
+                push('L1', 'letter_sequence', i,
+                     f"letter sequence: expected {chr(ord(last_letter) + 1)}., got {letter}.")
+            if cur_section and p['left'] == 2160 and p['hanging'] == 720:
+                section_letters[cur_section].add(letter)
+            last_letter = cur_letter = letter
+            last_roman = None
+            continue
+
+        rom_m = _AUDIT_ROMAN_RE.match(t)
+        if rom_m:
+            roman = rom_m.group(1)
+            n = _AUDIT_ROMAN_VALUES[roman]
+            if entity == 'CORP' and (p['left'] - p['hanging'] != 2160 or not 150 <= p['hanging'] <= 720):
+                push('L1', 'roman_indent', i,
+                     f"roman {roman}. has non-canonical indent "
+                     f"(left={p['left']} hanging={p['hanging']}): {t[:60]}")
+            if cur_letter is None:
+                push('L1', 'roman_without_letter', i, f"roman {roman}. has no parent letter: {t[:60]}")
+            if last_roman is None:
+                if n != 1:
+                    push('L1', 'roman_sequence', i, f"first roman under {cur_letter}. is {roman}., expected i.")
+            elif n != _AUDIT_ROMAN_VALUES[last_roman] + 1:
+                push('L1', 'roman_sequence', i, f"roman sequence under {cur_letter}.: got {roman}. after {last_roman}.")
+            last_roman = roman
+            continue
+
+        if _AUDIT_OWNER_TAG_RE.match(t):
+            push('L3', 'owner_tag_left', i, f"leftover ownership tag paragraph: {t}")
+
+    if article_idx >= 0 and not article_has_section:
+        push('L3', 'article_without_sections', article_idx, f"ARTICLE {cur_article} has no §X.Y subsections")
+
+    # --- L1: cross-references point at sections/articles that still exist ---
+    for i, p in enumerate(paras):
+        t = p['stripped']
+        if not t or 'Section' not in t and 'aragraph' not in t and 'Sec.' not in t and 'Article' not in t:
+            continue
+        own_heading = re.match(r'^(?:\d+\.\d+|ARTICLE\s+[IVXLCDM]+)', t, re.IGNORECASE)
+        for m in _AUDIT_SECTION_REF_RE.finditer(t):
+            number = f"{m.group(1)}.{m.group(2)}"
+            if number not in existing_sections:
+                if own_heading and t.startswith(number):
+                    continue
+                push('L1', 'dangling_section_ref', i, f"cross-ref to non-existent §{number}: in \"{t[:80]}\"")
+                continue
+            letter = m.group(3) or m.group(4) or m.group(5)
+            if letter and letter not in section_letters.get(number, ()):
+                push('L1', 'dangling_section_ref', i, f"cross-ref to non-existent §{number}.{letter}: in \"{t[:80]}\"")
+        for m in _AUDIT_ARTICLE_REF_RE.finditer(t):
+            if m.group(1).upper() not in existing_articles:
+                push('L1', 'dangling_article_ref', i, f"cross-ref to non-existent ARTICLE {m.group(1)}: in \"{t[:80]}\"")
+
+    # --- L1: keepNext chain through empty separators after captions ---
+    for i, p in enumerate(paras[:-1]):
+        if not p['keep_next']:
+            continue
+        t = p['stripped']
+        if _AUDIT_INLINE_TITLED_RE.match(t):
+            continue
+        if t and not (re.match(r'^ARTICLE\s+[IVXLCDM]+[:.\s]', t) or _AUDIT_CAPTION_RE.match(t)):
+            continue
+        j = i + 1
+        while j < len(paras) and not paras[j]['stripped']:
+            if not paras[j]['keep_next'] and any(q['stripped'] for q in paras[j + 1:]):
+                push('L1', 'separator_without_keep_next', j,
+                     f"empty separator after keepNext paragraph lacks keepNext: after \"{t[:60]}\"")
+            j += 1
+
+    # --- L1 / L4: paragraphs right before a table ---
+    for i in pre_table:
+        p = paras[i]
+        if not p['keep_next']:
+            push('L1', 'pre_table_without_keep_next', i,
+                 f"pre-table paragraph without keepNext: {p['stripped'][:60]}")
+        if not p['stripped'] and p['page_break']:
+            push('L4', 'pre_table_page_break', i, "empty pre-table paragraph has pageBreakBefore (orphans the heading)")
+
+    # --- L2: run shape of numbered headings (Corp template only) ---
+    if entity == 'CORP':
+        for i, p in enumerate(paras):
+            sec_m = _AUDIT_SEC_RE.match(p['stripped'])
+            if not sec_m or (p['style'] != 'Heading3' and p['left'] != 1440):
+                continue
+            number = f"{sec_m.group(1)}.{sec_m.group(2)}"
+            runs = _audit_heading_runs(p['el'])
+            num_idx = next((k for k, (rt, _) in enumerate(runs) if re.match(r'^\d+\.\d+\s*$', rt)), -1)
+            if num_idx < 0:
+                push('L2', 'number_run_shape', i, f"§{number}: number not in its own un-underlined run")
+                continue
+            if runs[num_idx][1]:
+                push('L2', 'number_run_underlined', i, f"§{number}: number run is underlined (should be plain)")
+            if num_idx + 1 >= len(runs):
+                continue
+            title_text, title_underlined = runs[num_idx + 1]
+            if not title_underlined:
+                push('L2', 'title_run_not_underlined', i, f"§{number}: title run not underlined")
+            if title_text.endswith('.'):
+                push('L2', 'title_run_period', i, f"§{number}: title ends with \".\" (period belongs to the body run)")
+
+    # --- L3: empty headings and combined Name/Title paragraphs ---
+    for i, p in enumerate(paras):
+        t = p['stripped']
+        sec_m = _AUDIT_SEC_RE.match(t)
+        if sec_m and '.' in t:
+            if len(t[t.index('.') + 1:].strip()) < 20:
+                found, seen = False, 0
+                for q in paras[i + 1:]:
+                    nt = q['stripped']
+                    if not nt:
+                        continue
+                    if _AUDIT_SEC_RE.match(nt) or nt.upper().startswith('ARTICLE '):
+                        break
+                    if _AUDIT_LETTER_RE.match(nt) or _AUDIT_ROMAN_RE.match(nt) or len(nt) > 30:
+                        found = True
+                        break
+                    seen += 1
+                    if seen >= 4:
+                        break
+                if not found:
+                    push('L3', 'empty_section', i,
+                         f"§{sec_m.group(1)}.{sec_m.group(2)} has no body and no labeled sub-items: {t[:60]}")
+        if 'Name:' in t and 'Title:' in t:
+            push('L3', 'combined_name_title', i, f"combined Name+Title paragraph (should be split): {t[:80]}")
+
+    # --- L1 / L4: signature block ---
+    if sig_start >= 0:
+        first_left = None
+        for i in range(sig_start, len(paras)):
+            p = paras[i]
+            t = p['stripped']
+            if not t:
+                continue
+            if p['jc'] and p['jc'] != 'both':
+                push('L4', 'sig_block_justification', i,
+                     f"sig-block paragraph has jc={p['jc']} (should be both): {t[:60]}")
+            if re.match(r'^By:\s*_+', t):
+                nxt = next((q['stripped'] for q in paras[i + 1:] if q['stripped']), '')
+                if nxt.startswith('Name:') and not nxt[5:].strip():
+                    push('L1', 'empty_signature_block', i, "\"By: ___\" followed by a blank \"Name:\" line")
+            if _AUDIT_SIG_LINE_RE.search(t):
+                eff = p['left'] + p['first_line'] - p['hanging'] + p['lead_tabs'] * 720
+                if first_left is None:
+                    first_left = eff
+                elif eff != first_left:
+                    push('L4', 'sig_block_alignment', i,
+                         f"sig-block effective left {eff} differs from {first_left}: {t[:50]}")
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    counts = {}
+    for issue in issues:
+        counts[issue['layer']] = counts.get(issue['layer'], 0) + 1
+    print(f"===> Structural audit ({entity}): {len(paras)} paragraphs, {len(issues)} issues "
+          f"{counts or ''} in {elapsed_ms} ms")
+    for issue in issues:
+        print(f"===>   [{issue['layer']}] para {issue['para']}: {issue['message']}")
+    if elapsed_ms > AUDIT_BUDGET_MS:
+        print(f"===> WARNING: structural audit took {elapsed_ms} ms (budget {AUDIT_BUDGET_MS} ms)")
+
+    return {
+        'entity': entity,
+        'paragraphs': len(paras),
+        'issues': issues,
+        'passed': not issues,
+        'elapsed_ms': elapsed_ms,
+    }
+
+
+def _audit_summary(audit):
+    """Compact form of an audit result for the Lambda response body."""
+    return {
+        'passed': audit['passed'],
+        'issue_count': len(audit['issues']),
+        'issues': [f"[{i['layer']}] {i['message']}" for i in audit['issues']],
+        'elapsed_ms': audit['elapsed_ms'],
+    }
+
+
 def lambda_handler(event, context):
     print("===> RAW EVENT:")
     print(json.dumps(event))
+    load_template_manifest()
     
     try:
         # Parse request body
@@ -1040,8 +1691,10 @@ def lambda_handler(event, context):
         form_data = body.get("form_data")
         s3_bucket = body.get("s3_bucket")
         s3_key = body.get("s3_key")
-        templateUrl = body.get("templateUrl")
+        templateUrl = body.get("templateUrl") or template_url_for(body.get("template_variant"))
         return_docx = body.get("return_docx", False)
+        also_pdf = body.get("also_pdf", False)
+        response_mode = body.get("response_mode", "base64")
         
         if not form_data:
             return {
@@ -1061,6 +1714,12 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "Missing 'templateUrl'"})
             }
         
+        if response_mode not in RESPONSE_MODES:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": f"Invalid 'response_mode' (expected one of {', '.join(RESPONSE_MODES)})"})
+            }
+        
         # Extract template bucket and key from URL
         template_bucket, template_key = extract_s3_info(templateUrl)
         if not template_bucket or not template_key:
@@ -1084,26 +1743,57 @@ def lambda_handler(event, context):
     output_path = os.path.join(tmpdir, "filled_org_resolution.docx")
     
     try:
-        # Download template from S3
-        download_from_s3(template_bucket, template_key, template_path)
+        # Render cache: a repeat of an earlier request is a server-side copy (no template download or fill)
+        started = time.time()
+        render_key = render_cache_key(template_bucket, template_key, form_data) if body.get("render_cache", True) else None
+        cached = restore_render(render_key, s3_bucket, s3_key, extras=True) if render_key else None
+        if cached is not None:
+            audit = cached['audit']
+            if return_docx and response_mode == "base64":
+                download_from_s3(s3_bucket, s3_key, output_path)
+        else:
+            # Download template from S3
+            fetch_template(template_bucket, template_key, template_path)
         
-        # Load Word document
-        print("===> Loading Word document...")
-        doc = Document(template_path)
+            # Load Word document
+            print("===> Loading Word document...")
+            doc = Document(template_path)
         
-        # Replace placeholders with form data
-        replace_placeholders(doc, form_data)
+            # Replace placeholders with form data
+            replace_placeholders(doc, form_data)
 
-        # Apply best-practice formatting fixes
-        post_process_org_resolution(doc)
+            # Apply best-practice formatting fixes
+            post_process_org_resolution(doc)
 
-        # Save filled document
-        print("===> Saving filled document...")
-        doc.save(output_path)
-        print(f"===> Saved to {output_path}")
+            # Structural audit (L1-L4, report only)
+            audit = audit_document(doc)
+
+            # Save filled document
+            print("===> Saving filled document...")
+            save_docx(doc, output_path)
+            print(f"===> Saved to {output_path}")
+        
+            # Upload to S3
+            upload_to_s3(output_path, s3_bucket, s3_key)
+            if render_key:
+                store_render(render_key, s3_bucket, s3_key, {'audit': audit})
+        render_outcome = "hit" if cached is not None else "miss" if render_key else "off"
+        record_render(render_outcome, started)
+
+        # Optional PDF: docx-to-pdf-lambda reads the uploaded DOCX from S3 and writes the PDF next to it
+        pdf = convert_to_pdf(s3_bucket, s3_key, body.get("pdf_s3_key")) if also_pdf else {}
         
-        # Upload to S3
-        upload_to_s3(output_path, s3_bucket, s3_key)
+        # response_mode "url"/"stream": link to the uploaded DOCX instead of base64 in the body
+        if return_docx and response_mode != "base64":
+            return link_response(response_mode, s3_bucket, s3_key, os.path.basename(s3_key), {
+                "message": "✅ Document uploaded to S3",
+                "s3_bucket": s3_bucket,
+                "s3_key": s3_key,
+                "s3_url": f"s3://{s3_bucket}/{s3_key}",
+                "audit": _audit_summary(audit),
+                "render_cache": render_outcome,
+                **pdf
+            }, {"X-Structural-Audit-Issues": str(len(audit['issues'])), "X-Render-Cache": render_outcome, **({"X-Pdf-S3-Key": pdf["pdf_s3_key"]} if "pdf_s3_key" in pdf else {})})
         
         # Return response
         if return_docx:
@@ -1116,7 +1806,10 @@ def lambda_handler(event, context):
                 "statusCode": 200,
                 "headers": {
                     "Content-Type": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    "Content-Disposition": f'attachment; filename="{os.path.basename(s3_key)}"'
+                    "Content-Disposition": f'attachment; filename="{os.path.basename(s3_key)}"',
+                    "X-Structural-Audit-Issues": str(len(audit['issues'])),
+                    "X-Render-Cache": render_outcome,
+                    **({"X-Pdf-S3-Key": pdf["pdf_s3_key"]} if "pdf_s3_key" in pdf else {})
                 },
                 "body": encoded,
                 "isBase64Encoded": True
@@ -1128,7 +1821,10 @@ def lambda_handler(event, context):
                     "message": "✅ Document uploaded to S3",
                     "s3_bucket": s3_bucket,
                     "s3_key": s3_key,
-                    "s3_url": f"s3://{s3_bucket}/{s3_key}"
+                    "s3_url": f"s3://{s3_bucket}/{s3_key}",
+                    "audit": _audit_summary(audit),
+                    "render_cache": render_outcome,
+                    **pdf
                 })
             }
     
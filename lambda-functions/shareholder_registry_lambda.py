@@ -1,7 +1,13 @@
 import os
 import json
 import tempfile
+import hashlib
+import time
+import io
+import zipfile
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 import re
 import base64
 from copy import deepcopy
@@ -18,6 +24,35 @@ BUCKET_NAME = os.environ.get('BUCKET_NAME', TEMPLATE_BUCKET)
 # Initialize S3 client
 s3_client = boto3.client('s3', region_name=os.environ.get('AWS_REGION', 'us-west-1'))
 
+# DOCX->PDF converter for "also_pdf" requests (S3 hand-off, see convert_to_pdf)
+DOCX_TO_PDF_FUNCTION = os.environ.get('DOCX_TO_PDF_FUNCTION', 'docx-to-pdf-lambda')
+DOCX_TO_PDF_REGION = os.environ.get('DOCX_TO_PDF_REGION', 'us-west-2')
+_lambda_client = None
+
+# Download links for response_mode "url" / "stream" (see link_response)
+RESPONSE_MODES = ("base64", "url", "stream")
+PRESIGN_REGION = os.environ.get('PRESIGN_REGION', 'us-west-1')
+PRESIGN_EXPIRES = int(os.environ.get('PRESIGN_EXPIRES', '300'))
+_presign_client = None
+
+# Render cache: same template ETag + generator code + form_data -> server-side copy of the stored file
+RENDER_CACHE = os.environ.get('RENDER_CACHE', '1') != '0'
+RENDER_CACHE_BUCKET = os.environ.get('RENDER_CACHE_BUCKET', '')  # default: the request's s3_bucket
+RENDER_CACHE_PREFIX = os.environ.get('RENDER_CACHE_PREFIX', 'render-cache/')
+RENDER_CACHE_NAME = 'shareholder-registry'
+with open(__file__, 'rb') as _src:
+    # Any change to this file invalidates its cached renders
+    GENERATOR_VERSION = os.environ.get('GENERATOR_VERSION') or hashlib.sha256(_src.read()).hexdigest()[:16]
+_render_stats = {}
+
+# Template manifest (scripts/build-template-manifest.py): variant -> bucket/key/ETag/size, loaded at init
+TEMPLATE_MANIFEST = os.environ.get('TEMPLATE_MANIFEST', 's3://company-formation-template-llc-and-inc/template-manifest.json')
+TEMPLATE_MANIFEST_TTL = int(os.environ.get('TEMPLATE_MANIFEST_TTL', '300'))
+TEMPLATE_PREFETCH = int(os.environ.get('TEMPLATE_PREFETCH', '6'))
+TEMPLATE_MEMORY_ITEMS = int(os.environ.get('TEMPLATE_MEMORY_ITEMS', '32'))
+_manifest = {'version': None, 'etag': None, 'loaded_at': 0.0, 'variants': {}, 'by_key': {}}
+_template_bytes = {}  # (bucket, key) -> (etag, bytes, time S3 last confirmed the etag)
+
 
 def download_from_s3(bucket, key, local_path):
     """Download file from S3 to local path"""
@@ -33,6 +68,266 @@ def upload_to_s3(local_path, bucket, key):
     print("===> Uploaded successfully")
 
 
+def convert_to_pdf(bucket, key, pdf_key=None):
+    """Have docx-to-pdf-lambda read s3://bucket/key and write the PDF to S3 (no bytes in JSON).
+    Returns response fields: pdf_s3_bucket/pdf_s3_key, or pdf_error (the DOCX is still delivered)."""
+    global _lambda_client
+    pdf_key = pdf_key or os.path.splitext(key)[0] + '.pdf'
+    print(f"===> Requesting PDF s3://{bucket}/{pdf_key} from {DOCX_TO_PDF_FUNCTION}")
+    try:
+        if _lambda_client is None:
+            _lambda_client = boto3.client('lambda', region_name=DOCX_TO_PDF_REGION)
+        response = _lambda_client.invoke(
+            FunctionName=DOCX_TO_PDF_FUNCTION,
+            InvocationType='RequestResponse',
+            Payload=json.dumps({'s3_bucket': bucket, 's3_key': key, 'output_s3_key': pdf_key}).encode('utf-8'),
+        )
+        result = json.loads(response['Payload'].read() or b'{}')
+        result_body = json.loads(result.get('body') or '{}')
+        if response.get('FunctionError') or result.get('statusCode') != 200:
+            raise RuntimeError(result_body.get('error') or result.get('errorMessage') or response.get('FunctionError') or f"status {result.get('statusCode')}")
+        print(f"===> PDF ready ({(result.get('headers') or {}).get('X-Pdf-Renderer', 'unknown')} renderer)")
+        return {'pdf_s3_bucket': result_body['s3_bucket'], 'pdf_s3_key': result_body['s3_key']}
+    except Exception as e:
+        print(f"===> PDF conversion failed: {e}")
+        return {'pdf_error': str(e)}
+
+
+def presigned_url(bucket, key, filename):
+    """Short-lived GET URL for an object this invocation just uploaded"""
+    global _presign_client
+    if _presign_client is None:
+        _presign_client = boto3.client(
+            's3', region_name=PRESIGN_REGION, endpoint_url=f'https://s3.{PRESIGN_REGION}.amazonaws.com',
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'virtual'}),
+        )
+    return _presign_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': key, 'ResponseContentDisposition': f'attachment; filename="{filename}"'},
+        ExpiresIn=PRESIGN_EXPIRES,
+    )
+
+
+def link_response(mode, bucket, key, filename, fields, headers=None):
+    """Response for response_mode "url" (JSON with download_url) or "stream" (303 redirect, so the
+    client reads the raw bytes straight from S3 instead of base64 through the Lambda)."""
+    url = presigned_url(bucket, key, filename)
+    print(f"===> Presigned link for s3://{bucket}/{key} ({mode}, expires in {PRESIGN_EXPIRES}s)")
+    if mode == "stream":
+        return {
+            "statusCode": 303,
+            "headers": {"Location": url, "Cache-Control": "no-store", **(headers or {})},
+            "body": ""
+        }
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": json.dumps({**fields, "download_url": url, "expires_in": PRESIGN_EXPIRES})
+    }
+
+
+def load_template_manifest():
+    """(Re)load TEMPLATE_MANIFEST once per TEMPLATE_MANIFEST_TTL (conditional GET). Indexes this
+    generator's templates by variant and by (bucket, key); drops in-memory copies whose ETag changed."""
+    if not TEMPLATE_MANIFEST.startswith('s3://') or time.time() - _manifest['loaded_at'] < TEMPLATE_MANIFEST_TTL:
+        return
+    _manifest['loaded_at'] = time.time()
+    bucket, key = TEMPLATE_MANIFEST[5:].split('/', 1)
+    try:
+        conditional = {'IfNoneMatch': _manifest['etag']} if _manifest['etag'] else {}
+        obj = s3_client.get_object(Bucket=bucket, Key=key, **conditional)
+        data = json.loads(obj['Body'].read())
+    except Exception as e:
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') != '304':
+            print(f"===> Template manifest unavailable, downloading templates on demand: {e}")
+        return
+    variants = {v: t for v, t in data.get('variants', {}).items() if t.get('generator') == RENDER_CACHE_NAME}
+    by_key = {(t['bucket'], t['key']): t for t in variants.values()}
+    for k, (etag, *_) in list(_template_bytes.items()):
+        if by_key.get(k, {}).get('etag') != etag:
+            del _template_bytes[k]
+    _manifest.update(version=data.get('version'), etag=obj.get('ETag'), variants=variants, by_key=by_key)
+    print(f"===> Template manifest v{data.get('version')}: {len(variants)} {RENDER_CACHE_NAME} templates")
+
+
+def prefetch_templates():
+    """Read the TEMPLATE_PREFETCH highest-ranked templates into memory (runs during init)"""
+    hot = sorted(_manifest['by_key'].values(), key=lambda t: t.get('rank', 0))[:TEMPLATE_PREFETCH]
+    if not hot:
+        return
+    started = time.time()
+
+    def fetch(t):
+        try:
+            # IfMatch: a template changed since the manifest was built is not trusted (no cached ETag either)
+            body = s3_client.get_object(Bucket=t['bucket'], Key=t['key'], IfMatch=f'"{t["etag"]}"')['Body'].read()
+            _template_bytes[(t['bucket'], t['key'])] = (t['etag'], body, time.time())
+        except Exception as e:
+            print(f"===> Prefetch skipped for {t['key']}: {e}")
+            _manifest['by_key'].pop((t['bucket'], t['key']), None)
+
+    with ThreadPoolExecutor(max_workers=len(hot)) as pool:
+        list(pool.map(fetch, hot))
+    print(f"===> Prefetched {len(_template_bytes)}/{len(hot)} templates in {(time.time() - started) * 1000:.0f}ms")
+
+
+def template_url_for(variant):
+    """s3:// URL of a manifest variant (O(1) lookup, no listing), or None"""
+    t = _manifest['variants'].get(variant) if variant else None
+    return f"s3://{t['bucket']}/{t['key']}" if t else None
+
+
+def template_etag(bucket, key):
+    """ETag of the in-memory template when S3 confirmed it within TEMPLATE_MANIFEST_TTL (saves the
+    render-cache HEAD), else None"""
+    cached = _template_bytes.get((bucket, key))
+    if cached and time.time() - cached[2] < TEMPLATE_MANIFEST_TTL:
+        return cached[0]
+    return None
+
+
+def confirm_template_etag(bucket, key, etag):
+    """Record an ETag just read from S3: re-confirms the in-memory copy, or drops it if the template changed"""
+    cached = _template_bytes.get((bucket, key))
+    if not cached:
+        return
+    if cached[0] == etag.strip('"'):
+        _template_bytes[(bucket, key)] = (cached[0], cached[1], time.time())
+    else:
+        print(f"===> Template s3://{bucket}/{key} changed in S3, dropping the in-memory copy")
+        del _template_bytes[(bucket, key)]
+
+
+def fetch_template(bucket, key, local_path):
+    """Write the template to local_path from memory when prefetched or seen before (re-checked with a
+    HEAD once per TEMPLATE_MANIFEST_TTL), else from S3. Manifest templates downloaded on demand are kept
+    in memory (up to TEMPLATE_MEMORY_ITEMS), but only when S3 returned the version the manifest lists."""
+    if (bucket, key) in _template_bytes and not template_etag(bucket, key):
+        try:
+            confirm_template_etag(bucket, key, s3_client.head_object(Bucket=bucket, Key=key)['ETag'])
+        except Exception as e:
+            print(f"===> Template HEAD failed ({e}), using the in-memory copy")
+    cached = _template_bytes.get((bucket, key))
+    if cached:
+        with open(local_path, 'wb') as f:
+            f.write(cached[1])
+        print(f"===> Template s3://{bucket}/{key} from memory (manifest v{_manifest['version']})")
+        return
+    entry = _manifest['by_key'].get((bucket, key))
+    if not entry:
+        download_from_s3(bucket, key, local_path)
+        return
+    print(f"===> Downloading s3://{bucket}/{key} to {local_path}")
+    obj = s3_client.get_object(Bucket=bucket, Key=key)
+    body = obj['Body'].read()
+    with open(local_path, 'wb') as f:
+        f.write(body)
+    if obj['ETag'].strip('"') != entry['etag']:
+        # Re-uploaded without rebuilding the manifest: use it, but trust neither the bytes nor the manifest ETag
+        print(f"===> Template s3://{bucket}/{key} differs from manifest v{_manifest['version']}, not cached")
+        _manifest['by_key'].pop((bucket, key), None)
+    elif len(_template_bytes) < TEMPLATE_MEMORY_ITEMS:
+        _template_bytes[(bucket, key)] = (entry['etag'], body, time.time())
+
+
+load_template_manifest()
+prefetch_templates()
+
+
+def render_cache_key(template_bucket, template_key, form_data, **extra):
+    """Deterministic render-cache key from the template ETag, GENERATOR_VERSION and canonical
+    form_data (sorted keys). The ETag is HEADed unless the in-memory template was confirmed within
+    TEMPLATE_MANIFEST_TTL. None when the cache is off or the template HEAD fails."""
+    if not RENDER_CACHE:
+        return None
+    etag = template_etag(template_bucket, template_key)
+    if not etag:
+        try:
+            etag = s3_client.head_object(Bucket=template_bucket, Key=template_key)['ETag']
+        except Exception as e:
+            print(f"===> Render cache skipped: template HEAD failed ({e})")
+            return None
+        confirm_template_etag(template_bucket, template_key, etag)
+    canonical = json.dumps(
+        {"template": f"{template_bucket}/{template_key}", "etag": etag.strip('"'), "version": GENERATOR_VERSION,
+         "form_data": form_data, **extra},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str,
+    )
+    return f"{RENDER_CACHE_PREFIX}{RENDER_CACHE_NAME}/{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}.docx"
+
+
+def restore_render(cache_key, bucket, key, extras=False):
+    """Server-side copy of a cached render to bucket/key. Returns the extras stored with it
+    ({} unless extras=True), or None on a miss."""
+    cache_bucket = RENDER_CACHE_BUCKET or bucket
+    try:
+        stored = {}
+        if extras:
+            obj = s3_client.get_object(Bucket=cache_bucket, Key=cache_key + '.json')
+            stored = json.loads(obj['Body'].read())
+        s3_client.copy_object(
+            Bucket=bucket, Key=key, CopySource={'Bucket': cache_bucket, 'Key': cache_key}, MetadataDirective='COPY'
+        )
+        return stored
+    except Exception as e:
+        code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+        if code not in ('NoSuchKey', '404'):
+            print(f"===> Render cache lookup failed, rendering: {e}")
+        return None
+
+
+def store_render(cache_key, bucket, key, extras=None):
+    """Server-side copy of a fresh render at bucket/key into the cache (extras first, as JSON)"""
+    cache_bucket = RENDER_CACHE_BUCKET or bucket
+    try:
+        if extras is not None:
+            s3_client.put_object(
+                Bucket=cache_bucket, Key=cache_key + '.json',
+                Body=json.dumps(extras).encode('utf-8'), ContentType='application/json'
+            )
+        s3_client.copy_object(
+            Bucket=cache_bucket, Key=cache_key, CopySource={'Bucket': bucket, 'Key': key}, MetadataDirective='COPY'
+        )
+    except Exception as e:
+        print(f"===> Render cache store failed: {e}")
+
+
+def record_render(outcome, started):
+    """Log the render-cache outcome (hit/miss/off) and emit it as a CloudWatch embedded metric"""
+    _render_stats[outcome] = _render_stats.get(outcome, 0) + 1
+    elapsed_ms = round((time.time() - started) * 1000)
+    print(f"===> Render cache {outcome} in {elapsed_ms}ms (container totals: {_render_stats})")
+    if outcome != 'off':
+        print(json.dumps({
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": "DocumentGenerators",
+                    "Dimensions": [["Generator"]],
+                    "Metrics": [
+                        {"Name": "RenderCacheHit", "Unit": "Count"},
+                        {"Name": "RenderCacheMiss", "Unit": "Count"},
+                        {"Name": "RenderMs", "Unit": "Milliseconds"}
+                    ]
+                }]
+            },
+            "Generator": RENDER_CACHE_NAME,
+            "RenderCacheHit": int(outcome == 'hit'),
+            "RenderCacheMiss": int(outcome == 'miss'),
+            "RenderMs": elapsed_ms
+        }))
+
+
+def save_docx(doc, path):
+    """doc.save with fixed zip entry timestamps, so the same input always gives the same bytes"""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(buffer) as src, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            dst.writestr(zipfile.ZipInfo(info.filename, date_time=(1980, 1, 1, 0, 0, 0)), src.read(info.filename),
+                         compress_type=zipfile.ZIP_DEFLATED)
+
+
 def extract_s3_info(url):
     """Extract bucket and key from S3 URL"""
     if not url:
@@ -71,12 +366,6 @@ def _apply_run_format(source_run, target_run):
         target_run._element.insert(0, deepcopy(source_run._element.rPr))
 
 
-def _enforce_font(run):
-    """Ensure a modified run uses 12pt Times New Roman."""
-    run.font.size = Pt(12)
-    run.font.name = 'Times New Roman'
-
-
 def _replace_span_in_paragraph(paragraph, start, end, value):
     """Replace a character span [start, end) in the paragraph's runs with value.
     Preserves run formatting. Returns the run containing the replacement value, or None."""
@@ -151,6 +440,16 @@ def _replace_placeholder_in_paragraph(paragraph, placeholder, value):
         return []
 
     modified_runs = []
+    # Fast path: normalized templates keep each placeholder inside a single run
+    if placeholder not in value:
+        for run in paragraph.runs:
+            if placeholder in run.text:
+                run.text = run.text.replace(placeholder, value)
+                modified_runs.append(run)
+        if placeholder not in paragraph.text:
+            return modified_runs
+
+    # Slow path: placeholder split across runs
     full_text = ''.join(run.text for run in paragraph.runs)
     search_start = 0
     while True:
@@ -169,7 +468,7 @@ def _replace_placeholder_in_paragraph(paragraph, placeholder, value):
 
 def replace_placeholders(doc, data):
     """Replace placeholders in Shareholder Registry document using run-level replacement.
-    Enforces 12pt Times New Roman on all replaced values."""
+    Replaced values keep their run's formatting; fonts are normalized in post-processing."""
     print("===> Replacing placeholders in document...")
 
     company_name = data.get('companyName', '')
@@ -209,14 +508,8 @@ def replace_placeholders(doc, data):
     def process_paragraph(paragraph):
         if '{{' not in paragraph.text:
             return
-        modified_runs = []
         for ph, val in placeholders.items():
-            modified_runs.extend(
-                _replace_placeholder_in_paragraph(paragraph, ph, val)
-            )
-        # Enforce font on all modified runs
-        for run in modified_runs:
-            _enforce_font(run)
+            _replace_placeholder_in_paragraph(paragraph, ph, val)
 
     # Process body paragraphs
     for paragraph in doc.paragraphs:
@@ -284,12 +577,191 @@ def _set_table_col_widths(table, widths_inches):
                 tcPr.insert(0, tcW)
 
 
+# ---------- Style-level font normalization ----------
+
+FONT_NAME = 'Times New Roman'
+FONT_SIZE_HALF_POINTS = 24  # 12pt
+
+_RFONTS_ATTRS = ('ascii', 'hAnsi', 'cs', 'eastAsia')
+_RFONTS_THEME_ATTRS = ('asciiTheme', 'hAnsiTheme', 'cstheme', 'eastAsiaTheme')
+_HEADING_STYLE_RE = re.compile(r'^(Heading\d|Title|Subtitle)$')
+
+
+def _set_rpr_font(rPr, font_name, half_points=None):
+    """Point an rPr (style or docDefaults) at font_name, optionally fixing its size."""
+    rFonts = rPr.get_or_add_rFonts()
+    for attr in _RFONTS_THEME_ATTRS:
+        rFonts.attrib.pop(qn(f'w:{attr}'), None)
+    for attr in _RFONTS_ATTRS:
+        rFonts.set(qn(f'w:{attr}'), font_name)
+    if half_points is not None:
+        rPr.sz_val = Pt(half_points / 2)
+        szCs = rPr.find(qn('w:szCs'))
+        if szCs is None:
+            szCs = OxmlElement('w:szCs')
+            rPr.find(qn('w:sz')).addnext(szCs)
+        szCs.set(qn('w:val'), str(half_points))
+
+
+def _rpr_font_and_size(rPr):
+    """Return (font, half_points) declared directly on an rPr; None where unset.
+    A theme-font reference is returned as 'theme' since it cannot be compared by name."""
+    if rPr is None:
+        return None, None
+    font = None
+    rFonts = rPr.find(qn('w:rFonts'))
+    if rFonts is not None:
+        if any(rFonts.get(qn(f'w:{a}')) for a in _RFONTS_THEME_ATTRS):
+            font = 'theme'
+        else:
+            font = rFonts.get(qn('w:ascii')) or rFonts.get(qn('w:hAnsi'))
+    sz = rPr.find(qn('w:sz'))
+    size = sz.get(qn('w:val')) if sz is not None else None
+    return font, size
+
+
+def _build_style_resolver(styles_el):
+    """Resolve a styleId to its effective (font, half_points) through basedOn,
+    falling back to docDefaults. Results are memoized per call."""
+    default_rPr = styles_el.find(f"{qn('w:docDefaults')}/{qn('w:rPrDefault')}/{qn('w:rPr')}")
+    defaults = _rpr_font_and_size(default_rPr)
+    declared = {}
+    for style in styles_el.iterchildren(qn('w:style')):
+        based_on = style.find(qn('w:basedOn'))
+        declared[style.get(qn('w:styleId'))] = (
+            _rpr_font_and_size(style.find(qn('w:rPr'))),
+            based_on.get(qn('w:val')) if based_on is not None else None,
+        )
+    cache = {}
+
+    def resolve(style_id, seen=()):
+        if style_id is None or style_id not in declared or style_id in seen:
+            return None, None
+        if style_id not in cache:
+            (font, size), based_on = declared[style_id]
+            parent_font, parent_size = resolve(based_on, seen + (style_id,))
+            cache[style_id] = (font or parent_font, size or parent_size)
+        return cache[style_id]
+
+    def effective(style_id):
+        font, size = resolve(style_id)
+        return font or defaults[0], size or defaults[1]
+
+    return resolve, effective
+
+
+def _normalize_fonts(doc, font_name=FONT_NAME, half_points=FONT_SIZE_HALF_POINTS, force=False):
+    """Set the document font once in styles.xml and drop run-level overrides that repeat it.
+
+    docDefaults and the Normal style get font_name at half_points; heading styles
+    get font_name at their own size. Run-level rFonts/sz are then removed wherever
+    they equal what the run already inherits, so only genuine template deviations
+    keep a run-level font. With force=True every style is normalized and all
+    run-level fonts/sizes are removed (the whole document renders in font_name).
+    """
+    styles_el = doc.styles.element
+    doc_defaults = styles_el.find(qn('w:docDefaults'))
+    if doc_defaults is None:
+        doc_defaults = OxmlElement('w:docDefaults')
+        styles_el.insert(0, doc_defaults)
+    rPr_default = doc_defaults.find(qn('w:rPrDefault'))
+    if rPr_default is None:
+        rPr_default = OxmlElement('w:rPrDefault')
+        doc_defaults.insert(0, rPr_default)
+    rPr = rPr_default.find(qn('w:rPr'))
+    if rPr is None:
+        rPr = OxmlElement('w:rPr')
+        rPr_default.append(rPr)
+    _set_rpr_font(rPr, font_name, half_points)
+
+    default_para_style = None
+    styles_fixed = 0
+    for style in styles_el.iterchildren(qn('w:style')):
+        style_id = style.get(qn('w:styleId')) or ''
+        style_type = style.get(qn('w:type'))
+        is_default_para = style_type == 'paragraph' and style.get(qn('w:default')) in ('1', 'true')
+        if is_default_para:
+            default_para_style = style_id
+        if force:
+            rPr = style.find(qn('w:rPr'))
+            if style_type == 'numbering' or (rPr is None and not is_default_para):
+                continue
+            _set_rpr_font(style.get_or_add_rPr(), font_name, half_points)
+        elif is_default_para or style_id == 'Normal':
+            _set_rpr_font(style.get_or_add_rPr(), font_name, half_points)
+        elif _HEADING_STYLE_RE.match(style_id):
+            _set_rpr_font(style.get_or_add_rPr(), font_name)
+        else:
+            continue
+        styles_fixed += 1
+
+    resolve, effective = _build_style_resolver(styles_el)
+    table_style_cache = {}
+
+    def inherited_for(paragraph_el, rPr):
+        pStyle = paragraph_el.find(f"{qn('w:pPr')}/{qn('w:pStyle')}")
+        para_font, para_size = effective(pStyle.get(qn('w:val')) if pStyle is not None else default_para_style)
+        rStyle = rPr.find(qn('w:rStyle'))
+        if rStyle is not None:
+            char_font, char_size = resolve(rStyle.get(qn('w:val')))
+            para_font, para_size = char_font or para_font, char_size or para_size
+        tbl = next(paragraph_el.iterancestors(qn('w:tbl')), None)
+        if tbl is not None:
+            tblStyle = tbl.find(f"{qn('w:tblPr')}/{qn('w:tblStyle')}")
+            style_id = tblStyle.get(qn('w:val')) if tblStyle is not None else None
+            if style_id not in table_style_cache:
+                table_style_cache[style_id] = resolve(style_id)
+            tbl_font, tbl_size = table_style_cache[style_id]
+            # Table-style fonts make inheritance ambiguous; keep those run overrides.
+            if tbl_font:
+                para_font = None
+            if tbl_size:
+                para_size = None
+        return para_font, para_size
+
+    fonts_removed = 0
+    sizes_removed = 0
+    for paragraph_el in doc.element.body.iter(qn('w:p')):
+        # Paragraph-mark rPr plus every run directly (or via hyperlink/ins) in the paragraph
+        targets = [(paragraph_el.find(f"{qn('w:pPr')}/{qn('w:rPr')}"), None)]
+        targets += [(run_el.find(qn('w:rPr')), run_el) for run_el in paragraph_el.xpath('./w:r | ./*/w:r')]
+        for rPr, run_el in targets:
+            if rPr is None:
+                continue
+            inherited_font, inherited_size = (font_name, str(half_points)) if force else inherited_for(paragraph_el, rPr)
+            rFonts = rPr.find(qn('w:rFonts'))
+            if rFonts is not None:
+                font, _ = _rpr_font_and_size(rPr)
+                fonts = {rFonts.get(qn(f'w:{a}')) for a in _RFONTS_ATTRS} - {None}
+                if force or (font != 'theme' and inherited_font and fonts <= {inherited_font}):
+                    for attr in _RFONTS_ATTRS + _RFONTS_THEME_ATTRS:
+                        rFonts.attrib.pop(qn(f'w:{attr}'), None)
+                    if not rFonts.attrib:
+                        rPr.remove(rFonts)
+                    fonts_removed += 1
+            sz = rPr.find(qn('w:sz'))
+            if sz is not None and (force or sz.get(qn('w:val')) == inherited_size):
+                rPr.remove(sz)
+                sizes_removed += 1
+                szCs = rPr.find(qn('w:szCs'))
+                if szCs is not None and (force or szCs.get(qn('w:val')) == inherited_size):
+                    rPr.remove(szCs)
+            if run_el is not None and len(rPr) == 0 and not rPr.attrib:
+                run_el.remove(rPr)
+
+    print(f"===> Fonts normalized: {styles_fixed} styles set to {font_name}, "
+          f"{fonts_removed} run fonts and {sizes_removed} run sizes removed")
+
+
+
+
 def post_process_shareholder_registry(doc):
     """Best-practice formatting fixes for Shareholder Registry documents:
     1. Corporation Address: missing tab between label and value
     2. Remove "PAGE X" footer text
     3. Add vertical spacing above/below the shareholder table
     4. Adjust table column widths (wider Name column)
+    5. Normalize fonts to Times New Roman 12pt at the style level
     """
     print("===> Post-processing: fixing template formatting...")
 
@@ -386,11 +858,15 @@ def post_process_shareholder_registry(doc):
             _set_table_col_widths(table, col_widths_in)
             print("===> Fixed: adjusted shareholder table column widths")
 
+    # --- 5. Times New Roman 12pt via styles, not per run ---
+    _normalize_fonts(doc)
+
     print(f"===> Post-processing done: {pages_removed} PAGE X removed")
 
 
 def lambda_handler(event, context):
     print("===> Shareholder Registry Lambda invoked")
+    load_template_manifest()
 
     try:
         body = json.loads(event.get('body', '{}'))
@@ -400,8 +876,10 @@ def lambda_handler(event, context):
     form_data = body.get('form_data', {}) or {}
     s3_bucket = body.get('s3_bucket', OUTPUT_BUCKET)
     s3_key = body.get('s3_key', '')
-    template_url = body.get('templateUrl')
+    template_url = body.get('templateUrl') or template_url_for(body.get('template_variant'))
     return_docx = body.get('return_docx', False)
+    also_pdf = body.get('also_pdf', False)
+    response_mode = body.get('response_mode', 'base64')
 
     if not template_url:
         return {
@@ -409,6 +887,12 @@ def lambda_handler(event, context):
             "body": json.dumps({"error": "Missing 'templateUrl'"})
         }
 
+    if response_mode not in RESPONSE_MODES:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"Invalid 'response_mode' (expected one of {', '.join(RESPONSE_MODES)})"})
+        }
+
     template_bucket, template_key = extract_s3_info(template_url)
     if not template_bucket or not template_key:
         template_bucket = BUCKET_NAME
@@ -419,14 +903,39 @@ def lambda_handler(event, context):
         template_path = os.path.join(tmpdir, "template_shareholder_registry.docx")
         output_path = os.path.join(tmpdir, "filled_shareholder_registry.docx")
 
-        download_from_s3(template_bucket, template_key, template_path)
-
-        doc = Document(template_path)
-        replace_placeholders(doc, form_data)
-        post_process_shareholder_registry(doc)
-        doc.save(output_path)
-
-        upload_to_s3(output_path, s3_bucket, s3_key)
+        # Render cache: a repeat of an earlier request is a server-side copy (no template download or fill)
+        started = time.time()
+        render_key = render_cache_key(template_bucket, template_key, form_data) if body.get("render_cache", True) else None
+        cached = restore_render(render_key, s3_bucket, s3_key) if render_key else None
+        if cached is not None:
+            if return_docx and response_mode == "base64":
+                download_from_s3(s3_bucket, s3_key, output_path)
+        else:
+            fetch_template(template_bucket, template_key, template_path)
+
+            doc = Document(template_path)
+            replace_placeholders(doc, form_data)
+            post_process_shareholder_registry(doc)
+            save_docx(doc, output_path)
+
+            upload_to_s3(output_path, s3_bucket, s3_key)
+            if render_key:
+                store_render(render_key, s3_bucket, s3_key)
+        render_outcome = "hit" if cached is not None else "miss" if render_key else "off"
+        record_render(render_outcome, started)
+
+        # Optional PDF: docx-to-pdf-lambda reads the uploaded DOCX from S3 and writes the PDF next to it
+        pdf = convert_to_pdf(s3_bucket, s3_key, body.get('pdf_s3_key')) if also_pdf and s3_key else {}
+
+        # response_mode "url"/"stream": link to the uploaded DOCX instead of base64 in the body
+        if return_docx and response_mode != "base64":
+            return link_response(response_mode, s3_bucket, s3_key, os.path.basename(s3_key), {
+                "message": "Shareholder Registry generated successfully",
+                "s3_bucket": s3_bucket,
+                "s3_key": s3_key,
+                "render_cache": render_outcome,
+                **pdf
+            })
 
         if return_docx:
             with open(output_path, "rb") as f:
@@ -437,13 +946,15 @@ def lambda_handler(event, context):
                 "headers": {"Content-Type": "application/json"},
                 "body": json.dumps({
                     "message": "Shareholder Registry generated successfully",
-                    "docx_base64": encoded
+                    "docx_base64": encoded,
+                    "render_cache": render_outcome,
+                    **pdf
                 })
             }
 
         return {
             "statusCode": 200,
-            "body": json.dumps({"message": "Shareholder Registry generated successfully"})
+            "body": json.dumps({"message": "Shareholder Registry generated successfully", "render_cache": render_outcome, **pdf})
         }
 
     return {
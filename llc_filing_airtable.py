@@ -8,17 +8,14 @@ import os
 os.environ["DISPLAY"] = ":1"
 
 import sys
-import time
 from datetime import datetime
 
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 from filing_utils import (
     AVENIDA_LEGAL_ADDRESS,
     REGISTERED_AGENT,
-    human_typing,
     screenshot,
     upload_file_to_s3,
     take_and_upload_screenshot,
@@ -29,20 +26,23 @@ from filing_utils import (
     parse_name,
     detect_country_code,
     translate_business_purpose,
-    init_browser,
+    acquire_browser,
+    release_browser,
     accept_disclaimer_and_start,
     wait_for_form_field,
-    fill_registered_agent,
-    fill_correspondence,
+    filing_step,
+    CHECK,
+    resolve_fields,
+    fill_form_page,
+    registered_agent_fields,
+    correspondence_fields,
     fill_payment_and_submit,
+    UNCONFIRMED_NOTE,
     click_continue_through_pages,
     validate_required_fields,
     save_run_log,
-    AIRTABLE_API_KEY,
-    AIRTABLE_BASE_ID,
-    AIRTABLE_TABLE_NAME,
 )
-from pyairtable import Api
+from airtable_gateway import airtable, READ_MAX_AGE
 
 
 # ===================== DATA MAPPING =====================
@@ -63,11 +63,10 @@ def fetch_llc_data_from_airtable(record_id=None):
     Returns:
         dict: Formatted LLC data for Sunbiz filing, or None if no eligible records.
     """
-    api = Api(AIRTABLE_API_KEY)
-    table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
+    table = airtable()
 
     if record_id:
-        record = table.get(record_id)
+        record = table.get(record_id, max_age=READ_MAX_AGE)
         print(f"\U0001f4c2 Fetched specific record: {record['id']}")
 
         if record['fields'].get('Formation State') != 'Florida':
@@ -96,6 +95,16 @@ def fetch_llc_data_from_airtable(record_id=None):
         record = records[0]
         print(f"\U0001f4c2 Found new formation: {record['fields'].get('Company Name')}")
 
+    return build_llc_data(record)
+
+
+def build_llc_data(record, translate=True, verbose=True):
+    """
+    Build the Sunbiz LLC filing data from an Airtable record, so the watcher's pre-flight
+    check builds what the filing will submit. The only network call is the OpenAI purpose
+    translation; translate=False keeps the purpose as entered (pre-flight doesn't validate it).
+    verbose=False skips the progress lines (pre-flight builds many records in parallel).
+    """
     fields = record['fields']
 
     # ---- Parse company address ----
@@ -110,7 +119,8 @@ def fetch_llc_data_from_airtable(record_id=None):
     ]) and address_parts.get('country') != 'INT'
 
     if not has_complete_address:
-        print(f"\U0001f4cd Using Avenida Legal's address for Principal Address (original: {company_address})")
+        if verbose:
+            print(f"\U0001f4cd Using Avenida Legal's address for Principal Address (original: {company_address})")
         address_parts = AVENIDA_LEGAL_ADDRESS.copy()
 
     # ---- Manager / Authorized Person ----
@@ -154,22 +164,24 @@ def fetch_llc_data_from_airtable(record_id=None):
     manager_zip = manager_addr_parts.get('zip', '')
 
     if not manager_addr_line:
-        print(f"\u26a0\ufe0f  Manager address missing — falling back to principal address")
+        if verbose:
+            print(f"\u26a0\ufe0f  Manager address missing — falling back to principal address")
         manager_addr_line = address_parts.get('line1', AVENIDA_LEGAL_ADDRESS['line1'])
         manager_city = address_parts.get('city', AVENIDA_LEGAL_ADDRESS['city'])
         manager_state = address_parts.get('state', AVENIDA_LEGAL_ADDRESS['state'])
         manager_zip = address_parts.get('zip', AVENIDA_LEGAL_ADDRESS['zip'])
         manager_country = 'US'
 
-    print(f"\U0001f464 Manager: {manager_name} | Country: {manager_country}")
-    print(f"   Address: {manager_address or '(using principal address)'}")
+    if verbose:
+        print(f"\U0001f464 Manager: {manager_name} | Country: {manager_country}")
+        print(f"   Address: {manager_address or '(using principal address)'}")
+
+    purpose = fields.get('Business Purpose', 'Any lawful purpose')
 
     llc_data = {
         "llc": {
             "name": fields.get('Company Name', ''),
-            "purpose": translate_business_purpose(
-                fields.get('Business Purpose', 'Any lawful purpose')
-            ),
+            "purpose": translate_business_purpose(purpose) if translate else purpose,
             "principal_address": {
                 "line1": address_parts.get('line1', AVENIDA_LEGAL_ADDRESS['line1']),
                 "line2": address_parts.get('line2', AVENIDA_LEGAL_ADDRESS.get('line2', '')),
@@ -210,76 +222,93 @@ def fetch_llc_data_from_airtable(record_id=None):
     return llc_data
 
 
-# ===================== FORM FILLING =====================
-
-def fill_llc_form(driver, wait, data, company_name):
+def validate_llc_data(data):
     """
-    Fill the entire Sunbiz LLC form.
-    Wraps each section in try/except for granular error screenshots.
+    Check the fields Sunbiz requires for an LLC: company name, manager name, manager
+    title, full manager address and a customer email. Raises ValueError if any is missing.
     """
     llc = data["llc"]
+    validate_required_fields(
+        {
+            "company_name": llc["name"],
+            "manager_name": data["authorized_person"]["signature"],
+            "manager_title": data["authorized_person"]["title"],
+            "manager_address": data["authorized_person"]["address"],
+            "manager_city": data["authorized_person"]["city"],
+            "manager_state": data["authorized_person"]["state"],
+            "manager_zip": data["authorized_person"]["zip"],
+            "customer_email": data["return_contact"]["email"],
+        },
+        [
+            "company_name",
+            "manager_name",
+            "manager_title",
+            "manager_address",
+            "manager_city",
+            "manager_state",
+            "manager_zip",
+            "customer_email",
+        ],
+        entity_type="LLC",
+    )
 
-    # --- Section 1: LLC Info ---
-    try:
-        print("  \U0001f4dd Filling LLC information...")
-        corp_name_el = wait_for_form_field(driver, "corp_name")
-        human_typing(corp_name_el, llc["name"])
-        human_typing(driver.find_element(By.ID, "princ_addr1"), llc["principal_address"]["line1"])
-        human_typing(driver.find_element(By.ID, "princ_addr2"), llc["principal_address"]["line2"])
-        human_typing(driver.find_element(By.ID, "princ_city"), llc["principal_address"]["city"])
-        human_typing(driver.find_element(By.ID, "princ_st"), llc["principal_address"]["state"])
-        human_typing(driver.find_element(By.ID, "princ_zip"), llc["principal_address"]["zip"])
-        human_typing(driver.find_element(By.ID, "princ_cntry"), llc["principal_address"]["country"])
-        driver.find_element(By.TAG_NAME, "body").click()
-        time.sleep(1)
-        driver.find_element(By.ID, "same_addr_flag").click()
-        take_and_upload_screenshot(driver, "03_llc_info_filled", company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_llc_info", company_name)
-        raise RuntimeError(f"Failed filling LLC info section: {e}") from e
 
-    # --- Section 2: Registered Agent ---
-    try:
-        fill_registered_agent(driver, company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_registered_agent", company_name)
-        raise RuntimeError(f"Failed filling Registered Agent: {e}") from e
+# ===================== FORM FILLING =====================
 
-    # --- Section 3: Purpose ---
-    try:
-        print("  \U0001f4dd Filling business purpose...")
-        human_typing(driver.find_element(By.ID, "purpose"), llc["purpose"])
-        take_and_upload_screenshot(driver, "06_purpose_filled", company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_purpose", company_name)
-        raise RuntimeError(f"Failed filling purpose: {e}") from e
+# Field maps for the LLC form page (element id, dotted path into the fetched data)
+LLC_INFO_FIELDS = [
+    ("corp_name", "llc.name"),
+    ("princ_addr1", "llc.principal_address.line1"),
+    ("princ_addr2", "llc.principal_address.line2"),
+    ("princ_city", "llc.principal_address.city"),
+    ("princ_st", "llc.principal_address.state"),
+    ("princ_zip", "llc.principal_address.zip"),
+    ("princ_cntry", "llc.principal_address.country"),
+    ("same_addr_flag", CHECK),  # Mailing address same as principal
+]
+
+LLC_PURPOSE_FIELDS = [
+    ("purpose", "llc.purpose"),
+]
+
+# Electronic signature of authorized person
+LLC_SIGNATURE_FIELDS = [
+    ("signature", "authorized_person.signature"),
+]
+
+LLC_MANAGER_FIELDS = [
+    ("off1_name_title", "authorized_person.title"),
+    ("off1_name_last_name", "authorized_person.last_name"),
+    ("off1_name_first_name", "authorized_person.first_name"),
+    ("off1_name_addr1", "authorized_person.address"),
+    ("off1_name_city", "authorized_person.city"),
+    ("off1_name_st", "authorized_person.state"),
+    ("off1_name_zip", "authorized_person.zip"),
+    ("off1_name_cntry", "authorized_person.country"),
+]
 
-    # --- Section 4: Correspondence / Return Contact ---
-    try:
-        contact = data["return_contact"]
-        fill_correspondence(driver, contact["name"], contact["email"], company_name)
-        # Electronic signature of authorized person
-        human_typing(driver.find_element(By.ID, "signature"), data["authorized_person"]["signature"])
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_correspondence", company_name)
-        raise RuntimeError(f"Failed filling correspondence: {e}") from e
 
-    # --- Section 5: Authorized Person (Manager/Member) ---
+def fill_llc_form(driver, wait, data, company_name):
+    """
+    Fill the entire Sunbiz LLC form (one page) using the FILL_MODE strategy.
+    In human/keys mode each section gets its own screenshot and error screenshot.
+    """
     try:
-        print("  \U0001f4dd Filling authorized person (Manager)...")
-        auth = data["authorized_person"]
-        human_typing(driver.find_element(By.ID, "off1_name_title"), auth["title"])
-        human_typing(driver.find_element(By.ID, "off1_name_last_name"), auth["last_name"])
-        human_typing(driver.find_element(By.ID, "off1_name_first_name"), auth["first_name"])
-        human_typing(driver.find_element(By.ID, "off1_name_addr1"), auth["address"])
-        human_typing(driver.find_element(By.ID, "off1_name_city"), auth["city"])
-        human_typing(driver.find_element(By.ID, "off1_name_st"), auth["state"])
-        human_typing(driver.find_element(By.ID, "off1_name_zip"), auth["zip"])
-        human_typing(driver.find_element(By.ID, "off1_name_cntry"), auth["country"])
-        take_and_upload_screenshot(driver, "08_manager_filled", company_name)
-    except Exception as e:
-        take_and_upload_screenshot(driver, "ERROR_authorized_person", company_name)
-        raise RuntimeError(f"Failed filling authorized person: {e}") from e
+        wait_for_form_field(driver, "corp_name")
+    except Exception:
+        take_and_upload_screenshot(driver, "ERROR_llc_info", company_name)
+        raise
+
+    contact = data["return_contact"]
+    fill_form_page(driver, [
+        ("LLC information", "llc_info", "03_llc_info_filled", resolve_fields(LLC_INFO_FIELDS, data)),
+        ("Registered Agent", "registered_agent", "04_ra_filled", registered_agent_fields()),
+        ("business purpose", "purpose", "06_purpose_filled", resolve_fields(LLC_PURPOSE_FIELDS, data)),
+        ("correspondence", "correspondence", "07_contact_filled",
+         correspondence_fields(contact["name"], contact["email"]) + resolve_fields(LLC_SIGNATURE_FIELDS, data)),
+        ("authorized person (Manager)", "authorized_person", "08_manager_filled",
+         resolve_fields(LLC_MANAGER_FIELDS, data)),
+    ], company_name, "LLC form")
 
     # Full form screenshot before submission
     take_and_upload_screenshot(driver, "09_before_submit", company_name)
@@ -312,53 +341,31 @@ def main(record_id=None):
     print(f"\U0001f4cb Processing LLC: {llc['name']}")
 
     # Validate required fields before starting the browser
-    # Sunbiz requires: company name, manager name, manager title, and full manager address
     try:
-        validate_required_fields(
-            {
-                "company_name": llc["name"],
-                "manager_name": data["authorized_person"]["signature"],
-                "manager_title": data["authorized_person"]["title"],
-                "manager_address": data["authorized_person"]["address"],
-                "manager_city": data["authorized_person"]["city"],
-                "manager_state": data["authorized_person"]["state"],
-                "manager_zip": data["authorized_person"]["zip"],
-                "customer_email": data["return_contact"]["email"],
-            },
-            [
-                "company_name",
-                "manager_name",
-                "manager_title",
-                "manager_address",
-                "manager_city",
-                "manager_state",
-                "manager_zip",
-                "customer_email",
-            ],
-            entity_type="LLC",
-        )
+        validate_llc_data(data)
     except ValueError as e:
         if airtable_record_id:
             update_airtable_status(airtable_record_id, "Pending", f"Validation error: {e}")
         raise
 
-    # Update status to In Progress
+    # Update status to In Progress (sent together with the final Filed/error update;
+    # the watcher already marked the record In Progress when it leased it)
     if airtable_record_id:
-        update_airtable_status(airtable_record_id, "In Progress")
+        update_airtable_status(airtable_record_id, "In Progress", defer=True)
 
     # Fetch payment data
     print("\U0001f4b3 Fetching payment data from SSM...")
     payment = fetch_payment_data_from_ssm(llc_name)
 
-    # Initialize browser
-    print("\U0001f98a Starting Firefox browser...")
-    driver = init_browser()
+    # Borrow a warm browser from the pool (launches one if none is idle)
+    driver = acquire_browser()
     driver.set_page_load_timeout(60)
     wait = WebDriverWait(driver, 30)
 
     try:
         # Step 1: Navigate to LLC disclaimer page and start filing
-        driver.get("https://efile.sunbiz.org/llc_file.html")
+        with filing_step("open_form"):
+            driver.get("https://efile.sunbiz.org/llc_file.html")
         accept_disclaimer_and_start(driver, wait, llc_name)
 
         # Step 2: Fill the entire LLC form
@@ -368,17 +375,21 @@ def main(record_id=None):
         click_continue_through_pages(driver, wait, 3, llc_name)
 
         # Step 4: Payment
-        fill_payment_and_submit(driver, wait, payment, llc_name)
+        confirmed = fill_payment_and_submit(driver, wait, payment, llc_name)
 
-        # Update Airtable status to Filed
+        # Update Airtable status to Filed (an unconfirmed submit must not be re-filed either)
         if airtable_record_id:
             update_airtable_status(
                 airtable_record_id,
                 "Filed",
-                f"Filed on {datetime.now().isoformat()}",
+                f"Filed on {datetime.now().isoformat()}" if confirmed else UNCONFIRMED_NOTE.format(
+                    when=datetime.now().isoformat()),
             )
 
-        print("\u2705 LLC Filing completed successfully!")
+        if confirmed:
+            print("\u2705 LLC Filing completed successfully!")
+        else:
+            print("\u26a0\ufe0f LLC payment submitted, but the confirmation page never loaded: check Sunbiz")
 
     except Exception as e:
         print(f"\u274c Error: {e}")
@@ -404,14 +415,13 @@ def main(record_id=None):
         raise
 
     finally:
-        driver.quit()
+        release_browser(driver)
         save_run_log(llc_name, airtable_record_id, "LLC")
 
 
 def list_pending_formations():
     """List all LLC formations ready for auto-filing."""
-    api = Api(AIRTABLE_API_KEY)
-    table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
+    table = airtable()
 
     formula = """AND(
         {Formation Status} = 'Pending',
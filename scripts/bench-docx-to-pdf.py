@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark docx_to_pdf_lambda cold and warm conversions, before/after the prebuilt font cache
+and profile template.
+
+Each mode runs in fresh Python processes. A process converts the sample once (cold: no
+/tmp/lo-fonts cache, no profile in memory) and then --warm more times (warm: same container).
+  before  LO_PROFILE_CACHE=0 and no LO_ASSETS_DIR: new fonts.conf/cache and profile per request
+  after   defaults: image font cache + profile template (LO_ASSETS_DIR), /tmp cache otherwise
+
+Both modes use the soffice --convert-to path (LO_DAEMON=0) unless --daemon is given, and run
+with the PDF conversion cache off.
+
+Usage:
+  python scripts/bench-docx-to-pdf.py                                  # needs LibreOffice locally
+  python scripts/bench-docx-to-pdf.py --runs=5 --warm=5 --docx=bylaws-template.docx
+  # inside the Lambda image, where /opt/lo-assets exists:
+  docker run --rm -v "$PWD":/w --entrypoint python3 docx-to-pdf-lambda:latest /w/scripts/bench-docx-to-pdf.py
+
+Set LIBREOFFICE_PATH when soffice.bin is not at a standard location.
+Requires: boto3 (imported by the Lambda; no AWS calls are made)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+LAMBDA_DIR = ROOT / 'lambda-functions'
+
+# Runs in the child process: cold conversion, then warm ones, timings as JSON on the last line
+CHILD = r'''
+import base64, json, sys, time, io, contextlib
+sys.path.insert(0, sys.argv[1])
+import docx_to_pdf_lambda as m
+event = {'docx_base64': base64.b64encode(open(sys.argv[2], 'rb').read()).decode('ascii')}
+times = []
+for _ in range(1 + int(sys.argv[3])):
+    started = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        r = m.lambda_handler(event, None)
+    if r['statusCode'] != 200:
+        print(json.dumps({'error': r['body'][:300]})); sys.exit(1)
+    times.append((time.time() - started) * 1000)
+print(json.dumps({'times': times}))
+'''
+
+MODES = {
+    'before': {'LO_PROFILE_CACHE': '0', 'LO_ASSETS_DIR': '/nonexistent'},
+    'after': {},
+}
+
+
+def run_mode(name, args):
+    cold, warm = [], []
+    for i in range(args.runs):
+        shutil.rmtree('/tmp/lo-fonts', ignore_errors=True)
+        shutil.rmtree('/tmp/lo-daemon', ignore_errors=True)
+        # PDF_CACHE=0: warm runs must convert, not hit the conversion cache
+        env = dict(os.environ, LO_DAEMON='1' if args.daemon else '0', PDF_CACHE='0', **MODES[name])
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD, str(LAMBDA_DIR), args.docx, str(args.warm)],
+            capture_output=True, text=True, env=env, timeout=600,
+        )
+        lines = (result.stdout or '').strip().splitlines()
+        data = json.loads(lines[-1]) if lines else {'error': result.stderr[-300:]}
+        if 'error' in data:
+            print(f"❌ {name} run {i + 1}: {data['error']}")
+            sys.exit(1)
+        cold.append(data['times'][0])
+        warm.extend(data['times'][1:])
+        print(f"   {name} run {i + 1}: cold {data['times'][0]:.0f}ms"
+              + (f", warm median {statistics.median(data['times'][1:]):.0f}ms" if args.warm else ''))
+    return cold, warm
+
+
+def fmt(values):
+    if not values:
+        return '-'
+    return f"median {statistics.median(values):.0f}ms  min {min(values):.0f}ms  max {max(values):.0f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold/warm DOCX→PDF benchmark, before/after prebuilt LO assets')
+    parser.add_argument('--docx', default=str(ROOT / 'organizational-resolution-inc-template.docx'))
+    parser.add_argument('--runs', type=int, default=3, help='fresh processes per mode (cold samples)')
+    parser.add_argument('--warm', type=int, default=3, help='warm conversions per process')
+    parser.add_argument('--daemon', action='store_true', help='benchmark the UNO daemon path instead')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.docx):
+        print(f"❌ Sample DOCX not found: {args.docx}")
+        sys.exit(1)
+    assets = os.environ.get('LO_ASSETS_DIR', '/opt/lo-assets')
+    print(f"🚀 DOCX→PDF benchmark: {Path(args.docx).name}, {args.runs} runs × (1 cold + {args.warm} warm)")
+    if not os.path.isdir(assets):
+        print(f"⚠️  {assets} not found: 'after' only reuses the /tmp font cache and profile")
+
+    results = {name: run_mode(name, args) for name in MODES}
+
+    print("\n📊 Results")
+    for name, (cold, warm) in results.items():
+        print(f"   {name:<7} cold  {fmt(cold)}")
+        print(f"   {name:<7} warm  {fmt(warm)}")
+    for label, idx in (('cold', 0), ('warm', 1)):
+        before, after = results['before'][idx], results['after'][idx]
+        if before and after:
+            b, a = statistics.median(before), statistics.median(after)
+            print(f"⏱️  {label}: {b:.0f}ms → {a:.0f}ms ({(b - a) / max(b, 1) * 100:.0f}% faster)")
+
+
+if __name__ == '__main__':
+    main()
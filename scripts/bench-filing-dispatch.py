@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-record dispatcher startup in autofill_watcher, before/after the warm fork server.
+
+Startup is the time from launching a filing until filing_dispatcher (and with it selenium,
+boto3, pyairtable and requests) is imported and dispatch() could run. No record is filed.
+  before  AUTOFILL_DISPATCH=subprocess: a fresh python3 per record imports everything
+  after   AUTOFILL_DISPATCH=forkserver: each record forks from a server that preloaded the modules
+
+The watcher also logs the real figure for every filing ("Dispatcher startup: ...").
+
+Usage:
+  python3 scripts/bench-filing-dispatch.py
+  python3 scripts/bench-filing-dispatch.py --runs=10
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PRELOAD_MODULES = ['filing_dispatcher', 'llc_filing_airtable', 'corp_filing_airtable']
+
+
+def bench_subprocess(runs):
+    times = []
+    for _ in range(runs):
+        started = time.time()
+        result = subprocess.run(
+            [sys.executable, '-c', 'import filing_dispatcher, llc_filing_airtable, corp_filing_airtable'],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            print(f"❌ Import failed: {result.stderr.strip().splitlines()[-1]}")
+            sys.exit(1)
+        times.append((time.time() - started) * 1000)
+    return times
+
+
+def bench_forkserver(runs):
+    os.environ['PYTHONPATH'] = os.pathsep.join(p for p in (str(ROOT), os.environ.get('PYTHONPATH')) if p)
+    ctx = multiprocessing.get_context('forkserver')
+    ctx.set_forkserver_preload(PRELOAD_MODULES)
+    started = time.time()
+    warmup = ctx.Process(target=os.getpid)
+    warmup.start()
+    warmup.join()
+    print(f"   fork server warm in {(time.time() - started) * 1000:.0f}ms (once per watcher)")
+
+    times = []
+    for _ in range(runs):
+        started = time.time()
+        proc = ctx.Process(target=importlib.import_module, args=('filing_dispatcher',))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0:
+            print("❌ Forked import failed")
+            sys.exit(1)
+        times.append((time.time() - started) * 1000)
+    return times
+
+
+def fmt(values):
+    return f"median {statistics.median(values):.0f}ms  min {min(values):.0f}ms  max {max(values):.0f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-record dispatcher startup, subprocess vs fork server')
+    parser.add_argument('--runs', type=int, default=5, help='records to launch per mode')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    print(f"🚀 Dispatcher startup benchmark: {args.runs} launches per mode")
+    results = {
+        'before': bench_subprocess(args.runs),
+        'after': bench_forkserver(args.runs),
+    }
+
+    print("\n📊 Results")
+    for name, times in results.items():
+        print(f"   {name:<7} {fmt(times)}")
+    b, a = statistics.median(results['before']), statistics.median(results['after'])
+    print(f"⏱️  startup per record: {b:.0f}ms → {a:.0f}ms ({(b - a) / max(b, 1) * 100:.0f}% faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Build the versioned template manifest the generator Lambdas load at init.
+
+Lists the template prefixes once (the only place that lists buckets), and writes
+variant -> {generator, bucket, key, etag, size, rank} to
+  s3://company-formation-template-llc-and-inc/template-manifest.json        (latest)
+  s3://company-formation-template-llc-and-inc/template-manifests/v<N>.json  (pinned copy)
+
+Variant ids are <generator>/<path under the prefix without extension>, e.g.
+  membership-registry/membership-registry-2-members/Template Membership Registry_2 Members_1 Manager
+and just <generator> for single-file templates (ss4, 8821, 2848, bylaws, ...).
+
+rank orders prefetching (0 = prefetched first). With --usage=usage.json ({"<variant>": count})
+the most used variants rank first; otherwise variants with the smallest member/manager counts do,
+which is what most formations use.
+
+Re-run after uploading or editing templates. Lambdas pick up the new latest manifest within
+TEMPLATE_MANIFEST_TTL; set TEMPLATE_MANIFEST to a template-manifests/v<N>.json URL to pin one.
+
+Usage:
+  python scripts/build-template-manifest.py --dry-run
+  python scripts/build-template-manifest.py
+  python scripts/build-template-manifest.py --usage=usage.json --out=template-manifest.json
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+
+import boto3
+
+MANIFEST_BUCKET = 'company-formation-template-llc-and-inc'
+MANIFEST_KEY = 'template-manifest.json'
+VERSIONS_PREFIX = 'template-manifests/'
+
+# (generator, bucket, prefix): a prefix ending in '/' is a folder of variants, anything else one file
+SOURCES = [
+    ('ss4', 'ss4-template-bucket-043206426879', 'fss4.pdf'),
+    ('8821', 'ss4-template-bucket-043206426879', 'f8821.pdf'),
+    ('2848', 'ss4-template-bucket-043206426879', 'f2848.pdf'),
+    ('bylaws', 'avenida-legal-documents', 'templates/bylaws/'),
+    ('bylaws', 'avenida-legal-documents', 'templates/bylaws-template.docx'),
+    ('shareholder-registry', 'avenida-legal-documents', 'templates/shareholder-registry/'),
+    ('shareholder-agreement', 'avenida-legal-documents', 'templates/shareholder-agreement-template.docx'),
+    ('membership-registry', 'company-formation-template-llc-and-inc',
+     'llc-formation-templates/membership-registry-all-templates/'),
+    ('organizational-resolution', 'company-formation-template-llc-and-inc',
+     'llc-formation-templates/organizational-resolution-all-templates/'),
+    ('organizational-resolution', 'company-formation-template-llc-and-inc', 'templates/organizational-resolution-inc/'),
+    ('organizational-resolution', 'company-formation-template-llc-and-inc', 'templates/organizational-resolution-inc-216/'),
+]
+EXTENSIONS = ('.docx', '.pdf')
+
+
+def load_env_file(filepath):
+    env_vars = {}
+    if os.path.exists(filepath):
+        with open(filepath, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    env_vars[key.strip()] = value.strip('"\'')
+    return env_vars
+
+
+def list_source(s3, generator, bucket, prefix):
+    """Manifest entries for one source (one listing per prefix, or one HEAD for a single file)"""
+    if not prefix.endswith('/'):
+        try:
+            head = s3.head_object(Bucket=bucket, Key=prefix)
+        except Exception as e:
+            print(f"⚠️  {generator}: s3://{bucket}/{prefix} not found ({e})")
+            return {}
+        return {generator: {'generator': generator, 'bucket': bucket, 'key': prefix,
+                            'etag': head['ETag'].strip('"'), 'size': head['ContentLength']}}
+
+    entries = {}
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if not key.lower().endswith(EXTENSIONS):
+                continue
+            variant = f"{generator}/{os.path.splitext(key[len(prefix):])[0]}"
+            entries[variant] = {'generator': generator, 'bucket': bucket, 'key': key,
+                                'etag': obj['ETag'].strip('"'), 'size': obj['Size']}
+    return entries
+
+
+def assign_ranks(variants, usage):
+    """rank per generator: most used first (--usage), else smallest member/manager counts first"""
+    by_generator = {}
+    for variant in variants:
+        by_generator.setdefault(variants[variant]['generator'], []).append(variant)
+    for names in by_generator.values():
+        def order(v):
+            counts = [int(n) for n in re.findall(r'\d+', v.split('/', 1)[-1])]
+            return (-usage.get(v, 0), sum(counts), v)
+        for rank, variant in enumerate(sorted(names, key=order)):
+            variants[variant]['rank'] = rank
+
+
+def current_version(s3):
+    try:
+        obj = s3.get_object(Bucket=MANIFEST_BUCKET, Key=MANIFEST_KEY)
+        return int(json.loads(obj['Body'].read()).get('version', 0))
+    except Exception:
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the generator template manifest')
+    parser.add_argument('--usage', help='JSON file of {variant: count} used to rank prefetching')
+    parser.add_argument('--out', help='also write the manifest to this local file')
+    parser.add_argument('--dry-run', action='store_true', help='print the summary, upload nothing')
+    args = parser.parse_args()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for key, value in load_env_file(os.path.join(project_root, '.env.local')).items():
+        os.environ.setdefault(key, value)
+    s3 = boto3.client('s3', region_name=os.environ.get('AWS_REGION', 'us-west-1'))
+    usage = {}
+    if args.usage:
+        with open(args.usage) as f:
+            usage = json.load(f)
+
+    print('🚀 Building template manifest...\n')
+    variants = {}
+    for generator, bucket, prefix in SOURCES:
+        try:
+            found = list_source(s3, generator, bucket, prefix)
+        except Exception as e:
+            print(f"❌ {generator}: could not list s3://{bucket}/{prefix}: {e}")
+            return 1
+        print(f"   {generator:<26} {len(found):>4} templates  s3://{bucket}/{prefix}")
+        variants.update(found)
+    assign_ranks(variants, usage)
+
+    version = current_version(s3) + 1
+    manifest = {
+        'version': version,
+        'generated_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'variants': dict(sorted(variants.items())),
+    }
+    body = json.dumps(manifest, indent=1, ensure_ascii=False).encode('utf-8')
+    print(f"\n📊 {len(variants)} templates, {sum(v['size'] for v in variants.values()) / 1024:.0f} KB, "
+          f"manifest v{version} ({len(body) / 1024:.0f} KB)")
+
+    if args.out:
+        with open(args.out, 'wb') as f:
+            f.write(body)
+        print(f"✅ Wrote {args.out}")
+    if args.dry_run:
+        print('⚠️  Dry run: nothing uploaded')
+        return 0
+
+    for key in (f"{VERSIONS_PREFIX}v{version}.json", MANIFEST_KEY):
+        s3.put_object(Bucket=MANIFEST_BUCKET, Key=key, Body=body, ContentType='application/json')
+        print(f"✅ Uploaded s3://{MANIFEST_BUCKET}/{key}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,7 +16,13 @@ LAYER_ARN="arn:aws:lambda:us-west-2:764866452798:layer:libreoffice-gzip:1"
 echo "🚀 Deploying $FUNCTION_NAME in $REGION (profile: $AWS_PROFILE)"
 
 cd lambda-functions
-zip -q docx-to-pdf-lambda.zip docx_to_pdf_lambda.py
+# reportlab for the native registry renderer (Linux wheels, whatever the build host)
+BUILD_DIR="$(mktemp -d)"
+pip install reportlab -t "$BUILD_DIR" --quiet \
+  --platform manylinux2014_x86_64 --only-binary=:all: --python-version 3.11
+cp docx_to_pdf_lambda.py "$BUILD_DIR/"
+(cd "$BUILD_DIR" && zip -qr - .) > docx-to-pdf-lambda.zip
+rm -rf "$BUILD_DIR"
 ZIP_PATH="$(pwd)/docx-to-pdf-lambda.zip"
 
 echo "📦 Package: $ZIP_PATH"
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Step latency percentiles across Sunbiz filings.
+
+Every filing appends its step timeline (open_form, disclaimer, start_filing, form_load,
+fill_form, continue_N, payment_*, submit_payment) to FILING_TIMING_LOG
+(default ~/sunbiz-filing-timings.jsonl). This aggregates them per step: p50/p90/p99/max,
+how often the step ran over its budget, and how often it failed.
+
+Usage:
+  python3 scripts/filing-step-times.py
+  python3 scripts/filing-step-times.py --entity LLC --last 50
+  python3 scripts/filing-step-times.py --log /path/to/sunbiz-filing-timings.jsonl
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from collections import defaultdict
+
+DEFAULT_LOG = os.environ.get("FILING_TIMING_LOG", os.path.expanduser("~/sunbiz-filing-timings.jsonl"))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def load_runs(path, entity=None, last=None):
+    runs = []
+    with open(path) as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue  # partially written line
+            if entity and run.get("entity_type") != entity:
+                continue
+            runs.append(run)
+    return runs[-last:] if last else runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-step latency percentiles from the filing timing log')
+    parser.add_argument('--log', default=DEFAULT_LOG, help='timing log (JSON lines)')
+    parser.add_argument('--entity', help='only this entity type (LLC, C-Corp, S-Corp)')
+    parser.add_argument('--last', type=int, help='only the most recent N filings')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"❌ No timing log at {args.log} (set FILING_TIMING_LOG or --log)")
+        sys.exit(1)
+    runs = load_runs(args.log, args.entity, args.last)
+    if not runs:
+        print("ℹ️  No filings in the timing log match")
+        return
+
+    durations = defaultdict(list)
+    offsets = defaultdict(list)
+    over_budget = defaultdict(int)
+    failed = defaultdict(int)
+    for run in runs:
+        for s in run["steps"]:
+            durations[s["step"]].append(s["seconds"])
+            offsets[s["step"]].append(s["offset"])
+            over_budget[s["step"]] += s["seconds"] > s["budget"]
+            failed[s["step"]] += not s["ok"]
+
+    print(f"📊 {len(runs)} filing(s) from {args.log}\n")
+    print(f"   {'step':<18} {'n':>4} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7}  {'over':>4} {'fail':>4}")
+    # Steps in flow order (by median start offset)
+    for step in sorted(durations, key=lambda name: percentile(sorted(offsets[name]), 50)):
+        values = sorted(durations[step])
+        print(
+            f"   {step:<18} {len(values):>4} {percentile(values, 50):>6.1f}s {percentile(values, 90):>6.1f}s"
+            f" {percentile(values, 99):>6.1f}s {values[-1]:>6.1f}s  {over_budget[step]:>4} {failed[step]:>4}"
+        )
+
+    totals = sorted(run["total_seconds"] for run in runs)
+    print(f"\n⏱️  total per filing: p50 {percentile(totals, 50):.1f}s  p90 {percentile(totals, 90):.1f}s"
+          f"  max {totals[-1]:.1f}s  ({sum(not run['steps_ok'] for run in runs)} with a failed step)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Normalize DOCX templates so every {{placeholder}} sits in a single run, and lint placeholders.
+
+Word splits text across runs (spell-check marks, rsid edits, formatting toggles), so a
+placeholder like {{Company Name}} is often stored as "{{Comp" + "any Na" + "me}}".  The
+Lambdas cope with that through _replace_span_in_paragraph; normalized templates let them
+take the single-run fast path instead.
+
+For each template this script:
+  1. Drops proofErr / lastRenderedPageBreak markers that only exist to split runs.
+  2. Merges adjacent text runs whose run properties are identical.
+  3. Stitches any placeholder still spread across runs into the run it starts in
+     (the same formatting the Lambdas keep when they replace it).
+  4. Reports orphaned braces and placeholders no Lambda knows how to fill.
+  5. Reports run-count reduction and placeholder replacement time before/after.
+
+Usage:
+  python scripts/normalize-docx-templates.py templates/corp_template.docx
+  python scripts/normalize-docx-templates.py shareholder-registry/ --out-dir /tmp/normalized
+  python scripts/normalize-docx-templates.py s3://company-formation-template-llc-and-inc/llc-formation-templates/membership-registry-all-templates/
+  python scripts/normalize-docx-templates.py s3://bucket/prefix/ --write     # upload back to the same keys
+
+Without --write or --out-dir nothing is written (report only).
+Requires: python-docx, lxml (boto3 for s3:// sources)
+Env: AWS_REGION (default us-west-1); credentials via the default boto3 chain
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+try:
+    from docx import Document
+    from lxml import etree
+except ImportError:
+    print("Install python-docx: pip install python-docx")
+    sys.exit(1)
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-west-1')
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+
+def w(tag):
+    return f'{{{W_NS}}}{tag}'
+
+
+# Parts that can hold placeholders
+PART_RE = re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+
+# Elements that carry no content and only exist to split runs
+SPLITTER_TAGS = (w('proofErr'), w('lastRenderedPageBreak'))
+
+# Run children that make up "plain text" runs we are allowed to merge/rewrite
+TEXT_CHILD_TAGS = (w('t'), w('tab'))
+
+PLACEHOLDER_RE = re.compile(r'\{\{[^{}]*\}\}')
+
+# Placeholders the generator Lambdas fill (see replace_placeholders in each Lambda)
+_N = r'\d{1,2}'
+KNOWN_PLACEHOLDER_PATTERNS = [re.compile(rf'^{p}$') for p in (
+    r'COMPANY_NAME|COMPANY_ADDRESS|FORMATION_STATE|FORMATION_DATE|COUNTY',
+    r'TOTAL_AUTHORIZED_SHARES|PAR_VALUE|MANAGED_TYPE|managed_type',
+    r'Company Name|Company Address|Formation State|Formation Date|County|Payment Date',
+    r'Total Authorized Shares|Par Value|Number of Shares|Authorized Shares|Outstanding Shares',
+    r'llc_name_text|full_llc_address|full_state|full_state_caps|Date_of_formation_LLC',
+    rf'[Mm]ember_{_N}_(full_name|pct)',
+    rf'[Ss]hareholder_{_N}_(full_name|pct|shares|capital|date|name|transaction|class|percent)',
+    rf'[Mm]anager_{_N}_full_name|Manager_{_N}(_title)?',
+    rf'Officer_{_N}_[Rr]ole|Officer_{_N}_Name|Director_{_N}_Name',
+    rf'Owner {_N} (Name|Capital|Ownership %|Ownership #Shares)',
+    rf'(Officer|Director) {_N} (Name|Role)',
+)]
+
+
+def is_known_placeholder(placeholder):
+    name = placeholder[2:-2].strip()
+    return any(p.match(name) for p in KNOWN_PLACEHOLDER_PATTERNS)
+
+
+# ---------- Run helpers ----------
+
+def is_text_run(r):
+    """A run holding only rPr + text/tab children (no fields, drawings, breaks)."""
+    if r.tag != w('r'):
+        return False
+    for child in r:
+        if child.tag != w('rPr') and child.tag not in TEXT_CHILD_TAGS:
+            return False
+    return True
+
+
+def run_text(r):
+    return ''.join((c.text or '') if c.tag == w('t') else '\t' for c in r if c.tag in TEXT_CHILD_TAGS)
+
+
+def set_run_text(r, text):
+    """Rewrite a text run's content, mapping '\\t' back to <w:tab/>."""
+    for child in list(r):
+        if child.tag in TEXT_CHILD_TAGS:
+            r.remove(child)
+    for i, chunk in enumerate(text.split('\t')):
+        if i:
+            etree.SubElement(r, w('tab'))
+        if chunk:
+            t = etree.SubElement(r, w('t'))
+            t.text = chunk
+            if chunk != chunk.strip():
+                t.set(XML_SPACE, 'preserve')
+
+
+def rpr_key(r):
+    rPr = r.find(w('rPr'))
+    if rPr is None:
+        return b''
+    return etree.tostring(rPr, method='c14n')
+
+
+def text_run_groups(container):
+    """Yield lists of consecutive text runs that are direct children of container."""
+    group = []
+    for child in container:
+        if is_text_run(child):
+            group.append(child)
+            continue
+        if child.tag in (w('bookmarkStart'), w('bookmarkEnd')):
+            continue  # zero-width; does not break the text flow
+        if group:
+            yield group
+        group = []
+    if group:
+        yield group
+
+
+def run_containers(root):
+    """Paragraphs plus inline wrappers (hyperlink, smartTag, ins, ...) that directly hold runs."""
+    seen = set()
+    for r in root.iter(w('r')):
+        parent = r.getparent()
+        if id(parent) not in seen:
+            seen.add(id(parent))
+            yield parent
+
+
+# ---------- Normalization ----------
+
+def merge_runs(group):
+    """Merge adjacent runs with identical rPr. Returns the surviving runs."""
+    merged = [group[0]]
+    for r in group[1:]:
+        prev = merged[-1]
+        if rpr_key(prev) == rpr_key(r):
+            set_run_text(prev, run_text(prev) + run_text(r))
+            r.getparent().remove(r)
+        else:
+            merged.append(r)
+    return merged
+
+
+def stitch_placeholders(group):
+    """Move every placeholder split across runs into the run it starts in.
+    Returns the number of placeholders stitched."""
+    texts = [run_text(r) for r in group]
+    full = ''.join(texts)
+    bounds = []
+    pos = 0
+    for t in texts:
+        bounds.append((pos, pos + len(t)))
+        pos += len(t)
+
+    def run_at(offset):
+        for i, (s, e) in enumerate(bounds):
+            if s <= offset < e:
+                return i
+        return len(bounds) - 1
+
+    stitched = 0
+    # Right to left so earlier offsets stay valid
+    for m in reversed(list(PLACEHOLDER_RE.finditer(full))):
+        first, last = run_at(m.start()), run_at(m.end() - 1)
+        if first == last:
+            continue
+        start_off = m.start() - bounds[first][0]
+        end_off = m.end() - bounds[last][0]
+        texts[first] = texts[first][:start_off] + m.group(0)
+        for i in range(first + 1, last):
+            texts[i] = ''
+        texts[last] = texts[last][end_off:]
+        stitched += 1
+
+    if stitched:
+        for r, t in zip(group, texts):
+            if t:
+                set_run_text(r, t)
+            else:
+                r.getparent().remove(r)
+    return stitched
+
+
+def lint_paragraph_text(text):
+    """Return (placeholders, orphan_fragments) for a paragraph's text."""
+    placeholders = PLACEHOLDER_RE.findall(text)
+    leftover = PLACEHOLDER_RE.sub('', text)
+    orphans = []
+    if '{{' in leftover or '}}' in leftover:
+        orphans.append(leftover.strip()[:80])
+    return placeholders, orphans
+
+
+def normalize_part(xml_bytes, report):
+    root = etree.fromstring(xml_bytes)
+    report['runs_before'] += sum(1 for _ in root.iter(w('r')))
+
+    for tag in SPLITTER_TAGS:
+        for el in list(root.iter(tag)):
+            el.getparent().remove(el)
+
+    for container in list(run_containers(root)):
+        for group in list(text_run_groups(container)):
+            group = merge_runs(group)
+            report['stitched'] += stitch_placeholders(group)
+
+    report['runs_after'] += sum(1 for _ in root.iter(w('r')))
+
+    for p in root.iter(w('p')):
+        text = ''.join(run_text(r) for r in p.iter(w('r')) if is_text_run(r))
+        placeholders, orphans = lint_paragraph_text(text)
+        report['placeholders'].update(placeholders)
+        report['orphans'].extend(orphans)
+
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def normalize_docx(data):
+    """Normalize DOCX bytes. Returns (normalized_bytes, report)."""
+    report = {
+        'runs_before': 0,
+        'runs_after': 0,
+        'stitched': 0,
+        'placeholders': set(),
+        'orphans': [],
+    }
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            content = src.read(item.filename)
+            if PART_RE.match(item.filename):
+                content = normalize_part(content, report)
+            dst.writestr(item, content)
+    report['unknown'] = sorted(p for p in report['placeholders'] if not is_known_placeholder(p))
+    return out.getvalue(), report
+
+
+# ---------- Replacement benchmark ----------
+
+def _span_replace(paragraph, placeholder, value):
+    """Multi-run replacement as done by the Lambdas' _replace_span_in_paragraph (non-bold)."""
+    full_text = ''.join(run.text for run in paragraph.runs)
+    search_start = 0
+    while True:
+        idx = full_text.find(placeholder, search_start)
+        if idx == -1:
+            return
+        end = idx + len(placeholder)
+        pos = 0
+        start_i = end_i = None
+        start_off = end_off = 0
+        for i, run in enumerate(paragraph.runs):
+            run_len = len(run.text)
+            if start_i is None and pos + run_len > idx:
+                start_i, start_off = i, idx - pos
+            if start_i is not None and pos + run_len >= end:
+                end_i, end_off = i, end - pos
+                break
+            pos += run_len
+        if start_i is None or end_i is None:
+            return
+        runs = paragraph.runs
+        if start_i == end_i:
+            runs[start_i].text = runs[start_i].text[:start_off] + value + runs[start_i].text[end_off:]
+        else:
+            runs[start_i].text = runs[start_i].text[:start_off] + value
+            for i in range(start_i + 1, end_i):
+                runs[i].text = ''
+            runs[end_i].text = runs[end_i].text[end_off:]
+        full_text = ''.join(run.text for run in paragraph.runs)
+        search_start = idx + len(value)
+
+
+def _single_run_replace(paragraph, placeholder, value):
+    """Fast path for normalized templates: each placeholder lives in one run."""
+    for run in paragraph.runs:
+        if placeholder in run.text:
+            run.text = run.text.replace(placeholder, value)
+
+
+def _iter_paragraphs(doc):
+    yield from doc.paragraphs
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                yield from cell.paragraphs
+
+
+def time_replacement(data, placeholders, replace_fn, repeat=3):
+    """Best-of-N time to replace every placeholder; also returns how many were left behind."""
+    best = None
+    for _ in range(repeat):
+        doc = Document(io.BytesIO(data))
+        start = time.perf_counter()
+        for paragraph in _iter_paragraphs(doc):
+            if '{{' not in paragraph.text:
+                continue
+            for ph in placeholders:
+                if ph in paragraph.text:
+                    replace_fn(paragraph, ph, 'X' * 12)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    leftover = sum(paragraph.text.count('{{') for paragraph in _iter_paragraphs(doc))
+    return best, leftover
+
+
+# ---------- Sources ----------
+
+def iter_local(path):
+    path = Path(path)
+    files = sorted(path.rglob('*.docx')) if path.is_dir() else [path]
+    for f in files:
+        if f.name.startswith('~$'):
+            continue
+        yield str(f), f.read_bytes()
+
+
+def iter_s3(url, s3):
+    bucket, _, prefix = url[len('s3://'):].partition('/')
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if key.endswith('.docx'):
+                body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+                yield f's3://{bucket}/{key}', body
+
+
+def write_output(name, data, args, s3):
+    if args.out_dir:
+        out_path = Path(args.out_dir) / Path(name.split('://', 1)[-1]).name
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_bytes(data)
+        return str(out_path)
+    if not args.write:
+        return None
+    if name.startswith('s3://'):
+        bucket, _, key = name[len('s3://'):].partition('/')
+        s3.put_object(Bucket=bucket, Key=key, Body=data, ContentType=DOCX_CONTENT_TYPE)
+    else:
+        Path(name).write_bytes(data)
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalize runs and lint placeholders in DOCX templates.')
+    parser.add_argument('sources', nargs='+', help='DOCX file, directory, or s3://bucket/prefix')
+    parser.add_argument('--out-dir', help='Write normalized copies here instead of in place')
+    parser.add_argument('--write', action='store_true', help='Overwrite the source files / S3 objects')
+    parser.add_argument('--no-bench', action='store_true', help='Skip the replacement timing')
+    args = parser.parse_args()
+
+    s3 = None
+    if any(src.startswith('s3://') for src in args.sources):
+        import boto3
+        s3 = boto3.client('s3', region_name=AWS_REGION)
+
+    totals = {'templates': 0, 'unknown': 0, 'orphans': 0}
+    for src in args.sources:
+        items = iter_s3(src, s3) if src.startswith('s3://') else iter_local(src)
+        for name, data in items:
+            totals['templates'] += 1
+            normalized, report = normalize_docx(data)
+            before, after = report['runs_before'], report['runs_after']
+            reduction = (1 - after / before) * 100 if before else 0.0
+
+            print(f'📄 {name}')
+            print(f'   Runs: {before} → {after} ({reduction:.1f}% fewer), '
+                  f'{report["stitched"]} split placeholder(s) stitched')
+            print(f'   Placeholders: {len(report["placeholders"])} distinct')
+            for ph in report['unknown']:
+                print(f'   ⚠️  Unknown placeholder: {ph}')
+            for frag in report['orphans']:
+                print(f'   ⚠️  Orphaned braces: "{frag}"')
+            totals['unknown'] += len(report['unknown'])
+            totals['orphans'] += len(report['orphans'])
+
+            if not args.no_bench and report['placeholders']:
+                placeholders = sorted(report['placeholders'])
+                slow, _ = time_replacement(data, placeholders, _span_replace)
+                fast, leftover = time_replacement(normalized, placeholders, _single_run_replace)
+                speedup = slow / fast if fast else float('inf')
+                print(f'   Replacement: {slow * 1000:.1f} ms (span) → {fast * 1000:.1f} ms '
+                      f'(single-run), {speedup:.1f}x')
+                if leftover:
+                    print(f'   ⚠️  {leftover} placeholder(s) not reachable by the single-run path')
+
+            written = write_output(name, normalized, args, s3)
+            if written:
+                print(f'   ✅ Written: {written}')
+            print()
+
+    print(f'Checked {totals["templates"]} template(s): '
+          f'{totals["unknown"]} unknown placeholder(s), {totals["orphans"]} orphaned fragment(s)')
+    if not args.write and not args.out_dir:
+        print('(report only — pass --write or --out-dir to save normalized templates)')
+    return 1 if totals['unknown'] or totals['orphans'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/bin/bash
+# Repack a LibreOffice Lambda layer archive (lo.tar.gz / lo.tar.br) into parts that
+# docx_to_pdf_lambda unpacks in parallel during init (see _unpack_lo).
+#
+# Usage:
+#   ./scripts/repack-libreoffice-layer.sh lo.tar.gz                       # 4 gzip parts
+#   ./scripts/repack-libreoffice-layer.sh lo.tar.gz --parts=6 --format=zst --zstd-bin=/path/to/linux-x86_64/zstd
+#   ./scripts/repack-libreoffice-layer.sh lo.tar.br --format=tar          # uncompressed, if it fits the 250 MB layer limit
+#   ./scripts/repack-libreoffice-layer.sh lo.tar.gz --publish             # also publish the layer in us-west-2
+#
+# Output: lo-layer.zip with /opt/lo.part-N.tar.<fmt> (plus /opt/bin/zstd for --format=zst).
+# The Lambda runtime has gzip and tar but no zstd, so --format=zst needs a static Linux
+# x86_64 zstd binary to ship in the layer.
+
+set -e
+
+ARCHIVE="$1"; shift || true
+PARTS=4
+FORMAT=gz
+ZSTD_BIN=""
+PUBLISH=0
+for arg in "$@"; do
+  case "$arg" in
+    --parts=*) PARTS="${arg#*=}" ;;
+    --format=*) FORMAT="${arg#*=}" ;;
+    --zstd-bin=*) ZSTD_BIN="${arg#*=}" ;;
+    --publish) PUBLISH=1 ;;
+    *) echo "❌ Unknown option: $arg"; exit 1 ;;
+  esac
+done
+
+if [ -z "$ARCHIVE" ] || [ ! -f "$ARCHIVE" ]; then
+  echo "❌ Usage: $0 <lo.tar.gz|lo.tar.br> [--parts=N] [--format=gz|zst|tar] [--zstd-bin=PATH] [--publish]"
+  exit 1
+fi
+if [ "$FORMAT" = "zst" ] && { [ -z "$ZSTD_BIN" ] || [ ! -x "$ZSTD_BIN" ] || ! command -v zstd >/dev/null; }; then
+  echo "❌ --format=zst needs zstd locally and --zstd-bin=<static Linux x86_64 zstd> for the layer"
+  exit 1
+fi
+
+WORK="$(mktemp -d)"
+trap 'rm -rf "$WORK"' EXIT
+OUT="$(pwd)/lo-layer.zip"
+
+echo "🚀 Repacking $ARCHIVE into $PARTS $FORMAT parts"
+mkdir -p "$WORK/src" "$WORK/layer/bin"
+case "$ARCHIVE" in
+  *.br) brotli -dc "$ARCHIVE" | tar -x -C "$WORK/src" ;;
+  *) tar -xf "$ARCHIVE" -C "$WORK/src" ;;
+esac
+if [ ! -f "$WORK/src/instdir/program/soffice.bin" ]; then
+  echo "❌ $ARCHIVE does not contain instdir/program/soffice.bin"
+  exit 1
+fi
+
+# Spread files over parts by size (largest first onto the lightest part) so parts finish together
+(cd "$WORK/src" && find instdir -type f -o -type l | while read -r f; do
+  echo "$(stat -c %s "$f" 2>/dev/null || stat -f %z "$f") $f"
+done) | sort -rn | awk -v n="$PARTS" -v dir="$WORK" '
+  { best = 1; for (i = 2; i <= n; i++) if (size[i] < size[best]) best = i
+    size[best] += $1; sub(/^[0-9]+ /, ""); print > (dir "/part-" best ".list") }'
+
+for list in "$WORK"/part-*.list; do
+  n="$(basename "$list" .list)"; n="${n#part-}"
+  case "$FORMAT" in
+    gz) tar -C "$WORK/src" -cf - -T "$list" | gzip -6 > "$WORK/layer/lo.part-$n.tar.gz" ;;
+    zst) tar -C "$WORK/src" -cf - -T "$list" | zstd -q -19 -T0 -o "$WORK/layer/lo.part-$n.tar.zst" ;;
+    tar) tar -C "$WORK/src" -cf "$WORK/layer/lo.part-$n.tar" -T "$list" ;;
+    *) echo "❌ Unknown format: $FORMAT"; exit 1 ;;
+  esac
+done
+if [ "$FORMAT" = "zst" ]; then
+  cp "$ZSTD_BIN" "$WORK/layer/bin/zstd" && chmod +x "$WORK/layer/bin/zstd"
+fi
+rmdir "$WORK/layer/bin" 2>/dev/null || true
+
+rm -f "$OUT"
+(cd "$WORK/layer" && zip -qr "$OUT" .)
+ls -lh "$WORK"/layer/lo.part-* | awk '{print "   " $5 "  " $NF}'
+echo "✅ Layer zip: $OUT ($(du -h "$OUT" | cut -f1))"
+
+if [ "$PUBLISH" = "1" ]; then
+  export AWS_PROFILE="${AWS_PROFILE:-llc-admin}"
+  LAYER_ARN=$(aws lambda publish-layer-version \
+    --layer-name libreoffice-parts \
+    --zip-file "fileb://$OUT" \
+    --compatible-runtimes python3.11 \
+    --region us-west-2 \
+    --query 'LayerVersionArn' --output text)
+  echo "✅ Published: $LAYER_ARN"
+  echo "   Set LAYER_ARN in scripts/deploy-docx-to-pdf-lambda.sh to use it"
+fi
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Run the Python document generators over the QA variant matrix locally, in parallel.
+
+The Node sweeps (verify-all-variants.mjs, audit-all-variants.ts) go through the deployed
+API one variant at a time.  This runner imports the Lambda modules directly, swaps their
+S3 download/upload for local template files, and fans the variants out over a process
+pool.  Each worker parses every template once and hands the Lambda a copy per variant.
+
+Matrix (162 variants):
+  agreement   shareholder_agreement_lambda        owners(1..6) × voting(3) × covenants(8) = 144
+  registry    shareholder_registry_lambda         owners(1..6)                            =   6
+  resolution  organizational-resolution-lambda    owners(1..6)                            =   6
+  bylaws      bylaws_lambda                       owners(1..6)                            =   6
+
+The LLC half of the Node matrix is generated by the TypeScript docgen, which has no Python
+generator, so it is not part of this run.
+
+Per variant the runner records the structural stats used by scripts/variants-stats-baseline.csv
+(same columns), leftover {{placeholders}}, the in-process audit issue count (agreement and
+resolution) and the time spent inside lambda_handler.
+
+A variant with leftover {{placeholders}} FAILs.  The production agreement template lives only
+in S3 (s3://avenida-legal-documents/templates/shareholder-agreement-template.docx); the default
+templates/corp_template.docx is the TypeScript docgen's, whose placeholder names the agreement
+Lambda doesn't fill, so agreement variants FAIL until --template points at the production file.
+
+Usage:
+  python scripts/run-variant-matrix.py                              # full matrix, one worker per CPU
+  python scripts/run-variant-matrix.py --quick                      # 2 variants per generator
+  python scripts/run-variant-matrix.py --only=agreement --workers=4
+  python scripts/run-variant-matrix.py --save=/tmp/variants         # keep every generated DOCX
+  python scripts/run-variant-matrix.py --out=/tmp/variant-stats.csv --baseline=/tmp/previous.csv
+  python scripts/run-variant-matrix.py --template agreement=/tmp/shareholder-agreement-template.docx
+  python scripts/run-variant-matrix.py --allow-leftovers          # report leftovers, don't fail on them
+
+Exit code 0 = every variant PASS, 1 = any FAIL/ERROR or stat deviation from --baseline.
+A variant is ERROR when the handler does not return 200, FAIL on leftover placeholders.
+Requires: python-docx, lxml, boto3 (imported by the Lambdas; no AWS calls are made)
+"""
+
+import argparse
+import contextlib
+import copy
+import csv
+import importlib.util
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+try:
+    from docx import Document
+except ImportError:
+    print("Install python-docx: pip install python-docx")
+    sys.exit(1)
+
+ROOT = Path(__file__).resolve().parent.parent
+LAMBDA_DIR = ROOT / 'lambda-functions'
+
+GENERATORS = {
+    'agreement': {
+        'module': 'shareholder_agreement_lambda.py',
+        'template': 'templates/corp_template.docx',
+    },
+    'registry': {
+        'module': 'shareholder_registry_lambda.py',
+        'template': 'shareholder-registry/shareholder-registry-{owners}.docx',
+    },
+    'resolution': {
+        'module': 'organizational-resolution-lambda.py',
+        'template': 'organizational-resolution-inc/organizational-resolution-inc-{owners}.docx',
+    },
+    'bylaws': {
+        'module': 'bylaws_lambda.py',
+        'template': 'bylaws-template.docx',
+    },
+}
+
+# Production template of the agreement Lambda (not in the repo)
+AGREEMENT_TEMPLATE_S3 = 's3://avenida-legal-documents/templates/shareholder-agreement-template.docx'
+
+NAMES = ['Roberto Mendez', 'Ana Garcia', 'Carlos Lopez', 'Maria Torres', 'Pedro Ramirez', 'Sofia Flores']
+OWNER_COUNTS = [1, 2, 3, 4, 5, 6]
+VOTINGS = ['majority', 'mixed', 'unanimous']
+
+# Same covenant corners as scripts/audit-all-variants.ts
+COVENANT_MATRIX = [
+    {'rofr': True,  'drag': True,  'tag': True,  'nc': True,  'ns': True,  'conf': True},
+    {'rofr': False, 'drag': False, 'tag': False, 'nc': False, 'ns': False, 'conf': False},
+    {'rofr': True,  'drag': False, 'tag': False, 'nc': True,  'ns': False, 'conf': False},
+    {'rofr': True,  'drag': True,  'tag': False, 'nc': False, 'ns': True,  'conf': False},
+    {'rofr': True,  'drag': False, 'tag': True,  'nc': False, 'ns': False, 'conf': True},
+    {'rofr': False, 'drag': True,  'tag': True,  'nc': True,  'ns': True,  'conf': False},
+    {'rofr': False, 'drag': True,  'tag': False, 'nc': True,  'ns': False, 'conf': True},
+    {'rofr': False, 'drag': False, 'tag': True,  'nc': False, 'ns': True,  'conf': True},
+]
+
+# voting profile → Lambda voting fields (mirrors votingProfile() in agreement-variants.mjs)
+VOTING_PROFILES = {
+    'majority': {
+        'saleOfCompanyVoting': 'majority', 'majorDecisionsVoting': 'majority',
+        'newShareholderVoting': 'majority', 'dissolutionVoting': 'majority',
+        'removalVoting': 'majority', 'shareholderLoansVoting': 'majority',
+        'capitalCallsVoting': 'majority', 'divorceTransferVoting': 'majority',
+    },
+    'mixed': {
+        'saleOfCompanyVoting': 'supermajority', 'majorDecisionsVoting': 'majority',
+        'newShareholderVoting': 'unanimous', 'dissolutionVoting': 'majority',
+        'removalVoting': 'supermajority', 'shareholderLoansVoting': 'majority',
+        'capitalCallsVoting': 'supermajority', 'divorceTransferVoting': 'majority',
+    },
+    'unanimous': {
+        'saleOfCompanyVoting': 'unanimous', 'majorDecisionsVoting': 'unanimous',
+        'newShareholderVoting': 'unanimous', 'dissolutionVoting': 'unanimous',
+        'removalVoting': 'unanimous', 'shareholderLoansVoting': 'unanimous',
+        'capitalCallsVoting': 'unanimous', 'divorceTransferVoting': 'unanimous',
+    },
+}
+
+STAT_COLUMNS = ['label', 'entity', 'voting', 'ownerCount', 'rofr', 'dragTag',
+                'sectionCount', 'paragraphs', 'h3', 'h4', 'tabs', 'pageBreaks',
+                'numbered', 'tables', 'rFontsRuns', 'bodyLen']
+EXTRA_COLUMNS = ['generator', 'status', 'leftovers', 'auditIssues', 'elapsedMs']
+# Columns compared against --baseline (bodyLen drifts with every timestamp, skip it)
+DIFF_COLUMNS = ['sectionCount', 'paragraphs', 'h3', 'h4', 'tabs', 'pageBreaks',
+                'numbered', 'tables', 'rFontsRuns']
+
+
+# ─── Variant factories ──────────────────────────────────────────────
+
+def owners(n, total_shares=1000):
+    pct_each = 100 // n
+    result = []
+    for i in range(n):
+        pct = 100 - pct_each * (n - 1) if i == n - 1 else pct_each
+        result.append({
+            'name': NAMES[i],
+            'ownershipPercent': pct,
+            'shares': total_shares * pct // 100,
+            'capitalContribution': 50000,
+        })
+    return result
+
+
+def company_fields(n, label):
+    return {
+        'companyName': f'{label[:20]} Corp',
+        'formationState': 'Florida',
+        'formationDate': '2026-04-08',
+        'paymentDate': '2026-04-08',
+        'companyAddress': '100 Test St, Miami, FL 33131',
+        'county': 'Miami-Dade',
+    }
+
+
+def agreement_form_data(n, voting, cov, label):
+    members = owners(n)
+    data = company_fields(n, label)
+    data.update(VOTING_PROFILES[voting])
+    data.update({
+        'totalAuthorizedShares': '1,000',
+        'parValue': '0.01',
+        'members': members,
+        'directors': [{'name': m['name']} for m in members[:3]],
+        'officers': [{'name': NAMES[0], 'role': 'President'}]
+                    + ([{'name': NAMES[1], 'role': 'Vice-President'}] if n >= 2 else [])
+                    + ([{'name': NAMES[2], 'role': 'Treasurer'}] if n >= 3 else []),
+        'majorityThreshold': 50.01,
+        'superMajorityThreshold': 75,
+        'bankSignatures': 2,
+        'spendingThreshold': 7500,
+        'distributionFrequency': 'quarterly',
+        'rofrOfferDays': 90,
+        'rofr': cov['rofr'],
+        'dragAlong': cov['drag'],
+        'tagAlong': cov['tag'],
+        'nonCompete': cov['nc'],
+        'nonSolicitation': cov['ns'],
+        'confidentiality': cov['conf'],
+    })
+    return data
+
+
+def registry_form_data(n, label):
+    data = company_fields(n, label)
+    data.update({
+        'authorizedShares': '1000',
+        'outstandingShares': '1000',
+        'officer1Name': NAMES[0],
+        'officer1Role': 'President',
+        'shareholders': [
+            {'name': m['name'], 'shares': str(m['shares']), 'percent': f"{m['ownershipPercent']}%",
+             'date': '04/08/2026', 'transaction': 'Original Issue', 'class': 'Common'}
+            for m in owners(n)
+        ],
+    })
+    return data
+
+
+def resolution_form_data(n, label):
+    members = owners(n)
+    data = company_fields(n, label)
+    data.update({
+        'members': members,
+        'managers': [{'name': NAMES[0], 'role': 'President; Director'}],
+        'directors': [{'name': m['name']} for m in members[:3]],
+    })
+    return data
+
+
+def bylaws_form_data(n, label):
+    data = company_fields(n, label)
+    data.update({
+        'numberOfShares': '1000',
+        'officer1Name': NAMES[0],
+        'officer1Role': 'President',
+    })
+    for i in range(1, n + 1):
+        data[f'owner{i}Name'] = NAMES[i - 1]
+    return data
+
+
+def build_variants(only=None, quick=False, templates=None):
+    templates = templates or {}
+    variants = []
+    owner_counts = [2] if quick else OWNER_COUNTS
+    votings = ['majority'] if quick else VOTINGS
+    covenants = COVENANT_MATRIX[:2] if quick else COVENANT_MATRIX
+
+    def add(generator, label, n, form_data, voting='', cov=None):
+        variants.append({
+            'generator': generator,
+            'label': label,
+            'template': templates.get(generator, GENERATORS[generator]['template']).format(owners=n),
+            'ownerCount': n,
+            'voting': voting,
+            'rofr': cov['rofr'] if cov else '',
+            'dragTag': (cov['drag'] and cov['tag']) if cov else '',
+            'form_data': form_data,
+        })
+
+    for n in owner_counts:
+        for voting in votings:
+            for cov in covenants:
+                flags = ''.join(k + ('Y' if cov[k] else 'N') for k in ('rofr', 'drag', 'tag', 'nc', 'ns', 'conf'))
+                label = f'SA_C-Corp_{voting}_{flags}_{n}own'
+                add('agreement', label, n, agreement_form_data(n, voting, cov, label), voting, cov)
+        add('registry', f'REG_C-Corp_{n}own', n, registry_form_data(n, f'REG {n}own'))
+        add('resolution', f'RES_C-Corp_{n}own', n, resolution_form_data(n, f'RES {n}own'))
+        add('bylaws', f'BYL_C-Corp_{n}own', n, bylaws_form_data(n, f'BYL {n}own'))
+
+    if only:
+        variants = [v for v in variants if v['generator'] in only]
+    return variants
+
+
+# ─── Structural stats (same rules as collectStats in verify-all-variants.mjs) ─────
+
+P_RE = re.compile(r'<w:p[ >].*?</w:p>', re.S)
+T_RE = re.compile(r'<w:t[^>]*>([^<]*)</w:t>')
+R_RE = re.compile(r'<w:r[ >].*?</w:r>', re.S)
+TBL_RE = re.compile(r'<w:tbl[ >].*?</w:tbl>', re.S)
+NUM_TAB_RE = re.compile(r'<w:t[^>]*>\d+\.\d+</w:t>\s*<w:tab/>')
+
+
+def collect_stats(xml):
+    stats = {'paragraphs': 0, 'h3': 0, 'h4': 0, 'tabs': 0, 'pageBreaks': 0,
+             'numbered': 0, 'rFontsRuns': 0, 'sectionCount': 0}
+    stats['tables'] = len(TBL_RE.findall(xml))
+    for p in P_RE.findall(xml):
+        stats['paragraphs'] += 1
+        is_h3 = '<w:pStyle w:val="Heading3"/>' in p
+        is_h4 = '<w:pStyle w:val="Heading4"/>' in p
+        stats['h3'] += is_h3
+        stats['h4'] += is_h4
+        stats['tabs'] += p.count('<w:tab/>')
+        stats['pageBreaks'] += len(re.findall(r'<w:br[^>]*w:type="page"', p))
+        text = ''.join(T_RE.findall(p))
+        if re.match(r'^\d{1,2}\.\d{1,2}(?:\s|[A-Za-z])', text):
+            stats['numbered'] += 1
+        stats['rFontsRuns'] += sum(1 for r in R_RE.findall(p) if '<w:rFonts' in r)
+        # numberedSections() row
+        stripped = text.strip()
+        if stripped and (is_h3 or NUM_TAB_RE.search(p) or re.match(r'^\d+\.\d+\s', stripped)
+                         or (is_h4 and re.match(r'^\d+\.\d+', stripped))):
+            stats['sectionCount'] += 1
+    stats['bodyLen'] = len(xml)
+    return stats
+
+
+def leftover_placeholders(xml):
+    text = ''.join(T_RE.findall(xml))
+    return sorted(set(re.findall(r'\{\{[^}]*\}\}', text)))
+
+
+# ─── Worker ──────────────────────────────────────────────────────────
+
+_WORKER = {}
+
+
+def _init_worker(save_dir, verbose, allow_leftovers):
+    # Fixed output names in the Lambdas (filled_*.docx under tempfile.gettempdir())
+    # would collide between processes, so every worker gets its own temp dir.
+    tempfile.tempdir = tempfile.mkdtemp(prefix=f'variant-matrix-{os.getpid()}-')
+    os.environ.setdefault('AWS_REGION', 'us-west-1')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-1')
+    _WORKER.update(save_dir=save_dir, verbose=verbose, allow_leftovers=allow_leftovers, modules={}, templates={},
+                   uploads={})
+
+
+def _load_generator(name):
+    """Import a Lambda module once per worker and point its S3 helpers at local files."""
+    module = _WORKER['modules'].get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.spec_from_file_location(f'variant_matrix_{name}', LAMBDA_DIR / GENERATORS[name]['module'])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    state = {'template': None}
+    templates = _WORKER['templates']
+
+    def download_from_s3(bucket, key, local_path):
+        state['template'] = key
+
+    def load_document(path=None):
+        key = state['template']
+        if key not in templates:
+            templates[key] = Document(str(ROOT / key))
+        return copy.deepcopy(templates[key])
+
+    def upload_to_s3(local_path, bucket, key):
+        with open(local_path, 'rb') as f:
+            _WORKER['uploads'][key] = f.read()
+        if _WORKER['save_dir']:
+            shutil.copyfile(local_path, os.path.join(_WORKER['save_dir'], key))
+
+    module.download_from_s3 = download_from_s3
+    module.upload_to_s3 = upload_to_s3
+    module.Document = load_document
+    _WORKER['modules'][name] = module
+    return module
+
+
+def run_variant(variant):
+    import json
+
+    module = _load_generator(variant['generator'])
+    key = f"{variant['label']}.docx"
+    # API Gateway shape: every handler accepts a JSON string under "body"
+    event = {'body': json.dumps({
+        'form_data': variant['form_data'],
+        's3_bucket': 'variant-matrix',
+        's3_key': key,
+        'templateUrl': f"s3://variant-matrix-templates/{variant['template']}",
+    })}
+
+    log = io.StringIO()
+    started = time.perf_counter()
+    try:
+        if _WORKER['verbose']:
+            response = module.lambda_handler(event, None)
+        else:
+            with contextlib.redirect_stdout(log):
+                response = module.lambda_handler(event, None)
+    except Exception as e:
+        response = {'statusCode': 500, 'body': json.dumps({'error': type(e).__name__, 'details': str(e)})}
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    row = {col: variant.get(col, '') for col in ('label', 'voting', 'ownerCount', 'rofr', 'dragTag', 'generator')}
+    row['entity'] = 'C-Corp'
+    row['elapsedMs'] = round(elapsed_ms, 1)
+    errors = []
+
+    body = {}
+    try:
+        body = json.loads(response.get('body') or '{}')
+    except (TypeError, ValueError):
+        pass  # raw DOCX responses are base64, not JSON
+
+    data = _WORKER['uploads'].pop(key, None)
+    if response.get('statusCode') != 200 or data is None:
+        row['status'] = 'ERROR'
+        errors.append(body.get('details') or body.get('error') or f"HTTP {response.get('statusCode')}")
+        return row, errors
+
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        xml = z.read('word/document.xml').decode('utf8')
+    row.update(collect_stats(xml))
+
+    leftovers = leftover_placeholders(xml)
+    row['leftovers'] = len(leftovers)
+    row['leftoverNames'] = leftovers
+    if leftovers and not _WORKER['allow_leftovers']:
+        errors.append(f"leftover placeholders: {', '.join(leftovers[:3])}")
+
+    audit = body.get('audit')
+    row['auditIssues'] = audit['issue_count'] if audit else ''
+
+    row['status'] = 'FAIL' if errors else 'PASS'
+    return row, errors
+
+
+# ─── Runner ──────────────────────────────────────────────────────────
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def load_baseline(path):
+    with open(path, newline='') as f:
+        return {row['label']: row for row in csv.DictReader(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the Python generators over the QA variant matrix')
+    parser.add_argument('--only', help=f"comma-separated generators ({', '.join(GENERATORS)})")
+    parser.add_argument('--quick', action='store_true', help='2 owners, majority voting, 2 covenant corners')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='process pool size')
+    parser.add_argument('--save', metavar='DIR', help='write every generated DOCX to DIR')
+    parser.add_argument('--out', default=os.path.join(tempfile.gettempdir(), 'variant-matrix-stats.csv'),
+                        help='stats CSV path')
+    parser.add_argument('--baseline', help='stats CSV to diff against (matching labels only)')
+    parser.add_argument('--template', action='append', default=[], metavar='GEN=PATH',
+                        help='template for a generator ({owners} is replaced by the owner count)')
+    parser.add_argument('--allow-leftovers', action='store_true',
+                        help='report leftover {{placeholders}} instead of failing the variant')
+    parser.add_argument('--verbose', action='store_true', help="show the Lambdas' ===> logs")
+    args = parser.parse_args()
+
+    only = set(args.only.split(',')) if args.only else None
+    if only and only - set(GENERATORS):
+        print(f"❌ Unknown generator(s): {', '.join(sorted(only - set(GENERATORS)))}")
+        sys.exit(2)
+
+    templates = {}
+    for spec in args.template:
+        name, _, path = spec.partition('=')
+        if name not in GENERATORS or not path:
+            print(f'❌ Bad --template {spec!r} (expected GEN=PATH)')
+            sys.exit(2)
+        templates[name] = os.path.abspath(path)
+
+    variants = build_variants(only, args.quick, templates)
+    missing = sorted({v['template'] for v in variants if not (ROOT / v['template']).exists()})
+    if missing:
+        for m in missing:
+            print(f'❌ Template not found: {m}')
+        sys.exit(2)
+    if args.save:
+        os.makedirs(args.save, exist_ok=True)
+
+    print(f'🚀 {len(variants)} variants on {args.workers} worker(s)')
+    started = time.perf_counter()
+    rows, failures = [], []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.save, args.verbose, args.allow_leftovers)) as pool:
+        futures = [pool.submit(run_variant, v) for v in variants]
+        for future in as_completed(futures):
+            row, errors = future.result()
+            rows.append(row)
+            if errors:
+                failures.append((row['label'], row['status'], errors))
+            if not args.verbose:
+                sys.stdout.write({'PASS': '.', 'FAIL': 'F'}.get(row['status'], 'E'))
+                sys.stdout.flush()
+    wall = time.perf_counter() - started
+    print()
+
+    rows.sort(key=lambda r: r['label'])
+    with open(args.out, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=STAT_COLUMNS + EXTRA_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+    passed = sum(1 for r in rows if r['status'] == 'PASS')
+    failed = sum(1 for r in rows if r['status'] == 'FAIL')
+    errored = len(rows) - passed - failed
+    print('=' * 60)
+    print(f'TOTAL: {len(rows)} | PASS {passed} | FAIL {failed} | ERROR {errored}')
+    print(f'⏱️  Wall {wall:.1f}s on {args.workers} worker(s)')
+    for name in GENERATORS:
+        times = [r['elapsedMs'] for r in rows if r['generator'] == name]
+        if times:
+            print(f'   {name:<11} n={len(times):<4} p50 {percentile(times, 50):7.1f} ms   '
+                  f'p95 {percentile(times, 95):7.1f} ms   max {max(times):7.1f} ms')
+
+    if args.allow_leftovers:
+        for name in GENERATORS:
+            names = sorted({ph for r in rows if r['generator'] == name for ph in r.get('leftoverNames', [])})
+            if names:
+                print(f"   ⚠️  {name}: leftover placeholders {', '.join(names[:6])}"
+                      f"{' …' if len(names) > 6 else ''}")
+    if 'agreement' not in templates and any(r['generator'] == 'agreement' and r.get('leftovers') for r in rows):
+        print(f"   ℹ️  agreement ran against {GENERATORS['agreement']['template']} (the TypeScript docgen's);"
+              f" fetch {AGREEMENT_TEMPLATE_S3} and pass --template agreement=PATH")
+
+    for label, status, errors in sorted(failures):
+        print(f'   ❌ {status} {label}: {" | ".join(errors)}')
+
+    deviations = []
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        compared = 0
+        for row in rows:
+            base = baseline.get(row['label'])
+            if base is None or row['status'] == 'ERROR':
+                continue
+            compared += 1
+            for col in DIFF_COLUMNS:
+                if str(row.get(col, '')) != str(base.get(col, '')):
+                    deviations.append(f"{row['label']} {col}: {base.get(col)} → {row.get(col)}")
+        print(f'📊 Baseline: {compared} variant(s) compared, {len(deviations)} deviation(s)')
+        for d in deviations[:50]:
+            print(f'   ⚠️  {d}')
+
+    print(f'✅ Stats CSV: {args.out}')
+    if args.save:
+        print(f'✅ DOCX files: {args.save}')
+    sys.exit(1 if failed or errored or deviations else 0)
+
+
+if __name__ == '__main__':
+    main()
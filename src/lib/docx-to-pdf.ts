@@ -19,10 +19,7 @@ function getLambdaClient(): LambdaClient | null {
   });
 }
 
-export async function convertDocxToPdf(docxBuffer: Buffer): Promise<Buffer | null> {
-  const client = getLambdaClient();
-  if (!client) return null;
-  const payload = JSON.stringify({ docx_base64: docxBuffer.toString('base64') });
+async function invokeDocxToPdf(client: LambdaClient, payload: string): Promise<Record<string, any>> {
   const response = await client.send(new InvokeCommand({
     FunctionName: FUNCTION_NAME,
     Payload: new TextEncoder().encode(payload),
@@ -39,12 +36,46 @@ export async function convertDocxToPdf(docxBuffer: Buffer): Promise<Buffer | nul
     const errBody = raw.body ? JSON.parse(raw.body) : raw;
     throw new Error(errBody?.error || raw.body || `Lambda ${raw.statusCode}`);
   }
-  const body = raw.body ? JSON.parse(raw.body) : raw;
+  return raw.body ? JSON.parse(raw.body) : raw;
+}
+
+export async function convertDocxToPdf(docxBuffer: Buffer): Promise<Buffer | null> {
+  const client = getLambdaClient();
+  if (!client) return null;
+  const body = await invokeDocxToPdf(client, JSON.stringify({ docx_base64: docxBuffer.toString('base64') }));
   const pdfB64 = body?.pdf_base64;
   if (!pdfB64) throw new Error('Lambda no pdf_base64');
   return Buffer.from(pdfB64, 'base64');
 }
 
+export interface DocxToPdfBatchResult {
+  name: string;
+  pdf: Buffer | null;
+  error?: string;
+  elapsedMs?: number;
+}
+
+/**
+ * Convert several DOCX files in one Lambda call (one LibreOffice session).
+ * Results are in input order; a failed file has pdf = null and error set.
+ */
+export async function convertDocxBatchToPdf(
+  docs: { name: string; buffer: Buffer }[],
+): Promise<DocxToPdfBatchResult[] | null> {
+  const client = getLambdaClient();
+  if (!client) return null;
+  const body = await invokeDocxToPdf(client, JSON.stringify({
+    documents: docs.map((d) => ({ name: d.name, docx_base64: d.buffer.toString('base64') })),
+  }));
+  if (!Array.isArray(body?.results)) throw new Error('Lambda no results');
+  return body.results.map((r: { name: string; pdf_base64?: string; error?: string; elapsed_ms?: number }) => ({
+    name: r.name,
+    pdf: r.pdf_base64 ? Buffer.from(r.pdf_base64, 'base64') : null,
+    error: r.error,
+    elapsedMs: r.elapsed_ms,
+  }));
+}
+
 export function isDocxToPdfAvailable(): boolean {
   return !!getLambdaClient();
 }